@@ -1,15 +1,70 @@
 import sqlite3
 from sqlite3 import Error
 from faker import Faker
+import argparse
 import random
-from datetime import datetime, timedelta
+import time
+from datetime import date, datetime, timedelta
+
+from resumenes import triggers_suspendidos
 
 fake = Faker('es_ES')  # Datos en español
 
-def crear_conexion():
+# Catálogo fijo compartido por poblar_tablas y poblar_tablas_escala
+CATEGORIAS = [
+    ('Abarrotes',),
+    ('Papelería',),
+    ('Limpieza',)
+]
+
+MARCAS = [
+    ('Gloria',), ('Nestlé',), ('Coca-Cola',), ('Bimbo',),
+    ('BIC',), ('Faber-Castell',), ('Norma',), ('Sapolio',)
+]
+
+PROVEEDORES = [
+    ('Distribuidora Perú', '999-111111'),
+    ('Suministros Papelería', '999-222222'),
+    ('Limpieza Total S.A.', '999-333333'),
+    ('Alimentos Andinos', '999-444444'),
+    ('Bebidas del Sur', '999-555555')
+]
+
+PRODUCTOS = [
+    # Abarrotes (id_categoria=1)
+    ('Arroz Costeño', 1, 1, 5.0, 3.5, 0, 'kg', '5 kg', '{"tipo": "Extra", "empaque": "saco"}'),
+    ('Aceite Primor', 1, 4, 12.0, 8.0, 0, 'litro', '1 litro', '{"tipo": "Vegetal", "origen": "soya"}'),
+    ('Leche Evaporada', 1, 1, 4.5, 3.0, 0, 'unidad', '1L', '{"tipo": "Entera", "empaque": "lata"}'),
+    ('Galletas Soda Field', 1, 4, 3.0, 2.0, 0, 'unidad', 'Paquete 200g', '{"sabor": "Original", "unidades": 12}'),
+
+    # Papelería (id_categoria=2)
+    ('Cuaderno Norma A4', 2, 7, 15.0, 10.0, 0, 'unidad', '100 hojas', '{"tipo_hoja": "cuadriculada", "color": "azul"}'),
+    ('Lápices Faber-Castell', 2, 6, 2.5, 1.5, 0, 'unidad', 'Pack x12', '{"mina": "HB", "colores": "mixtos"}'),
+    ('Borradores Norma', 2, 7, 1.0, 0.5, 0, 'unidad', 'Pack x5', '{"forma": "rectangular", "color": "blanco"}'),
+    ('Resaltadores BIC', 2, 5, 8.0, 5.0, 0, 'unidad', 'Pack x4', '{"colores": "amarillo, rosa, verde, azul"}'),
+
+    # Limpieza (id_categoria=3)
+    ('Detergente Sapolio', 3, 8, 10.0, 7.0, 0, 'unidad', '1 kg', '{"aroma": "limón", "presentación": "polvo"}'),
+    ('Escoba Industrial', 3, 8, 25.0, 18.0, 0, 'unidad', '1.5 m', '{"material": "plástico", "uso": "interior"}')
+]
+
+# Volúmenes por unidad de escala (escala 1 = lo que genera poblar_tablas)
+CLIENTES_POR_ESCALA = 30
+COMPRAS_POR_ESCALA = 20
+VENTAS_POR_ESCALA = 100
+
+# PRAGMAs para la carga masiva: una sola transacción sin fsync intermedios
+PRAGMAS_CARGA = [
+    "PRAGMA synchronous = OFF",
+    "PRAGMA journal_mode = MEMORY",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -200000",  # ~200 MB de caché de páginas
+]
+
+def crear_conexion(ruta='tienda.db'):
     """Crea una conexión a la base de datos SQLite"""
     try:
-        conn = sqlite3.connect('tienda.db')
+        conn = sqlite3.connect(ruta)
         conn.execute("PRAGMA foreign_keys = 1")
         return conn
     except Error as e:
@@ -21,29 +76,13 @@ def poblar_tablas(conn):
     cursor = conn.cursor()
 
     # --- 1. Poblar categorías ---
-    categorias = [
-        ('Abarrotes',),
-        ('Papelería',),
-        ('Limpieza',)
-    ]
-    cursor.executemany("INSERT INTO categorias (nombre_categoria) VALUES (?)", categorias)
+    cursor.executemany("INSERT INTO categorias (nombre_categoria) VALUES (?)", CATEGORIAS)
 
     # --- 2. Poblar marcas ---
-    marcas = [
-        ('Gloria',), ('Nestlé',), ('Coca-Cola',), ('Bimbo',),
-        ('BIC',), ('Faber-Castell',), ('Norma',), ('Sapolio',)
-    ]
-    cursor.executemany("INSERT INTO marcas (nombre_marca) VALUES (?)", marcas)
+    cursor.executemany("INSERT INTO marcas (nombre_marca) VALUES (?)", MARCAS)
 
     # --- 3. Poblar proveedores ---
-    proveedores = [
-        ('Distribuidora Perú', '999-111111'),
-        ('Suministros Papelería', '999-222222'),
-        ('Limpieza Total S.A.', '999-333333'),
-        ('Alimentos Andinos', '999-444444'),
-        ('Bebidas del Sur', '999-555555')
-    ]
-    cursor.executemany("INSERT INTO proveedores (nombre_proveedor, contacto) VALUES (?,?)", proveedores)
+    cursor.executemany("INSERT INTO proveedores (nombre_proveedor, contacto) VALUES (?,?)", PROVEEDORES)
 
     # --- 4. Poblar clientes (30 clientes) ---
     clientes = []
@@ -53,28 +92,11 @@ def poblar_tablas(conn):
         clientes.append((nombre, telefono))
     cursor.executemany("INSERT INTO clientes (nombre, telefono) VALUES (?,?)", clientes)
 
-    # --- 5. Poblar productos (20 productos) ---
-    productos_data = [
-        # Abarrotes (id_categoria=1)
-        ('Arroz Costeño', 1, 1, 5.0, 3.5, 0, 'kg', '5 kg', '{"tipo": "Extra", "empaque": "saco"}'),
-        ('Aceite Primor', 1, 4, 12.0, 8.0, 0, 'litro', '1 litro', '{"tipo": "Vegetal", "origen": "soya"}'),
-        ('Leche Evaporada', 1, 1, 4.5, 3.0, 0, 'unidad', '1L', '{"tipo": "Entera", "empaque": "lata"}'),
-        ('Galletas Soda Field', 1, 4, 3.0, 2.0, 0, 'unidad', 'Paquete 200g', '{"sabor": "Original", "unidades": 12}'),
-        
-        # Papelería (id_categoria=2)
-        ('Cuaderno Norma A4', 2, 7, 15.0, 10.0, 0, 'unidad', '100 hojas', '{"tipo_hoja": "cuadriculada", "color": "azul"}'),
-        ('Lápices Faber-Castell', 2, 6, 2.5, 1.5, 0, 'unidad', 'Pack x12', '{"mina": "HB", "colores": "mixtos"}'),
-        ('Borradores Norma', 2, 7, 1.0, 0.5, 0, 'unidad', 'Pack x5', '{"forma": "rectangular", "color": "blanco"}'),
-        ('Resaltadores BIC', 2, 5, 8.0, 5.0, 0, 'unidad', 'Pack x4', '{"colores": "amarillo, rosa, verde, azul"}'),
-        
-        # Limpieza (id_categoria=3)
-        ('Detergente Sapolio', 3, 8, 10.0, 7.0, 0, 'unidad', '1 kg', '{"aroma": "limón", "presentación": "polvo"}'),
-        ('Escoba Industrial', 3, 8, 25.0, 18.0, 0, 'unidad', '1.5 m', '{"material": "plástico", "uso": "interior"}')
-    ]
+    # --- 5. Poblar productos (10 productos) ---
     cursor.executemany(
         """INSERT INTO productos (nombre_producto, id_categoria, id_marca, precio_venta, precio_compra, 
         stock, unidad_medida, tamano, especificaciones) VALUES (?,?,?,?,?,?,?,?,?)""",
-        productos_data
+        PRODUCTOS
     )
 
     # --- 6. Poblar compras (20 compras) ---
@@ -145,9 +167,140 @@ def poblar_tablas(conn):
     conn.commit()
     print("¡Base de datos poblada con éxito!")
 
+def _fecha_aleatoria(inicio, dias):
+    """Fecha aleatoria entre inicio e inicio + dias (como texto ISO)"""
+    return (inicio + timedelta(days=random.randint(0, dias))).isoformat()
+
+def _lotes(generador, tamano_lote):
+    """Agrupa las filas de un generador en listas de tamano_lote elementos"""
+    lote = []
+    for fila in generador:
+        lote.append(fila)
+        if len(lote) >= tamano_lote:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+def poblar_tablas_escala(conn, escala, tamano_lote=50_000):
+    """Poblar las tablas con escala veces el volumen de poblar_tablas.
+
+    Precios y stock se mantienen en memoria, las inserciones van por
+    executemany en lotes dentro de una sola transacción y el stock se
+    actualiza una sola vez al final. Se conservan las mismas reglas que en
+    poblar_tablas: el precio sale de productos y ninguna venta deja el
+    stock en negativo.
+    """
+    cursor = conn.cursor()
+    # Se restauran al final: la base puede estar en WAL (registro.py) y no debe quedar en DELETE
+    journal_mode = cursor.execute("PRAGMA journal_mode").fetchone()[0]
+    synchronous = cursor.execute("PRAGMA synchronous").fetchone()[0]
+    for pragma in PRAGMAS_CARGA:
+        cursor.execute(pragma)
+    inicio_carga = time.perf_counter()
+
+    # Los resúmenes se recalculan una sola vez al final en lugar de por cada línea
+    with triggers_suspendidos(conn):
+        # --- 1. Catálogo (mismo que poblar_tablas) ---
+        cursor.executemany("INSERT INTO categorias (nombre_categoria) VALUES (?)", CATEGORIAS)
+        cursor.executemany("INSERT INTO marcas (nombre_marca) VALUES (?)", MARCAS)
+        cursor.executemany("INSERT INTO proveedores (nombre_proveedor, contacto) VALUES (?,?)", PROVEEDORES)
+        cursor.executemany(
+            """INSERT INTO productos (nombre_producto, id_categoria, id_marca, precio_venta, precio_compra, 
+            stock, unidad_medida, tamano, especificaciones) VALUES (?,?,?,?,?,?,?,?,?)""",
+            PRODUCTOS
+        )
+
+        # --- 2. Clientes (teléfono correlativo para respetar UNIQUE a gran escala) ---
+        n_clientes = CLIENTES_POR_ESCALA * escala
+        for lote in _lotes(((fake.name(), f"9{n:08d}") for n in range(n_clientes)), tamano_lote):
+            cursor.executemany("INSERT INTO clientes (nombre, telefono) VALUES (?,?)", lote)
+
+        # --- 3. Precios, stock e ids en memoria ---
+        productos = {
+            id_producto: (precio_compra, precio_venta, stock)
+            for id_producto, precio_compra, precio_venta, stock in cursor.execute(
+                "SELECT id_producto, precio_compra, precio_venta, stock FROM productos"
+            )
+        }
+        ids_productos = list(productos)
+        stock = {id_producto: datos[2] for id_producto, datos in productos.items()}
+        ids_proveedores = [fila[0] for fila in cursor.execute("SELECT id_proveedor FROM proveedores")]
+        ids_clientes = [fila[0] for fila in cursor.execute("SELECT id_cliente FROM clientes")]
+        hoy = date.today()
+
+        # --- 4. Compras con ids explícitos (1-5 productos por compra) ---
+        siguiente_compra = cursor.execute("SELECT COALESCE(MAX(id_compra), 0) + 1 FROM compras").fetchone()[0]
+        inicio_compras = hoy - timedelta(days=365)
+        n_compras = COMPRAS_POR_ESCALA * escala
+        n_detalle_compras = 0
+        for inicio in range(0, n_compras, tamano_lote):
+            cabeceras, detalles = [], []
+            for id_compra in range(siguiente_compra + inicio, siguiente_compra + min(inicio + tamano_lote, n_compras)):
+                cabeceras.append((id_compra, _fecha_aleatoria(inicio_compras, 365), random.choice(ids_proveedores)))
+                for _ in range(random.randint(1, 5)):
+                    id_producto = random.choice(ids_productos)
+                    cantidad = random.randint(10, 100)
+                    detalles.append((id_compra, id_producto, cantidad, productos[id_producto][0]))
+                    stock[id_producto] += cantidad
+            cursor.executemany("INSERT INTO compras (id_compra, fecha_compra, id_proveedor) VALUES (?,?,?)", cabeceras)
+            cursor.executemany(
+                "INSERT INTO detalle_compras (id_compra, id_producto, cantidad, precio_unitario) VALUES (?,?,?,?)",
+                detalles
+            )
+            n_detalle_compras += len(detalles)
+
+        # --- 5. Ventas con ids explícitos (30% sin cliente, se salta lo que no tiene stock) ---
+        siguiente_venta = cursor.execute("SELECT COALESCE(MAX(id_venta), 0) + 1 FROM ventas").fetchone()[0]
+        inicio_ventas = hoy - timedelta(days=182)
+        n_ventas = VENTAS_POR_ESCALA * escala
+        n_detalle_ventas = 0
+        for inicio in range(0, n_ventas, tamano_lote):
+            cabeceras, detalles = [], []
+            for id_venta in range(siguiente_venta + inicio, siguiente_venta + min(inicio + tamano_lote, n_ventas)):
+                id_cliente = random.choice(ids_clientes) if random.random() > 0.3 else None
+                cabeceras.append((id_venta, _fecha_aleatoria(inicio_ventas, 182), id_cliente))
+                for _ in range(random.randint(1, 5)):
+                    id_producto = random.choice(ids_productos)
+                    cantidad = random.randint(1, 5)
+                    if stock[id_producto] >= cantidad:
+                        detalles.append((id_venta, id_producto, cantidad, productos[id_producto][1]))
+                        stock[id_producto] -= cantidad
+            cursor.executemany("INSERT INTO ventas (id_venta, fecha_venta, id_cliente) VALUES (?,?,?)", cabeceras)
+            cursor.executemany(
+                "INSERT INTO detalle_ventas (id_venta, id_producto, cantidad, precio_unitario) VALUES (?,?,?,?)",
+                detalles
+            )
+            n_detalle_ventas += len(detalles)
+
+        # --- 6. Stock final: un único UPDATE por producto ---
+        cursor.executemany(
+            "UPDATE productos SET stock = stock + ? WHERE id_producto = ?",
+            [(stock[id_producto] - datos[2], id_producto) for id_producto, datos in productos.items()]
+        )
+
+    conn.commit()
+    cursor.execute(f"PRAGMA journal_mode = {journal_mode}")
+    cursor.execute(f"PRAGMA synchronous = {synchronous}")
+
+    segundos = time.perf_counter() - inicio_carga
+    filas = n_clientes + n_compras + n_detalle_compras + n_ventas + n_detalle_ventas
+    print(f"¡Base de datos poblada con éxito a escala {escala}!")
+    print(f"{filas:,} filas en {segundos:.1f} s ({filas / segundos:,.0f} filas/s), "
+          f"{n_detalle_ventas:,} líneas en detalle_ventas")
+
 if __name__ == '__main__':
-    conn = crear_conexion()
-    if conn:
+    parser = argparse.ArgumentParser(description="Poblar tienda.db con datos de ejemplo")
+    parser.add_argument('--scale', type=int, default=None,
+                        help="Carga masiva con escala veces el volumen por defecto (p. ej. --scale 1000)")
+    parser.add_argument('--db', default='tienda.db', help="Ruta de la base de datos")
+    args = parser.parse_args()
+
+    conn = crear_conexion(args.db)
+    if conn and args.scale:
+        poblar_tablas_escala(conn, args.scale)
+        conn.close()
+    elif conn:
         poblar_tablas(conn)
         conn.close()
         print("""
@@ -1,18 +1,27 @@
 import sqlite3
 from sqlite3 import Error
 
-def crear_conexion():
+from migraciones import aplicar_migraciones
+
+def crear_conexion(ruta='tienda.db', solo_lectura=False):
     """Crea una conexión a la base de datos SQLite"""
     try:
-        conn = sqlite3.connect('tienda.db')
+        if solo_lectura:
+            conn = sqlite3.connect(f"file:{ruta}?mode=ro", uri=True)
+        else:
+            conn = sqlite3.connect(ruta)
         conn.execute("PRAGMA foreign_keys = 1")  # Habilitar claves foráneas
         return conn
     except Error as e:
         print(e)
     return None
 
-def crear_tablas(conn):
-    """Crea todas las tablas de la base de datos"""
+def crear_tablas(conn, migrar=True):
+    """Crea todas las tablas de la base de datos y aplica las migraciones.
+
+    Las cargas masivas pueden pasar migrar=False y llamar a
+    aplicar_migraciones al final, para construir los índices una sola vez.
+    """
     tablas = [
         """
         CREATE TABLE IF NOT EXISTS categorias (
@@ -103,6 +112,11 @@ def crear_tablas(conn):
         conn.commit()
     except Error as e:
         print(f"Error al crear tablas: {e}")
+        return
+
+    # Índices y demás cambios versionados del esquema
+    if migrar:
+        aplicar_migraciones(conn)
 
 def insertar_datos_iniciales(conn):
     """Inserta datos de ejemplo para pruebas"""
@@ -1,12 +1,42 @@
 import streamlit as st
 import sqlite3
 import pandas as pd
+import plotly.express as px
 import os
+import time
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+
+from busqueda import ATRIBUTOS, consulta_busqueda, sql_valores_atributo
+from columnar import MotorColumnar, calcular_reportes
+from conexiones import CacheResultados, PoolLectura, verificar_base
+from consultas import (
+    REPORTES, SQL_TOTAL_VENTAS, SQL_CLIENTES_UNICOS,
+    SQL_PAGINA_DETALLE_SIGUIENTE, SQL_PAGINA_DETALLE_ANTERIOR, SQL_INICIO_VENTA
+)
+from evolucion import METRICAS, SQL_RANGO_FECHAS, resolucion_para, sql_serie
+from migraciones import VERSION_BUSQUEDA, VERSION_EVOLUCION, VERSION_RESUMENES, VERSION_SKETCHES
+from particiones import asegurar_vistas
+from perfilado import UMBRAL_LENTO_MS, Perfilador
+from publicar import MMAP_BYTES, snapshot_actual
+from respaldos import listar_respaldos
+from sketches import ERROR_MAXIMO, REPORTES_APROXIMADOS, preciso, sql_reporte_aproximado
 
 # Obtener la ruta absoluta del directorio donde se encuentra este script
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # Construir la ruta al archivo de la base de datos
 DB_PATH = os.path.join(BASE_DIR, "tienda.db")
+# Snapshot columnar opcional (ver columnar.py); se usa solo si está al día
+SNAPSHOT_DIR = os.environ.get("TIENDA_SNAPSHOT", os.path.join(BASE_DIR, "snapshot_columnar"))
+# Mensajes de diagnóstico de la conexión (TIENDA_DEBUG=1 para verlos)
+DEBUG = os.environ.get("TIENDA_DEBUG") == "1"
+# Log rotativo de consultas (JSON por línea) y umbral a partir del cual una consulta es lenta
+LOG_CONSULTAS = os.environ.get("TIENDA_LOG_CONSULTAS", os.path.join(BASE_DIR, "logs", "consultas.jsonl"))
+UMBRAL_LENTO = float(os.environ.get("TIENDA_UMBRAL_LENTO_MS", UMBRAL_LENTO_MS))
+# Snapshots creados con respaldos.py que se pueden consultar en lugar de la base en vivo
+RESPALDOS_DIR = os.environ.get("TIENDA_RESPALDOS", os.path.join(BASE_DIR, "respaldos"))
+# Snapshots publicados con publicar.py; si hay uno, se consulta en lugar de tienda.db
+PUBLICADO_DIR = os.environ.get("TIENDA_PUBLICADO", os.path.join(BASE_DIR, "publicado"))
 
 # Configuración de la página
 st.set_page_config(
@@ -15,289 +45,372 @@ st.set_page_config(
     layout="wide"
 )
 
-def get_db_connection():
-    """Establece conexión con la base de datos SQLite."""
-    st.write(f"Intentando conectar a: {DB_PATH}") # Para depuración
-    
-    if not os.path.exists(DB_PATH):
-        st.error(f"¡ERROR CRÍTICO! El archivo de base de datos NO se encuentra en: {DB_PATH}")
+@st.cache_resource(max_entries=8)  # cada publicación nueva es otra ruta: los pools viejos se descartan
+def get_db_pool(ruta=DB_PATH):
+    """Pool de conexiones de solo lectura compartido por todas las sesiones del proceso."""
+    # Conectar usando formato URI en modo de solo lectura (ro).
+    # Esto es crucial para entornos de solo lectura como Render.
+    # asegurar_vistas adjunta las ventas archivadas en particiones (ver particiones.py)
+    if ruta != DB_PATH:
+        # Un snapshot no cambia nunca: immutable=1 evita bloqueos y comprobaciones de cambios
+        return PoolLectura(ruta, parametros_uri="mode=ro&immutable=1", preparar=asegurar_vistas,
+                           pragmas=(f"PRAGMA mmap_size = {MMAP_BYTES}",))
+    return PoolLectura(ruta, preparar=asegurar_vistas)
+
+@st.cache_resource(max_entries=8)
+def get_result_cache(ruta=DB_PATH):
+    """Caché de resultados compartida; se invalida sola cuando cambia la base."""
+    return CacheResultados(ruta)
+
+@st.cache_resource
+def get_perfilador():
+    """Perfilador de consultas del proceso (registros recientes + log JSONL)."""
+    return Perfilador(LOG_CONSULTAS, umbral_lento_ms=UMBRAL_LENTO)
+
+@st.cache_resource
+def get_motor_columnar():
+    """Motor de reportes sobre el snapshot columnar, o None si no se ha exportado."""
+    if not os.path.exists(os.path.join(SNAPSHOT_DIR, "actual.json")):
+        return None
+    return MotorColumnar(SNAPSHOT_DIR)
+
+def motor_columnar_vigente():
+    """Devuelve el motor columnar solo si su snapshot refleja los datos actuales."""
+    motor = get_motor_columnar() if DIAGNOSTICO["ok"] else None
+    if motor is None or DIAGNOSTICO["version"] < VERSION_RESUMENES:
+        return None
+    try:
+        with get_db_pool(RUTA_DATOS).conexion() as conn:
+            return motor if motor.vigente(conn) else None
+    except (OSError, sqlite3.Error):
+        return None
+
+@st.cache_resource
+def verificar_conexion(ruta=DB_PATH):
+    """Verifica la base de datos una sola vez al arrancar el proceso."""
+    return verificar_base(ruta)
+
+def elegir_fuente():
+    """Selector de la base a consultar: la publicada (o la base en vivo) o uno de los snapshots."""
+    # El puntero se lee en cada ejecución: una publicación nueva se usa sin reiniciar la app
+    publicada = snapshot_actual(PUBLICADO_DIR)
+    respaldos = listar_respaldos(RESPALDOS_DIR)
+    if not respaldos:
+        return publicada or DB_PATH
+    if publicada:
+        opciones = {f"Publicada ({os.path.basename(publicada)})": publicada}
+    else:
+        opciones = {"Base en vivo (tienda.db)": DB_PATH}
+    for respaldo in respaldos:
+        opciones[f"📦 {respaldo['nombre']} ({respaldo['tamano'] / 1e6:.1f} MB)"] = respaldo["ruta"]
+    ruta = opciones[st.sidebar.selectbox("Fuente de datos", list(opciones))]
+    if ruta not in (DB_PATH, publicada):
+        st.sidebar.caption("Snapshot de solo lectura: los reportes muestran los datos del momento del respaldo.")
+    return ruta
+
+def mostrar_diagnostico(diagnostico):
+    """Muestra el estado de la base: errores siempre, el detalle solo en modo depuración."""
+    if not diagnostico["ok"]:
+        st.error(f"¡ERROR CRÍTICO! {diagnostico['error']}")
+    if not DEBUG:
+        return
+    st.write(f"Intentando conectar a: {diagnostico['ruta']}")
+    if diagnostico["tamano"] is None:
         # Lista los archivos en el directorio base para ver qué hay realmente allí
         try:
             st.info(f"Contenido del directorio '{BASE_DIR}': {os.listdir(BASE_DIR)}")
         except Exception as list_err:
             st.warning(f"No se pudo listar el contenido del directorio {BASE_DIR}: {list_err}")
-        return None
-    else:
-        # Muestra el tamaño del archivo para asegurarte de que no es un archivo vacío.
-        file_size = os.path.getsize(DB_PATH)
-        st.success(f"Archivo de base de datos ENCONTRADO en: {DB_PATH} (Tamaño: {file_size} bytes)")
-        if file_size == 0:
-            st.warning("Advertencia: El archivo de base de datos tiene un tamaño de 0 bytes. ¿Está vacío?")
+        return
+    st.success(f"Archivo de base de datos ENCONTRADO en: {diagnostico['ruta']} (Tamaño: {diagnostico['tamano']} bytes)")
+    if diagnostico["tamano"] == 0:
+        st.warning("Advertencia: El archivo de base de datos tiene un tamaño de 0 bytes. ¿Está vacío?")
+    st.info(f"Tablas encontradas en la base de datos: {diagnostico['tablas']}")
+    if diagnostico["ok"]:
+        st.success("Conexión exitosa a SQLite y la tabla 'detalle_ventas' FUE encontrada.")
 
-    try:
-        # -- CAMBIO IMPORTANTE AQUÍ --
-        # Conectar usando formato URI para especificar modo de solo lectura (ro)
-        # Esto es crucial para entornos de solo lectura como Render.
-        conn_uri = f"file:{DB_PATH}?mode=ro"
-        # Alternativa (aún más estricta si estás 100% seguro de que el archivo no cambiará):
-        # conn_uri = f"file:{DB_PATH}?immutable=1"
-        
-        conn = sqlite3.connect(conn_uri, uri=True)
-        
-        # Verificar si la conexión es válida y si la tabla específica existe
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='detalle_ventas';")
-        table_exists = cursor.fetchone()
-        
-        if table_exists:
-            st.success("Conexión exitosa a SQLite y la tabla 'detalle_ventas' FUE encontrada.")
-        else:
-            st.error("Conexión exitosa a SQLite, PERO la tabla 'detalle_ventas' NO FUE encontrada.")
-            # Listar todas las tablas encontradas para ayudar a depurar
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-            all_tables = cursor.fetchall()
-            st.info(f"Tablas encontradas en la base de datos: {all_tables}")
-            if not all_tables:
-                st.warning("La base de datos parece estar vacía (no se encontraron tablas).")
-
-        return conn
-    except sqlite3.Error as e:
-        st.error(f"Error de SQLite al conectar o verificar la tabla: {e}")
-        return None
-    except Exception as e: # Captura otros posibles errores en la conexión
-        st.error(f"Error inesperado durante la configuración de la conexión: {e}")
-        return None
+@st.cache_resource
+def get_precalculo():
+    """Hilos compartidos por todas las sesiones que adelantan los reportes no visibles."""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="precalculo")
+
+def _consultar_df(pool, perfilador, query, params, rango=()):
+    """Ejecuta la consulta con perfilado y devuelve (DataFrame, registro); no usa st."""
+    columnas, filas, registro = perfilador.consultar(pool, query, params, rango)
+    return pd.DataFrame.from_records(filas, columns=columnas, coerce_float=True), registro
 
-def execute_query(query, params=None):
-    """Ejecuta una consulta SQL y devuelve los resultados en un DataFrame."""
-    conn = get_db_connection()
-    if conn is None:
+def execute_query(query, params=None, rango=()):
+    """Ejecuta una consulta SQL y devuelve los resultados en un DataFrame.
+
+    Con rango=(desde, hasta) la conexión adjunta solo las particiones de esas fechas.
+    """
+    if not DIAGNOSTICO["ok"]:
         return pd.DataFrame()  # Retorna un DataFrame vacío si no hay conexión
-        
+
+    perfilador = get_perfilador()
+    medidas = []
+
+    def consultar():
+        df, registro = _consultar_df(get_db_pool(RUTA_DATOS), perfilador, query, params, rango)
+        medidas.append(registro)
+        return df
+
     try:
-        if params:
-            df = pd.read_sql_query(query, conn, params=params)
-        else:
-            df = pd.read_sql_query(query, conn)
+        inicio = time.perf_counter()
+        # Copia para que quien llame no pueda modificar el resultado guardado
+        df = get_result_cache(RUTA_DATOS).obtener(query, params, consultar).copy()
+        registro = medidas[0] if medidas else perfilador.acierto_cache(
+            query, params, (time.perf_counter() - inicio) * 1000)
+        PERFIL_EJECUCION.append(perfilador.guardar(registro))
         return df
     except sqlite3.Error as e:
         st.error(f"Error al ejecutar la consulta: {e}")
         st.code(query)  # Muestra la consulta que falló
         return pd.DataFrame()  # Retorna un DataFrame vacío en caso de error
-    finally:
-        if conn:
-            conn.close()
 
-# Título de la aplicación
-st.title("📊 Análisis de Ventas - Tienda de Abarrotes y Papelería")
-st.markdown("---")
+def _precalcular(cache, pool, perfilador, sql):
+    """Calcula un reporte en segundo plano y lo deja en la caché compartida."""
+    def calcular():
+        df, registro = _consultar_df(pool, perfilador, sql, None)
+        registro["origen"] = "precalculo"
+        perfilador.guardar(registro)
+        return df
+    try:
+        cache.obtener(sql, None, calcular)
+    except sqlite3.Error:
+        pass  # El error se mostrará si alguien abre ese reporte
 
-# Crear pestañas para cada pregunta del examen
-tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
-    "1. Productos más vendidos",
-    "2. Clientes más frecuentes",
-    "3. Categoría más popular",
-    "4. Cliente estrella por categoría",
-    "5. Proveedores más utilizados",
-    "6. Categorías más rentables",
-    "7. Mayor compra en cantidad"
-])
-
-# Pregunta 1: Productos más vendidos
-with tab1:
-    st.header("1. ¿Cuáles son los productos más vendidos?")
-    
-    # Mostrar la consulta SQL
-    sql_query = """
-    SELECT dv.id_producto, p.nombre_producto, count(*) as 'n° ventas'
-    FROM detalle_ventas dv
-    INNER JOIN productos p ON p.id_producto = dv.id_producto
-    GROUP BY dv.id_producto
-    ORDER BY 3 DESC
-    LIMIT 5
-    """
-    
-    with st.expander("🔍 Ver consulta SQL"):
-        st.code(sql_query, language="sql")
-    
-    # Ejecutar y mostrar resultados
-    df = execute_query(sql_query)
-    if not df.empty:
-        st.dataframe(df, use_container_width=True)
-    else:
-        st.warning("No se encontraron datos para mostrar.")
+def precalcular_reportes(excepto=None):
+    """Encola en segundo plano los reportes que no se están mirando y aún no están en caché."""
+    if not DIAGNOSTICO["ok"]:
+        return
+    cache, pool, perfilador = get_result_cache(RUTA_DATOS), get_db_pool(RUTA_DATOS), get_perfilador()
+    for reporte in REPORTES:
+        sql = sql_reporte(reporte)
+        if reporte["clave"] != excepto and not cache.contiene(sql):
+            get_precalculo().submit(_precalcular, cache, pool, perfilador, sql)
 
-# Pregunta 2: Clientes más frecuentes
-with tab2:
-    st.header("2. ¿Qué clientes han realizado más compras y cuánto han gastado en total?")
-    
-    # Mostrar la consulta SQL
-    sql_query = """
-    SELECT v.id_cliente, c.nombre, count(*) as 'total_compras', 
-           SUM(dv.precio_unitario * dv.cantidad) as total_gastado
-    FROM ventas v
-    INNER JOIN detalle_ventas dv ON dv.id_venta = v.id_venta
-    INNER JOIN clientes c ON v.id_cliente = c.id_cliente
-    GROUP BY v.id_cliente
-    HAVING v.id_cliente IS NOT NULL
-    ORDER BY total_compras DESC
-    LIMIT 3
-    """
-    
-    with st.expander("🔍 Ver consulta SQL"):
-        st.code(sql_query, language="sql")
-    
-    # Ejecutar y mostrar resultados
-    df = execute_query(sql_query)
-    if not df.empty:
-        st.dataframe(df.style.format({"total_gastado": "S/. {:.2f}"}), use_container_width=True)
-    else:
-        st.warning("No se encontraron datos para mostrar.")
+def reportes_pasada_unica():
+    """Los siete reportes calculados juntos en una pasada por detalle_ventas (compartidos vía caché)."""
+    def calcular():
+        with get_db_pool(RUTA_DATOS).conexion() as conn:
+            return calcular_reportes(conn)
+    return get_result_cache(RUTA_DATOS).obtener("columnar.calcular_reportes", None, calcular)
 
-# Pregunta 3: Categoría más popular
-with tab3:
-    st.header("3. ¿Cuál es la categoría más popular en ventas?")
-    
-    # Mostrar la consulta SQL
-    sql_query = """
-    SELECT ca.id_categoria, ca.nombre_categoria, count(*) as 'n° ventas' 
-    FROM detalle_ventas dv
-    INNER JOIN productos p ON dv.id_producto = p.id_producto
-    INNER JOIN categorias ca ON p.id_categoria = ca.id_categoria
-    GROUP BY ca.id_categoria
-    ORDER BY 3 DESC
-    LIMIT 1
-    """
-    
-    with st.expander("🔍 Ver consulta SQL"):
-        st.code(sql_query, language="sql")
-    
-    # Ejecutar y mostrar resultados
-    df = execute_query(sql_query)
-    if not df.empty:
-        st.dataframe(df, use_container_width=True)
-    else:
-        st.warning("No se encontraron datos para mostrar.")
+def mostrar_perfil():
+    """Panel con el tiempo, filas y plan de las consultas de esta ejecución."""
+    perfilador = get_perfilador()
+    with st.expander(f"⏱️ Perfil de consultas ({len(PERFIL_EJECUCION)})"):
+        if not PERFIL_EJECUCION:
+            st.caption("No se ejecutaron consultas en esta recarga.")
+            return
+        tabla = pd.DataFrame([{
+            "consulta": " ".join(r["sql"].split())[:60],
+            "origen": r["origen"],
+            "total ms": r["ms_total"],
+            "conexión ms": r.get("ms_conexion"),
+            "ejecución ms": r.get("ms_ejecucion"),
+            "lectura ms": r.get("ms_lectura"),
+            "filas": r.get("filas"),
+            "pasos VM": r.get("pasos_vm"),
+            "lenta": r["lenta"],
+        } for r in PERFIL_EJECUCION])
+        st.dataframe(tabla.style.format(precision=2, na_rep="—"), hide_index=True, use_container_width=True)
+        st.caption(f"Total {tabla['total ms'].sum():.1f} ms · umbral de lentitud {perfilador.umbral_lento_ms:.0f} ms · "
+                   f"{perfilador.lentas} consulta(s) lenta(s) desde que arrancó el proceso")
+        for r in PERFIL_EJECUCION:
+            if r["lenta"]:
+                st.warning(f"Consulta lenta ({r['ms_total']:.1f} ms): {' '.join(r['sql'].split())[:80]}")
+                if r.get("plan"):
+                    st.code("\n".join(r["plan"]))
 
-# Pregunta 4: Cliente estrella por categoría
-with tab4:
-    st.header("4. ¿Qué cliente ha realizado más compras de la categoría más popular?")
-    
-    # Mostrar la consulta SQL
-    sql_query = """
-    SELECT cli.nombre, cat.nombre_categoria, COUNT(*) as 'n° ventas' 
-    FROM detalle_ventas dv
-    INNER JOIN productos p ON dv.id_producto = p.id_producto
-    INNER JOIN categorias cat ON p.id_categoria = cat.id_categoria
-    INNER JOIN ventas v on dv.id_venta = v.id_venta
-    INNER JOIN clientes cli ON v.id_cliente = cli.id_cliente
-    GROUP BY cli.nombre, cat.nombre_categoria
-    HAVING cat.nombre_categoria = ( 
-        SELECT nombre_categoria FROM (
-            SELECT ca.id_categoria, ca.nombre_categoria, count(*) as ventas 
-            FROM detalle_ventas dv
-            INNER JOIN productos p ON dv.id_producto = p.id_producto
-            INNER JOIN categorias ca ON p.id_categoria = ca.id_categoria
-            GROUP BY ca.id_categoria
-            ORDER BY 3 DESC
-            LIMIT 1
-        )
-    )
-    ORDER BY 3 DESC
-    LIMIT 1
+def _ir_a_venta():
+    """Salta a la primera línea de la venta indicada en el explorador."""
+    inicio = execute_query(SQL_INICIO_VENTA, (int(st.session_state.explorador_venta),))
+    if not inicio.empty and pd.notna(inicio['inicio'].iloc[0]):
+        st.session_state.explorador_despues_de = int(inicio['inicio'].iloc[0]) - 1
+
+def _pagina_anterior(primer_id, tamano):
+    """Retrocede una página buscando hacia atrás desde la primera fila visible."""
+    anterior = execute_query(SQL_PAGINA_DETALLE_ANTERIOR, (primer_id, tamano))
+    st.session_state.explorador_despues_de = int(anterior['id_detalle_venta'].min()) - 1 if not anterior.empty else 0
+
+def _pagina_siguiente(ultimo_id):
+    st.session_state.explorador_despues_de = ultimo_id
+
+def mostrar_explorador_ventas():
+    """Recorre detalle_ventas página a página con paginación por clave.
+
+    Solo se lee la página visible, así que la memoria depende del tamaño de
+    página y no del tamaño de la tabla.
     """
-    
-    with st.expander("🔍 Ver consulta SQL"):
-        st.code(sql_query, language="sql")
-    
-    # Ejecutar y mostrar resultados
-    df = execute_query(sql_query)
-    if not df.empty:
-        st.dataframe(df, use_container_width=True)
-    else:
+    st.session_state.setdefault("explorador_despues_de", 0)
+    col_tamano, col_venta = st.columns(2)
+    tamano = col_tamano.selectbox("Filas por página", [25, 50, 100, 250], index=1)
+    col_venta.number_input("Ir a la venta N°", min_value=1, step=1, key="explorador_venta", on_change=_ir_a_venta)
+
+    df = execute_query(SQL_PAGINA_DETALLE_SIGUIENTE, (st.session_state.explorador_despues_de, tamano))
+    if df.empty:
         st.warning("No se encontraron datos para mostrar.")
+        return
+    st.dataframe(
+        df.style.format({"precio_unitario": "S/. {:.2f}", "subtotal": "S/. {:.2f}"}),
+        use_container_width=True, hide_index=True
+    )
+    primer_id, ultimo_id = int(df['id_detalle_venta'].iloc[0]), int(df['id_detalle_venta'].iloc[-1])
+    col_anterior, col_info, col_siguiente = st.columns([1, 2, 1])
+    col_anterior.button("⬅️ Anterior", on_click=_pagina_anterior, args=(primer_id, tamano),
+                        disabled=st.session_state.explorador_despues_de == 0)
+    col_info.caption(f"Líneas {primer_id:,} a {ultimo_id:,}")
+    col_siguiente.button("Siguiente ➡️", on_click=_pagina_siguiente, args=(ultimo_id,),
+                         disabled=len(df) < tamano)
 
-# Pregunta 5: Proveedores más utilizados
-with tab5:
-    st.header("5. ¿Qué proveedores han sido más utilizados y cuántas compras se han realizado a cada uno?")
-    
-    # Mostrar la consulta SQL
-    sql_query = """
-    SELECT prov.nombre_proveedor, COUNT(*) as 'n° compras'
-    FROM detalle_compras dc
-    INNER JOIN compras c ON dc.id_compra = c.id_compra
-    INNER JOIN proveedores prov ON c.id_proveedor = prov.id_proveedor
-    GROUP BY prov.nombre_proveedor
-    ORDER BY 2 DESC
+def mostrar_busqueda():
+    """Búsqueda de productos por texto (FTS5) y por atributos de sus especificaciones."""
+    if DIAGNOSTICO["version"] < VERSION_BUSQUEDA:
+        st.info("La búsqueda necesita la migración 4: ejecuta `python migraciones.py`.")
+        return
+    texto = st.text_input("Nombre, marca, categoría o especificaciones", placeholder="ej. cuaderno azul")
+    filtros = {}
+    for columna, atributo in zip(st.columns(len(ATRIBUTOS)), ATRIBUTOS):
+        valores = execute_query(sql_valores_atributo(atributo))
+        opciones = ["(todos)"] + (valores["valor"].tolist() if not valores.empty else [])
+        eleccion = columna.selectbox(atributo.replace("_", " ").capitalize(), opciones, key=f"busqueda_{atributo}")
+        filtros[atributo] = None if eleccion == "(todos)" else eleccion
+    if not texto.strip() and not any(filtros.values()):
+        st.caption("Escribe una o más palabras (se buscan como prefijos) o elige un atributo.")
+        return
+    sql, params = consulta_busqueda(texto, filtros)
+    df = execute_query(sql, params)
+    if df.empty:
+        st.warning("Ningún producto coincide con la búsqueda.")
+        return
+    st.dataframe(df.style.format({"precio_venta": "S/. {:.2f}"}), use_container_width=True, hide_index=True)
+
+def mostrar_evolucion():
+    """Serie de ventas por día, semana o mes calculada en la base desde el resumen diario.
+
+    La base agrupa al nivel elegido (o al más fino con pocos puntos para el
+    rango), así que al gráfico llegan a lo sumo unos cientos de puntos.
     """
-    
-    with st.expander("🔍 Ver consulta SQL"):
-        st.code(sql_query, language="sql")
-    
-    # Ejecutar y mostrar resultados
-    df = execute_query(sql_query)
-    if not df.empty:
-        st.dataframe(df, use_container_width=True)
-    else:
+    if DIAGNOSTICO["version"] < VERSION_EVOLUCION:
+        st.info("La evolución de ventas necesita la migración 7: ejecuta `python migraciones.py`.")
+        return
+    rango = execute_query(SQL_RANGO_FECHAS)
+    if rango.empty or rango.iloc[0, 0] is None:
         st.warning("No se encontraron datos para mostrar.")
+        return
+    primero, ultimo = (date.fromisoformat(valor) for valor in rango.iloc[0])
+    col_rango, col_resolucion, col_metrica = st.columns([2, 1, 1])
+    elegido = col_rango.date_input("Rango de fechas", (primero, ultimo), min_value=primero, max_value=ultimo,
+                                   key="evolucion_rango")
+    if len(elegido) != 2:
+        st.caption("Elige también la fecha final del rango.")
+        return
+    desde, hasta = (dia.isoformat() for dia in elegido)
+    resoluciones = {"Automática": None, "Día": "dia", "Semana": "semana", "Mes": "mes"}
+    resolucion = (resoluciones[col_resolucion.selectbox("Resolución", list(resoluciones), key="evolucion_resolucion")]
+                  or resolucion_para(desde, hasta))
+    metrica = col_metrica.selectbox("Métrica", list(METRICAS), key="evolucion_metrica")
+    por_categoria = st.toggle("Separar por categoría", key="evolucion_por_categoria")
 
-# Pregunta 6: Categorías más rentables
-with tab6:
-    st.header("6. ¿Qué categorías de productos generan más ingresos en ventas?")
-    
-    # Mostrar la consulta SQL
-    sql_query = """
-    SELECT ca.id_categoria, ca.nombre_categoria, count(*) as 'n° ventas', 
-           SUM(dv.cantidad * dv.precio_unitario) as 'total_venta' 
-    FROM detalle_ventas dv
-    INNER JOIN productos p ON dv.id_producto = p.id_producto
-    INNER JOIN categorias ca ON p.id_categoria = ca.id_categoria
-    GROUP BY ca.id_categoria
-    ORDER BY 4 DESC
-    """
-    
-    with st.expander("🔍 Ver consulta SQL"):
-        st.code(sql_query, language="sql")
-    
-    # Ejecutar y mostrar resultados
-    df = execute_query(sql_query)
-    if not df.empty:
-        st.dataframe(df.style.format({"total_venta": "S/. {:.2f}"}), use_container_width=True)
-    else:
+    # Solo hacen falta las particiones archivadas del rango elegido
+    df = execute_query(sql_serie(resolucion, por_categoria), {"desde": desde, "hasta": hasta}, rango=(desde, hasta))
+    if df.empty:
         st.warning("No se encontraron datos para mostrar.")
+        return
+    figura = px.line(df, x="periodo", y=METRICAS[metrica], color="categoria" if por_categoria else None,
+                     markers=df["periodo"].nunique() <= 60, labels={"periodo": "", METRICAS[metrica]: metrica})
+    st.plotly_chart(figura, use_container_width=True)
+    nombre = next(clave for clave, valor in resoluciones.items() if valor == resolucion).lower()
+    st.caption(f"{df['periodo'].nunique():,} puntos por {nombre} del {desde} al {hasta}.")
+
+def sql_reporte(reporte):
+    """SQL del reporte; con las tablas de resumen disponibles no recorre detalle_ventas."""
+    if reporte["sql_resumen"] and DIAGNOSTICO["version"] >= VERSION_RESUMENES:
+        return reporte["sql_resumen"]
+    return reporte["sql"]
+
+def mostrar_reporte(reporte, motor):
+    """Muestra la pregunta, la consulta y el resultado de un reporte."""
+    st.header(reporte["pregunta"])
+    # Los tops de productos y clientes salen de los sketches salvo que se pida el exacto o sus cotas sean anchas
+    aproximado = (reporte["clave"] in REPORTES_APROXIMADOS and DIAGNOSTICO["ok"]
+                  and DIAGNOSTICO["version"] >= VERSION_SKETCHES
+                  and not st.toggle("Resultado exacto", key=f"exacto_{reporte['clave']}",
+                                    help="Recorre todas las ventas en lugar de leer los sketches del top."))
+    impreciso = False
+    if aproximado:
+        df = execute_query(sql_reporte_aproximado(reporte["clave"]), {"desde": None, "hasta": None})
+        # Si las cotas son anchas (p. ej. muchos clientes con pocas compras cada uno) se muestra el exacto
+        impreciso = not df.empty and not preciso(zip(df["cota_inferior"], df["cota_superior"]))
+        aproximado = not impreciso
+    sql_query = sql_reporte_aproximado(reporte["clave"]) if aproximado else sql_reporte(reporte)
 
-# Pregunta 7: Mayor compra en cantidad
-with tab7:
-    st.header("7. ¿Cuál ha sido la compra con la mayor cantidad de productos?")
-    
     # Mostrar la consulta SQL
-    sql_query = """
-    SELECT dv.id_venta, cli.nombre, SUM(dv.cantidad) as 'productos_vendidos' 
-    FROM detalle_ventas dv
-    INNER JOIN ventas v on dv.id_venta = v.id_venta
-    INNER JOIN clientes cli ON v.id_cliente = cli.id_cliente
-    GROUP BY dv.id_venta
-    HAVING SUM(dv.cantidad) = (
-        SELECT MAX(p_vendidos.productos_vendidos) FROM (
-            SELECT dv.id_venta, cli.nombre, SUM(dv.cantidad) as 'productos_vendidos'
-            FROM detalle_ventas dv
-            INNER JOIN ventas v on dv.id_venta = v.id_venta
-            INNER JOIN clientes cli ON v.id_cliente = cli.id_cliente
-            GROUP BY dv.id_venta
-        ) as p_vendidos
-    )
-    """
-    
     with st.expander("🔍 Ver consulta SQL"):
         st.code(sql_query, language="sql")
-    
+
     # Ejecutar y mostrar resultados
-    df = execute_query(sql_query)
+    if impreciso:
+        st.caption(f"El top aproximado tiene un error mayor que {ERROR_MAXIMO:.0%}: se muestra el resultado exacto.")
+    if aproximado:
+        st.caption("≈ Top aproximado: cada cuenta está entre cota_inferior y cota_superior. "
+                   "Activa «Resultado exacto» para ver las cuentas exactas.")
+    elif motor is not None:
+        df = motor.reporte(reporte["clave"])
+        st.caption("⚡ Calculado sobre el snapshot columnar (al día con la base de datos).")
+    elif DIAGNOSTICO["ok"] and DIAGNOSTICO["version"] < VERSION_RESUMENES:
+        # Sin tablas de resumen, una sola pasada por detalle_ventas sirve a todos los reportes
+        df = reportes_pasada_unica()[reporte["clave"]].copy()
+        st.caption("Calculado junto con los demás reportes en una sola pasada por las ventas.")
+    else:
+        df = execute_query(sql_query)
     if not df.empty:
-        st.dataframe(df, use_container_width=True)
+        if reporte["formato"]:
+            st.dataframe(df.style.format(reporte["formato"]), use_container_width=True)
+        else:
+            st.dataframe(df, use_container_width=True)
     else:
         st.warning("No se encontraron datos para mostrar.")
 
+# Registros de perfilado de esta ejecución del script (se reinicia en cada recarga)
+PERFIL_EJECUCION = []
+RUTA_DATOS = elegir_fuente()
+DIAGNOSTICO = verificar_conexion(RUTA_DATOS)
+mostrar_diagnostico(DIAGNOSTICO)
+
+# Título de la aplicación
+st.title("📊 Análisis de Ventas - Tienda de Abarrotes y Papelería")
+st.markdown("---")
+
+# Solo se calcula la sección elegida; los demás reportes se adelantan en segundo plano
+EXPLORADOR = "8. Explorador de ventas"
+BUSQUEDA = "9. Buscar productos"
+EVOLUCION = "10. Evolución de ventas"
+seccion = st.radio("Sección", [reporte["pestana"] for reporte in REPORTES] + [EXPLORADOR, BUSQUEDA, EVOLUCION],
+                   horizontal=True, label_visibility="collapsed", key="seccion")
+motor = motor_columnar_vigente()
+reporte = next((r for r in REPORTES if r["pestana"] == seccion), None)
+
+if reporte is not None:
+    mostrar_reporte(reporte, motor)
+elif seccion == EXPLORADOR:
+    # Explorador de líneas de venta
+    st.header("8. Explorador de líneas de venta")
+    mostrar_explorador_ventas()
+elif seccion == BUSQUEDA:
+    # Búsqueda de productos
+    st.header("9. Buscar productos")
+    mostrar_busqueda()
+else:
+    # Ventas en el tiempo
+    st.header("10. Evolución de ventas")
+    mostrar_evolucion()
+
+if motor is None and DIAGNOSTICO["version"] >= VERSION_RESUMENES:
+    precalcular_reportes(excepto=reporte["clave"] if reporte else None)
+
 # Información adicional en la barra lateral
 with st.sidebar:
     st.title("ℹ️ Información")
@@ -313,16 +426,19 @@ with st.sidebar:
     - Evolución de ventas
     - Análisis por proveedor
     
-    *Selecciona una pestaña para ver los diferentes informes.*
+    *Elige una sección arriba para ver los diferentes informes.*
     """)
     
     # Mostrar estadísticas rápidas
     try:
-        total_ventas = execute_query("SELECT COUNT(*) as total FROM ventas")['total'].iloc[0]
-        total_clientes = execute_query("SELECT COUNT(DISTINCT id_cliente) as total FROM ventas WHERE id_cliente IS NOT NULL")['total'].iloc[0]
+        total_ventas = execute_query(SQL_TOTAL_VENTAS)['total'].iloc[0]
+        total_clientes = execute_query(SQL_CLIENTES_UNICOS)['total'].iloc[0]
         
         st.markdown("---")
         st.metric("Total de Ventas", f"{total_ventas:,}")
         st.metric("Clientes Únicos", f"{total_clientes:,}")
     except:
         pass
+
+    st.markdown("---")
+    mostrar_perfil()
@@ -0,0 +1,164 @@
+"""Benchmark de los reportes del dashboard a distintos tamaños de datos.
+
+Construye bases con crear_tablas + poblar_tablas_escala para cada escala,
+mide cada consulta de consultas.py en frío (conexión nueva, caché de
+páginas vacía) y en caliente (misma conexión, ya ejecutada), guarda el
+plan de EXPLAIN QUERY PLAN y el número de filas, y escribe todo en JSON.
+Con --linea-base compara contra una corrida anterior y termina con error
+si algún reporte se volvió más lento o empezó a recorrer tablas enteras.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import add_records
+from app import crear_conexion, crear_tablas
+from consultas import REPORTES
+from migraciones import aplicar_migraciones, recorridos_completos
+
+DIRECTORIO_BASES = '.bench'
+ESCALAS_DEFECTO = [1, 10, 100]
+TABLAS_CONTADAS = ['clientes', 'ventas', 'detalle_ventas', 'compras', 'detalle_compras']
+
+def construir_base(escala, semilla=0, reconstruir=False):
+    """Crea (o reutiliza) la base de benchmark de una escala"""
+    os.makedirs(DIRECTORIO_BASES, exist_ok=True)
+    ruta = os.path.join(DIRECTORIO_BASES, f"escala_{escala}.db")
+    if os.path.exists(ruta) and not reconstruir:
+        return ruta
+    if os.path.exists(ruta):
+        os.remove(ruta)
+    random.seed(semilla)
+    add_records.fake.seed_instance(semilla)
+    conn = crear_conexion(ruta)
+    crear_tablas(conn, migrar=False)  # los índices se construyen una vez, después de la carga
+    add_records.poblar_tablas_escala(conn, escala)
+    aplicar_migraciones(conn)
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+    return ruta
+
+def consultas_a_medir():
+    """(nombre, sql) de cada reporte y de su variante sobre tablas de resumen"""
+    for reporte in REPORTES:
+        yield reporte["clave"], reporte["sql"]
+        if reporte["sql_resumen"]:
+            yield f"{reporte['clave']}:resumen", reporte["sql_resumen"]
+
+def _medir(conn, sql):
+    inicio = time.perf_counter()
+    filas = conn.execute(sql).fetchall()
+    return (time.perf_counter() - inicio) * 1000, len(filas)
+
+def medir_consulta(ruta, sql, repeticiones=5):
+    """Tiempos en ms (mediana) en frío y en caliente, filas y plan de una consulta"""
+    frios = []
+    for _ in range(repeticiones):
+        conn = sqlite3.connect(f"file:{ruta}?mode=ro", uri=True)
+        frios.append(_medir(conn, sql)[0])
+        conn.close()
+
+    conn = sqlite3.connect(f"file:{ruta}?mode=ro", uri=True)
+    _, n_filas = _medir(conn, sql)  # calienta la caché de páginas de esta conexión
+    calientes = [_medir(conn, sql)[0] for _ in range(repeticiones)]
+    plan = [fila[3] for fila in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+    scans = recorridos_completos(conn, sql)
+    conn.close()
+    return {
+        "ms_frio": round(statistics.median(frios), 3),
+        "ms_caliente": round(statistics.median(calientes), 3),
+        "filas": n_filas,
+        "plan": plan,
+        "scans_completos": scans,
+    }
+
+def ejecutar_benchmark(escalas, repeticiones=5, semilla=0, reconstruir=False):
+    """Corre el benchmark completo y devuelve los resultados como diccionario"""
+    resultados = {
+        "fecha": datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "repeticiones": repeticiones,
+        "escalas": {},
+    }
+    for escala in escalas:
+        ruta = construir_base(escala, semilla, reconstruir)
+        conn = sqlite3.connect(f"file:{ruta}?mode=ro", uri=True)
+        conteos = {tabla: conn.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0] for tabla in TABLAS_CONTADAS}
+        conn.close()
+        consultas = {}
+        for nombre, sql in consultas_a_medir():
+            consultas[nombre] = medir_consulta(ruta, sql, repeticiones)
+            print(f"escala {escala:>6} | {nombre:<32} | frío {consultas[nombre]['ms_frio']:>9.2f} ms"
+                  f" | caliente {consultas[nombre]['ms_caliente']:>9.2f} ms | {consultas[nombre]['filas']} filas")
+        resultados["escalas"][str(escala)] = {
+            "tamano_bytes": os.path.getsize(ruta),
+            "filas_tablas": conteos,
+            "consultas": consultas,
+        }
+    return resultados
+
+def comparar(resultados, linea_base, tolerancia=0.25, minimo_ms=2.0):
+    """Lista las regresiones respecto a la línea base.
+
+    Una consulta empeora si su tiempo en caliente o en frío supera el de la
+    línea base en más de `tolerancia` (relativo) y en más de `minimo_ms`
+    (para ignorar ruido en consultas de microsegundos), o si aparece un
+    SCAN completo que antes no estaba.
+    """
+    regresiones = []
+    for escala, datos in resultados["escalas"].items():
+        base_escala = linea_base.get("escalas", {}).get(escala)
+        if not base_escala:
+            continue
+        for nombre, medida in datos["consultas"].items():
+            base = base_escala["consultas"].get(nombre)
+            if not base:
+                continue
+            for clave in ("ms_caliente", "ms_frio"):
+                limite = max(base[clave] * (1 + tolerancia), base[clave] + minimo_ms)
+                if medida[clave] > limite:
+                    regresiones.append(
+                        f"escala {escala} · {nombre}: {clave} {medida[clave]:.2f} ms > "
+                        f"{base[clave]:.2f} ms de la línea base"
+                    )
+            nuevos = set(medida["scans_completos"]) - set(base["scans_completos"])
+            if nuevos:
+                regresiones.append(f"escala {escala} · {nombre}: nuevos SCAN completos {sorted(nuevos)}")
+    return regresiones
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark de las consultas de reportes")
+    parser.add_argument('--escalas', type=int, nargs='+', default=ESCALAS_DEFECTO, help="Escalas a medir")
+    parser.add_argument('--repeticiones', type=int, default=5, help="Repeticiones por medición")
+    parser.add_argument('--seed', type=int, default=0, help="Semilla de los datos generados")
+    parser.add_argument('--reconstruir', action='store_true', help="Regenerar las bases aunque existan")
+    parser.add_argument('--salida', default='bench_resultados.json', help="Archivo JSON de resultados")
+    parser.add_argument('--linea-base', default=None, help="JSON de una corrida anterior para comparar")
+    parser.add_argument('--tolerancia', type=float, default=0.25, help="Empeoramiento relativo permitido")
+    parser.add_argument('--minimo-ms', type=float, default=2.0, help="Empeoramiento absoluto mínimo para fallar")
+    args = parser.parse_args()
+
+    resultados = ejecutar_benchmark(args.escalas, args.repeticiones, args.seed, args.reconstruir)
+    with open(args.salida, 'w', encoding='utf-8') as archivo:
+        json.dump(resultados, archivo, ensure_ascii=False, indent=2)
+    print(f"Resultados guardados en '{args.salida}'.")
+
+    if args.linea_base:
+        with open(args.linea_base, encoding='utf-8') as archivo:
+            linea_base = json.load(archivo)
+        regresiones = comparar(resultados, linea_base, args.tolerancia, args.minimo_ms)
+        if regresiones:
+            print(f"\n¡REGRESIÓN DE RENDIMIENTO! {len(regresiones)} problema(s) frente a '{args.linea_base}':")
+            for regresion in regresiones:
+                print(f"  - {regresion}")
+            sys.exit(1)
+        print(f"Sin regresiones frente a '{args.linea_base}'.")
@@ -0,0 +1,142 @@
+"""Búsqueda de productos por texto y por atributos de especificaciones.
+
+productos_fts es un índice FTS5 sobre nombre, marca, categoría y los
+valores del JSON de especificaciones, mantenido por triggers. Los atributos
+más consultados del JSON (tipo, tipo_hoja, color, empaque) son columnas
+generadas de productos con su propio índice, así que filtrar por ellos no
+recorre la tabla ni interpreta JSON en Python. La migración 4 crea todo.
+"""
+import argparse
+import re
+import sqlite3
+
+# Columna generada -> expresión sobre el JSON (json_valid evita errores con JSON mal formado)
+ATRIBUTOS = {
+    "tipo": "json_extract(especificaciones, '$.tipo')",
+    "tipo_hoja": "json_extract(especificaciones, '$.tipo_hoja')",
+    "color": "COALESCE(json_extract(especificaciones, '$.color'), json_extract(especificaciones, '$.color_portada'))",
+    "empaque": "json_extract(especificaciones, '$.empaque')",
+}
+
+def _fila_fts(fila):
+    """SELECT con los campos indexados del producto `fila` (new, old o p)"""
+    return f"""
+        SELECT {fila}.id_producto, {fila}.nombre_producto,
+               (SELECT nombre_marca FROM marcas WHERE id_marca = {fila}.id_marca),
+               (SELECT nombre_categoria FROM categorias WHERE id_categoria = {fila}.id_categoria),
+               CASE WHEN json_valid({fila}.especificaciones)
+                    THEN (SELECT group_concat(value, ' ') FROM json_each({fila}.especificaciones)) END"""
+
+_INSERTAR_FTS = "INSERT INTO productos_fts (rowid, nombre, marca, categoria, especificaciones)"
+
+ESQUEMA_BUSQUEDA = [
+    f"""ALTER TABLE productos ADD COLUMN {columna} TEXT
+        GENERATED ALWAYS AS (CASE WHEN json_valid(especificaciones) THEN {expresion} END) VIRTUAL"""
+    for columna, expresion in ATRIBUTOS.items()
+] + [
+    f"CREATE INDEX IF NOT EXISTS idx_productos_{columna} ON productos({columna})" for columna in ATRIBUTOS
+] + [
+    # Sin tildes al comparar ('papeleria' encuentra 'Papelería') y con prefijos para buscar mientras se escribe
+    """CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5(
+        nombre, marca, categoria, especificaciones,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )""",
+]
+
+TRIGGERS_BUSQUEDA = {
+    "trg_productos_fts_ins": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_productos_fts_ins AFTER INSERT ON productos BEGIN
+            {_INSERTAR_FTS} {_fila_fts('new')};
+        END""",
+    "trg_productos_fts_upd": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_productos_fts_upd
+        AFTER UPDATE OF nombre_producto, id_marca, id_categoria, especificaciones ON productos BEGIN
+            DELETE FROM productos_fts WHERE rowid = old.id_producto;
+            {_INSERTAR_FTS} {_fila_fts('new')};
+        END""",
+    "trg_productos_fts_del": """
+        CREATE TRIGGER IF NOT EXISTS trg_productos_fts_del AFTER DELETE ON productos BEGIN
+            DELETE FROM productos_fts WHERE rowid = old.id_producto;
+        END""",
+    "trg_marcas_fts_upd": """
+        CREATE TRIGGER IF NOT EXISTS trg_marcas_fts_upd AFTER UPDATE OF nombre_marca ON marcas BEGIN
+            UPDATE productos_fts SET marca = new.nombre_marca
+            WHERE rowid IN (SELECT id_producto FROM productos WHERE id_marca = new.id_marca);
+        END""",
+    "trg_categorias_fts_upd": """
+        CREATE TRIGGER IF NOT EXISTS trg_categorias_fts_upd AFTER UPDATE OF nombre_categoria ON categorias BEGIN
+            UPDATE productos_fts SET categoria = new.nombre_categoria
+            WHERE rowid IN (SELECT id_producto FROM productos WHERE id_categoria = new.id_categoria);
+        END""",
+}
+
+RECONSTRUIR_BUSQUEDA = [
+    "DELETE FROM productos_fts",
+    f"{_INSERTAR_FTS} {_fila_fts('p')} FROM productos p",
+    "INSERT INTO productos_fts (productos_fts) VALUES ('optimize')",
+    "ANALYZE productos",  # para que el planificador conozca los índices de atributos
+]
+
+def texto_a_fts(texto):
+    """Convierte lo que escribe el usuario en una consulta FTS5 segura.
+
+    Cada palabra se busca como prefijo y todas deben aparecer; las comillas
+    evitan que caracteres como '-' o ':' se interpreten como operadores.
+    """
+    return " ".join(f'"{palabra}"*' for palabra in re.findall(r'\w+', texto))
+
+def consulta_busqueda(texto=None, filtros=None, limite=50):
+    """(sql, params) para buscar productos por texto y/o atributos exactos"""
+    condiciones, params = [], []
+    desde = "FROM productos p"
+    orden = "p.id_producto"  # con un filtro por atributo, el índice ya entrega las filas en este orden
+    consulta_fts = texto_a_fts(texto or "")
+    if consulta_fts:
+        desde = "FROM productos_fts f JOIN productos p ON p.id_producto = f.rowid"
+        condiciones.append("productos_fts MATCH ?")
+        params.append(consulta_fts)
+        orden = "f.rank"
+    for columna, valor in (filtros or {}).items():
+        if columna not in ATRIBUTOS:
+            raise ValueError(f"Atributo desconocido: {columna}")
+        if valor is not None:
+            condiciones.append(f"p.{columna} = ?")
+            params.append(valor)
+    donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    sql = f"""
+    SELECT p.id_producto, p.nombre_producto, m.nombre_marca, c.nombre_categoria,
+           p.precio_venta, p.stock, p.especificaciones
+    {desde}
+    JOIN marcas m ON m.id_marca = p.id_marca
+    JOIN categorias c ON c.id_categoria = p.id_categoria
+    {donde}
+    ORDER BY {orden}
+    LIMIT ?
+    """
+    return sql, params + [limite]
+
+def buscar_productos(conn, texto=None, filtros=None, limite=50):
+    """Lista de filas (id, nombre, marca, categoría, precio, stock, especificaciones)"""
+    sql, params = consulta_busqueda(texto, filtros, limite)
+    return conn.execute(sql, params).fetchall()
+
+def sql_valores_atributo(columna):
+    """SQL con los valores distintos de un atributo (lee solo su índice)"""
+    if columna not in ATRIBUTOS:
+        raise ValueError(f"Atributo desconocido: {columna}")
+    return f"SELECT DISTINCT {columna} AS valor FROM productos WHERE {columna} IS NOT NULL ORDER BY 1"
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Busca productos por texto y atributos")
+    parser.add_argument('texto', nargs='?', default=None, help="Palabras a buscar (prefijos)")
+    parser.add_argument('--db', default='tienda.db', help="Ruta de la base")
+    for atributo in ATRIBUTOS:
+        parser.add_argument(f'--{atributo.replace("_", "-")}', dest=atributo, default=None)
+    parser.add_argument('--limite', type=int, default=20)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    filtros = {atributo: getattr(args, atributo) for atributo in ATRIBUTOS}
+    for fila in buscar_productos(conn, args.texto, filtros, args.limite):
+        print(f"{fila[0]:>6}  {fila[1]:<40} {fila[2]:<15} {fila[3]:<12} S/. {fila[4]:>7.2f}  {fila[6] or ''}")
+    conn.close()
@@ -0,0 +1,341 @@
+"""Snapshot columnar de las ventas y motor de reportes vectorizado.
+
+exportar_snapshot vuelca los hechos de venta (una fila por línea de
+detalle_ventas) y la columna de proveedor de detalle_compras en arrays
+NumPy (.npy) que luego se abren con memoria mapeada. MotorColumnar
+responde los siete reportes del dashboard con bincount/argsort sobre esos
+arrays, sin pasar por SQLite más que para comprobar que el snapshot sigue
+al día. calcular_reportes hace lo mismo sin snapshot: lee las líneas de
+venta en una sola pasada del cursor a arrays en memoria y devuelve los
+siete reportes juntos, así que refrescar todo el dashboard cuesta un solo
+recorrido de detalle_ventas en lugar de uno (o dos) por reporte.
+
+Las ventas archivadas en particiones (particiones.py) entran en el
+snapshot: la exportación lee a través de las vistas que las adjuntan.
+
+Cada exportación se escribe en un subdirectorio nuevo y 'actual.json'
+se reemplaza de forma atómica al final, así que un lector nunca ve un
+snapshot a medio escribir.
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from conexiones import consultar_por_bloques
+from consultas import REPORTES
+from particiones import conectar
+from resumenes import huella_datos
+
+DIRECTORIO_SNAPSHOT = 'snapshot_columnar'
+TAMANO_BLOQUE = 200_000
+
+# columna: (tipo NumPy, expresión SQL)
+COLUMNAS_VENTAS = {
+    "id_venta": (np.int64, "dv.id_venta"),
+    "id_producto": (np.int32, "dv.id_producto"),
+    "id_categoria": (np.int32, "p.id_categoria"),
+    "id_cliente": (np.int64, "COALESCE(v.id_cliente, 0)"),  # 0 = venta sin cliente
+    "cantidad": (np.int32, "dv.cantidad"),
+    "precio_unitario": (np.float64, "dv.precio_unitario"),
+    "fecha_venta": (np.int32, "CAST(julianday(v.fecha_venta) - 2440587.5 AS INTEGER)"),  # días desde 1970
+}
+
+SQL_HECHOS_VENTAS = f"""
+    SELECT {', '.join(expresion for _, expresion in COLUMNAS_VENTAS.values())}
+    FROM detalle_ventas dv
+    INNER JOIN ventas v ON v.id_venta = dv.id_venta
+    INNER JOIN productos p ON p.id_producto = dv.id_producto
+    ORDER BY dv.id_detalle_venta
+    """
+
+# Para calcular los reportes el orden no importa: se recorre ventas y se entra a
+# detalle_ventas por su índice cubriente, así ambas lecturas son secuenciales
+SQL_LINEAS_REPORTES = f"""
+    SELECT {', '.join(expresion for nombre, (_, expresion) in COLUMNAS_VENTAS.items() if nombre != "fecha_venta")}
+    FROM ventas v
+    CROSS JOIN detalle_ventas dv ON dv.id_venta = v.id_venta
+    INNER JOIN productos p ON p.id_producto = dv.id_producto
+    """
+
+SQL_HECHOS_COMPRAS = """
+    SELECT c.id_proveedor
+    FROM detalle_compras dc
+    INNER JOIN compras c ON c.id_compra = dc.id_compra
+    ORDER BY dc.id_detalle_compra
+    """
+
+def _volcar(conn, sql, directorio, columnas, n_filas):
+    """Llena arrays .npy mapeados en memoria bloque a bloque desde el cursor"""
+    arrays = {
+        nombre: np.lib.format.open_memmap(
+            os.path.join(directorio, f"{nombre}.npy"), mode='w+', dtype=tipo, shape=(n_filas,)
+        )
+        for nombre, tipo in columnas.items()
+    }
+    posicion = 0
+    for _, filas in consultar_por_bloques(conn, sql, tamano_bloque=TAMANO_BLOQUE):
+        bloque = np.array(filas)
+        for indice, array in enumerate(arrays.values()):
+            array[posicion:posicion + len(filas)] = bloque[:, indice]
+        posicion += len(filas)
+    for array in arrays.values():
+        array.flush()
+
+def _leer_columnas(conn, sql, columnas):
+    """Arrays en memoria con las columnas del resultado, leídas bloque a bloque"""
+    partes = {nombre: [] for nombre in columnas}
+    for _, filas in consultar_por_bloques(conn, sql, tamano_bloque=TAMANO_BLOQUE):
+        bloque = np.array(filas)
+        for indice, (nombre, tipo) in enumerate(columnas.items()):
+            partes[nombre].append(bloque[:, indice].astype(tipo))
+    return {
+        nombre: np.concatenate(bloques) if bloques else np.empty(0, dtype=columnas[nombre])
+        for nombre, bloques in partes.items()
+    }
+
+def _nombres_por_codigo(conn, sql):
+    """Para agrupar por nombre: (código de nombre por id, lista de nombres únicos)"""
+    filas = conn.execute(sql).fetchall()
+    nombres = sorted({nombre for _, nombre in filas})
+    codigo_de = {nombre: codigo for codigo, nombre in enumerate(nombres)}
+    codigos = np.full(max((id_ for id_, _ in filas), default=0) + 1, -1, dtype=np.int32)
+    for id_, nombre in filas:
+        codigos[id_] = codigo_de[nombre]
+    return codigos, nombres
+
+def _dimensiones(conn):
+    """Códigos de nombre por id (para agrupar por nombre) y diccionarios de dimensiones"""
+    codigos_cliente, nombres_cliente = _nombres_por_codigo(conn, "SELECT id_cliente, nombre FROM clientes")
+    codigos_proveedor, nombres_proveedor = _nombres_por_codigo(
+        conn, "SELECT id_proveedor, nombre_proveedor FROM proveedores")
+    codigos = {"codigo_nombre_cliente": codigos_cliente, "codigo_nombre_proveedor": codigos_proveedor}
+    dimensiones = {
+        "productos": dict(conn.execute("SELECT id_producto, nombre_producto FROM productos").fetchall()),
+        "categorias": dict(conn.execute("SELECT id_categoria, nombre_categoria FROM categorias").fetchall()),
+        "nombres_cliente": nombres_cliente,
+        "nombres_proveedor": nombres_proveedor,
+    }
+    return codigos, dimensiones
+
+def exportar_snapshot(ruta_db, directorio=DIRECTORIO_SNAPSHOT):
+    """Escribe un snapshot columnar nuevo de ruta_db y lo publica como actual"""
+    inicio = time.perf_counter()
+    os.makedirs(directorio, exist_ok=True)
+    nombre = f"snap-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    destino = os.path.join(directorio, nombre)
+    os.makedirs(destino)
+
+    conn = conectar(ruta_db)  # con las particiones adjuntas, como el dashboard
+    try:
+        conn.execute("BEGIN")  # una sola transacción de lectura: todas las columnas ven los mismos datos
+        huella = huella_datos(conn)
+        n_ventas = conn.execute("SELECT COUNT(*) FROM detalle_ventas").fetchone()[0]
+        n_compras = conn.execute("SELECT COUNT(*) FROM detalle_compras").fetchone()[0]
+        _volcar(conn, SQL_HECHOS_VENTAS, destino,
+                {nombre: tipo for nombre, (tipo, _) in COLUMNAS_VENTAS.items()}, n_ventas)
+        _volcar(conn, SQL_HECHOS_COMPRAS, destino, {"id_proveedor": np.int32}, n_compras)
+
+        codigos, dimensiones = _dimensiones(conn)
+        for columna, array in codigos.items():
+            np.save(os.path.join(destino, f"{columna}.npy"), array)
+        conn.rollback()
+    finally:
+        conn.close()
+
+    with open(os.path.join(destino, "meta.json"), 'w', encoding='utf-8') as archivo:
+        json.dump({"huella": huella, "filas_ventas": n_ventas, "filas_compras": n_compras,
+                   "origen": os.path.abspath(ruta_db), "dimensiones": dimensiones},
+                  archivo, ensure_ascii=False)
+
+    # Publicación atómica y limpieza de snapshots anteriores
+    temporal = os.path.join(directorio, "actual.json.tmp")
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        json.dump({"snapshot": nombre}, archivo)
+    os.replace(temporal, os.path.join(directorio, "actual.json"))
+    for anterior in os.listdir(directorio):
+        if anterior.startswith("snap-") and anterior != nombre:
+            shutil.rmtree(os.path.join(directorio, anterior), ignore_errors=True)
+
+    print(f"Snapshot '{destino}' exportado en {time.perf_counter() - inicio:.1f} s "
+          f"({n_ventas:,} líneas de venta, {n_compras:,} líneas de compra)")
+    return destino
+
+def _top(valores, k=None):
+    """Índices con valor > 0 ordenados de mayor a menor (empates por índice)"""
+    indices = np.flatnonzero(valores > 0)
+    indices = indices[np.argsort(-valores[indices], kind='stable')]
+    return indices if k is None else indices[:k]
+
+class ReportesColumnares:
+    """Los reportes del dashboard con NumPy sobre columnas de hechos ya cargadas.
+
+    columnas tiene los arrays de COLUMNAS_VENTAS, id_proveedor y los códigos
+    de nombre; dimensiones, los diccionarios que arma _dimensiones.
+    """
+
+    def _asignar_dimensiones(self, dimensiones):
+        self.productos = {int(id_): nombre for id_, nombre in dimensiones["productos"].items()}
+        self.categorias = {int(id_): nombre for id_, nombre in dimensiones["categorias"].items()}
+        self.nombres_cliente = dimensiones["nombres_cliente"]
+        self.nombres_proveedor = dimensiones["nombres_proveedor"]
+
+    def __init__(self, columnas, dimensiones):
+        self.columnas = columnas
+        self._asignar_dimensiones(dimensiones)
+
+    def _nombre_cliente(self, id_cliente):
+        return self.nombres_cliente[self.columnas["codigo_nombre_cliente"][id_cliente]]
+
+    def productos_mas_vendidos(self):
+        conteo = np.bincount(self.columnas["id_producto"])
+        top = _top(conteo, 5)
+        return pd.DataFrame({"id_producto": top, "nombre_producto": [self.productos[i] for i in top],
+                             "n° ventas": conteo[top]})
+
+    def clientes_frecuentes(self):
+        cliente = self.columnas["id_cliente"]
+        importe = self.columnas["cantidad"] * self.columnas["precio_unitario"]
+        conteo = np.bincount(cliente)
+        gasto = np.bincount(cliente, weights=importe)
+        conteo[0] = 0  # ventas sin cliente
+        top = _top(conteo, 3)
+        return pd.DataFrame({"id_cliente": top, "nombre": [self._nombre_cliente(i) for i in top],
+                             "total_compras": conteo[top], "total_gastado": gasto[top]})
+
+    def _conteo_categorias(self):
+        return np.bincount(self.columnas["id_categoria"])
+
+    def categoria_popular(self):
+        conteo = self._conteo_categorias()
+        top = _top(conteo, 1)
+        return pd.DataFrame({"id_categoria": top, "nombre_categoria": [self.categorias[i] for i in top],
+                             "n° ventas": conteo[top]})
+
+    def cliente_estrella(self):
+        top_categoria = _top(self._conteo_categorias(), 1)
+        if not len(top_categoria):
+            return pd.DataFrame(columns=["nombre", "nombre_categoria", "n° ventas"])
+        cliente = self.columnas["id_cliente"]
+        filtro = (self.columnas["id_categoria"] == top_categoria[0]) & (cliente > 0)
+        codigos = self.columnas["codigo_nombre_cliente"][cliente[filtro]]
+        conteo = np.bincount(codigos, minlength=len(self.nombres_cliente))
+        top = _top(conteo, 1)
+        return pd.DataFrame({"nombre": [self.nombres_cliente[i] for i in top],
+                             "nombre_categoria": [self.categorias[top_categoria[0]]] * len(top),
+                             "n° ventas": conteo[top]})
+
+    def proveedores_utilizados(self):
+        codigos = self.columnas["codigo_nombre_proveedor"][self.columnas["id_proveedor"]]
+        conteo = np.bincount(codigos, minlength=len(self.nombres_proveedor))
+        top = _top(conteo)
+        return pd.DataFrame({"nombre_proveedor": [self.nombres_proveedor[i] for i in top],
+                             "n° compras": conteo[top]})
+
+    def categorias_rentables(self):
+        categoria = self.columnas["id_categoria"]
+        conteo = np.bincount(categoria)
+        total = np.bincount(categoria, weights=self.columnas["cantidad"] * self.columnas["precio_unitario"])
+        orden = np.flatnonzero(conteo > 0)
+        orden = orden[np.argsort(-total[orden], kind='stable')]
+        return pd.DataFrame({"id_categoria": orden, "nombre_categoria": [self.categorias[i] for i in orden],
+                             "n° ventas": conteo[orden], "total_venta": total[orden]})
+
+    def mayor_compra(self):
+        cliente = self.columnas["id_cliente"]
+        con_cliente = cliente > 0
+        venta = self.columnas["id_venta"][con_cliente]
+        unidades = np.bincount(venta, weights=self.columnas["cantidad"][con_cliente]).astype(np.int64)
+        if not len(unidades) or unidades.max() == 0:
+            return pd.DataFrame(columns=["id_venta", "nombre", "productos_vendidos"])
+        ganadoras = np.flatnonzero(unidades == unidades.max())
+        lineas = np.isin(venta, ganadoras)
+        cliente_de_venta = dict(zip(venta[lineas].tolist(), cliente[con_cliente][lineas].tolist()))
+        return pd.DataFrame({"id_venta": ganadoras,
+                             "nombre": [self._nombre_cliente(cliente_de_venta[i]) for i in ganadoras],
+                             "productos_vendidos": unidades[ganadoras]})
+
+    def reporte(self, clave):
+        """DataFrame del reporte con la misma clave y columnas que en consultas.REPORTES"""
+        return getattr(self, clave)()
+
+class MotorColumnar(ReportesColumnares):
+    """Responde los reportes del dashboard sobre el snapshot columnar mapeado en memoria"""
+
+    def __init__(self, directorio=DIRECTORIO_SNAPSHOT):
+        self.directorio = directorio
+        self._puntero = os.path.join(directorio, "actual.json")
+        self._cargado = None
+        self._cargar()
+
+    def _cargar(self):
+        estado = os.stat(self._puntero).st_mtime_ns
+        if estado == self._cargado:
+            return
+        with open(self._puntero, encoding='utf-8') as archivo:
+            carpeta = os.path.join(self.directorio, json.load(archivo)["snapshot"])
+        with open(os.path.join(carpeta, "meta.json"), encoding='utf-8') as archivo:
+            self.meta = json.load(archivo)
+        self.columnas = {
+            archivo[:-4]: np.load(os.path.join(carpeta, archivo), mmap_mode='r')
+            for archivo in os.listdir(carpeta) if archivo.endswith(".npy")
+        }
+        self._asignar_dimensiones(self.meta["dimensiones"])
+        self._cargado = estado
+
+    def vigente(self, conn):
+        """True si el snapshot refleja los datos actuales de la conexión"""
+        self._cargar()  # recoge una exportación nueva si la hubo
+        return self.meta["huella"] == huella_datos(conn)
+
+def calcular_reportes(conn):
+    """Los siete reportes {clave: DataFrame} a partir de una sola pasada por detalle_ventas.
+
+    Las líneas de venta se leen una vez a arrays en memoria (más la columna
+    de proveedor de detalle_compras para el reporte 5) y todos los reportes
+    se calculan sobre ellas con NumPy.
+    """
+    iniciada = not conn.in_transaction
+    if iniciada:
+        conn.execute("BEGIN")  # todas las lecturas ven los mismos datos
+    try:
+        columnas = _leer_columnas(conn, SQL_LINEAS_REPORTES, {
+            nombre: tipo for nombre, (tipo, _) in COLUMNAS_VENTAS.items() if nombre != "fecha_venta"
+        })
+        columnas.update(_leer_columnas(conn, SQL_HECHOS_COMPRAS, {"id_proveedor": np.int32}))
+        codigos, dimensiones = _dimensiones(conn)
+        columnas.update(codigos)
+    finally:
+        if iniciada:
+            conn.rollback()
+    reportes = ReportesColumnares(columnas, dimensiones)
+    return {reporte["clave"]: reportes.reporte(reporte["clave"]) for reporte in REPORTES}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Exporta el snapshot columnar y compara con SQLite")
+    parser.add_argument('--db', default='tienda.db', help="Base de origen")
+    parser.add_argument('--dir', default=DIRECTORIO_SNAPSHOT, help="Directorio del snapshot")
+    args = parser.parse_args()
+
+    exportar_snapshot(args.db, args.dir)
+    motor = MotorColumnar(args.dir)
+    conn = conectar(args.db)
+    print(f"Snapshot vigente: {motor.vigente(conn)}")
+    ms_total_sql = 0.0
+    for reporte in REPORTES:
+        inicio = time.perf_counter()
+        conn.execute(reporte["sql"]).fetchall()
+        ms_sql = (time.perf_counter() - inicio) * 1000
+        ms_total_sql += ms_sql
+        inicio = time.perf_counter()
+        motor.reporte(reporte["clave"])
+        ms_motor = (time.perf_counter() - inicio) * 1000
+        print(f"{reporte['clave']:<24} SQL {ms_sql:>9.2f} ms | columnar {ms_motor:>8.2f} ms")
+    inicio = time.perf_counter()
+    calcular_reportes(conn)
+    print(f"{'todos (una pasada)':<24} SQL {ms_total_sql:>9.2f} ms | pasada única {(time.perf_counter() - inicio) * 1000:>8.2f} ms")
+    conn.close()
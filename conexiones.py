@@ -0,0 +1,220 @@
+"""Conexiones de solo lectura compartidas por el dashboard.
+
+Este módulo no depende de streamlit: app_streamlit.py guarda una única
+instancia del pool por proceso con st.cache_resource.
+"""
+import os
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+class PoolLectura:
+    """Pool de conexiones SQLite de solo lectura reutilizables entre hilos.
+
+    Las conexiones se abren bajo demanda hasta `tamano` y se devuelven al
+    pool al terminar cada consulta, en lugar de abrir y cerrar una por consulta.
+    Si se pasa `preparar`, se llama con la conexión cada vez que se presta
+    (p. ej. particiones.asegurar_vistas para adjuntar las ventas archivadas),
+    más los argumentos que se den a conexion() (p. ej. un rango de fechas);
+    `pragmas` se ejecutan una sola vez al abrir cada conexión.
+    """
+
+    def __init__(self, ruta, tamano=4, parametros_uri="mode=ro", preparar=None, pragmas=()):
+        self.ruta = ruta
+        self.tamano = tamano
+        self.parametros_uri = parametros_uri
+        self.preparar = preparar
+        self.pragmas = pragmas
+        self._libres = queue.LifoQueue()
+        self._creadas = 0
+        self._candado = threading.Lock()
+
+    def _abrir(self):
+        conn = sqlite3.connect(f"file:{self.ruta}?{self.parametros_uri}", uri=True, check_same_thread=False)
+        for pragma in self.pragmas:
+            conn.execute(pragma)
+        return conn
+
+    def _obtener(self):
+        try:
+            return self._libres.get_nowait()
+        except queue.Empty:
+            pass
+        with self._candado:
+            if self._creadas < self.tamano:
+                self._creadas += 1
+                crear = True
+            else:
+                crear = False
+        if crear:
+            try:
+                return self._abrir()
+            except sqlite3.Error:
+                with self._candado:
+                    self._creadas -= 1
+                raise
+        return self._libres.get()  # Espera a que otra consulta libere una conexión
+
+    @contextmanager
+    def conexion(self, *argumentos):
+        """Presta una conexión del pool durante el bloque with; argumentos van a preparar"""
+        conn = self._obtener()
+        try:
+            if self.preparar:
+                self.preparar(conn, *argumentos)
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._libres.put(conn)
+
+    def cerrar(self):
+        """Cierra las conexiones libres del pool"""
+        while True:
+            try:
+                self._libres.get_nowait().close()
+            except queue.Empty:
+                break
+            with self._candado:
+                self._creadas -= 1
+
+def consultar_por_bloques(conn, sql, params=(), tamano_bloque=1000):
+    """Ejecuta una consulta y entrega el resultado en bloques desde el cursor.
+
+    Genera tuplas (columnas, filas) con a lo sumo tamano_bloque filas cada
+    una, de modo que la memoria usada depende del bloque y no del tamaño
+    del resultado.
+    """
+    cursor = conn.execute(sql, params)
+    columnas = [descripcion[0] for descripcion in cursor.description]
+    try:
+        while True:
+            filas = cursor.fetchmany(tamano_bloque)
+            if not filas:
+                break
+            yield columnas, filas
+    finally:
+        cursor.close()
+
+def _clave_params(params):
+    """Convierte los parámetros de una consulta en algo que sirva de clave"""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return tuple(sorted(params.items()))
+    return tuple(params)
+
+class CacheResultados:
+    """Caché LRU de resultados por (sql, params) que se vacía cuando cambian los datos.
+
+    Una conexión dedicada consulta PRAGMA data_version antes de cada
+    búsqueda: SQLite incrementa ese valor cuando otra conexión (de este u
+    otro proceso) confirma cambios en la base, así que un resultado nunca
+    se sirve después de que los datos hayan cambiado y, mientras no cambien,
+    repetir una consulta no cuesta nada. Si varias sesiones piden a la vez
+    la misma consulta, solo una la calcula y las demás esperan su resultado.
+    """
+
+    def __init__(self, ruta, max_entradas=128):
+        self.max_entradas = max_entradas
+        self.aciertos = 0
+        self.fallos = 0
+        self._entradas = OrderedDict()
+        self._en_curso = {}  # clave -> Future de la consulta que se está calculando
+        self._candado = threading.Lock()
+        self._vigia = sqlite3.connect(f"file:{ruta}?mode=ro", uri=True, check_same_thread=False)
+        self._version = self._version_datos()
+
+    def _version_datos(self):
+        return self._vigia.execute("PRAGMA data_version").fetchone()[0]
+
+    def _revisar_version(self):
+        """Vacía la caché si cambiaron los datos; se llama con el candado tomado"""
+        version = self._version_datos()
+        if version != self._version:
+            self._entradas.clear()
+            self._version = version
+        return version
+
+    def obtener(self, sql, params, calcular):
+        """Devuelve el resultado en caché o lo calcula con calcular() y lo guarda"""
+        clave = (sql, _clave_params(params))
+        with self._candado:
+            version = self._revisar_version()
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return self._entradas[clave]
+            futuro = self._en_curso.get(clave)
+            calcula = futuro is None
+            if calcula:
+                futuro = self._en_curso[clave] = Future()
+                self.fallos += 1
+            else:
+                self.aciertos += 1
+
+        if not calcula:
+            return futuro.result()  # Otra sesión ya la está calculando
+
+        try:
+            valor = calcular()  # Fuera del candado: las consultas distintas no se bloquean entre sí
+        except BaseException as e:
+            with self._candado:
+                del self._en_curso[clave]
+            futuro.set_exception(e)
+            raise
+
+        with self._candado:
+            del self._en_curso[clave]
+            if version == self._version:
+                self._entradas[clave] = valor
+                self._entradas.move_to_end(clave)
+                while len(self._entradas) > self.max_entradas:
+                    self._entradas.popitem(last=False)
+        futuro.set_result(valor)
+        return valor
+
+    def contiene(self, sql, params=None):
+        """Indica si el resultado ya está guardado o calculándose"""
+        clave = (sql, _clave_params(params))
+        with self._candado:
+            self._revisar_version()
+            return clave in self._entradas or clave in self._en_curso
+
+    def limpiar(self):
+        """Descarta todos los resultados guardados"""
+        with self._candado:
+            self._entradas.clear()
+
+def verificar_base(ruta, tabla_requerida='detalle_ventas'):
+    """Comprueba una sola vez que la base existe y tiene la tabla esperada.
+
+    Devuelve un diccionario con el diagnóstico; 'ok' indica si se puede
+    consultar, 'error' describe el problema cuando no y 'version' es la
+    versión de esquema (PRAGMA user_version).
+    """
+    diagnostico = {"ruta": ruta, "ok": False, "error": None, "tamano": None, "tablas": [], "version": 0}
+    if not os.path.exists(ruta):
+        diagnostico["error"] = f"El archivo de base de datos NO se encuentra en: {ruta}"
+        return diagnostico
+    diagnostico["tamano"] = os.path.getsize(ruta)
+    try:
+        conn = sqlite3.connect(f"file:{ruta}?mode=ro", uri=True)
+        try:
+            diagnostico["tablas"] = [
+                fila[0] for fila in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
+            ]
+            diagnostico["version"] = conn.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        diagnostico["error"] = f"Error de SQLite al conectar o verificar la tabla: {e}"
+        return diagnostico
+    if tabla_requerida not in diagnostico["tablas"]:
+        diagnostico["error"] = f"Conexión exitosa a SQLite, PERO la tabla '{tabla_requerida}' NO FUE encontrada."
+        return diagnostico
+    diagnostico["ok"] = True
+    return diagnostico
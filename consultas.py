@@ -0,0 +1,261 @@
+"""Consultas SQL de los reportes del dashboard.
+
+Se mantienen aparte de app_streamlit.py para que las migraciones, los
+benchmarks y otros scripts puedan reutilizarlas sin importar streamlit.
+"""
+
+SQL_PRODUCTOS_MAS_VENDIDOS = """
+    SELECT dv.id_producto, p.nombre_producto, count(*) as 'n° ventas'
+    FROM detalle_ventas dv
+    INNER JOIN productos p ON p.id_producto = dv.id_producto
+    GROUP BY dv.id_producto
+    ORDER BY 3 DESC
+    LIMIT 5
+    """
+
+SQL_CLIENTES_FRECUENTES = """
+    SELECT v.id_cliente, c.nombre, count(*) as 'total_compras', 
+           SUM(dv.precio_unitario * dv.cantidad) as total_gastado
+    FROM ventas v
+    INNER JOIN detalle_ventas dv ON dv.id_venta = v.id_venta
+    INNER JOIN clientes c ON v.id_cliente = c.id_cliente
+    GROUP BY v.id_cliente
+    HAVING v.id_cliente IS NOT NULL
+    ORDER BY total_compras DESC
+    LIMIT 3
+    """
+
+SQL_CATEGORIA_POPULAR = """
+    SELECT ca.id_categoria, ca.nombre_categoria, count(*) as 'n° ventas' 
+    FROM detalle_ventas dv
+    INNER JOIN productos p ON dv.id_producto = p.id_producto
+    INNER JOIN categorias ca ON p.id_categoria = ca.id_categoria
+    GROUP BY ca.id_categoria
+    ORDER BY 3 DESC
+    LIMIT 1
+    """
+
+SQL_CLIENTE_ESTRELLA = """
+    SELECT cli.nombre, cat.nombre_categoria, COUNT(*) as 'n° ventas' 
+    FROM detalle_ventas dv
+    INNER JOIN productos p ON dv.id_producto = p.id_producto
+    INNER JOIN categorias cat ON p.id_categoria = cat.id_categoria
+    INNER JOIN ventas v on dv.id_venta = v.id_venta
+    INNER JOIN clientes cli ON v.id_cliente = cli.id_cliente
+    WHERE v.id_cliente IS NOT NULL
+    GROUP BY cli.nombre, cat.nombre_categoria
+    HAVING cat.nombre_categoria = ( 
+        SELECT nombre_categoria FROM (
+            SELECT ca.id_categoria, ca.nombre_categoria, count(*) as ventas 
+            FROM detalle_ventas dv
+            INNER JOIN productos p ON dv.id_producto = p.id_producto
+            INNER JOIN categorias ca ON p.id_categoria = ca.id_categoria
+            GROUP BY ca.id_categoria
+            ORDER BY 3 DESC
+            LIMIT 1
+        )
+    )
+    ORDER BY 3 DESC
+    LIMIT 1
+    """
+
+SQL_PROVEEDORES_UTILIZADOS = """
+    SELECT prov.nombre_proveedor, COUNT(*) as 'n° compras'
+    FROM detalle_compras dc
+    INNER JOIN compras c ON dc.id_compra = c.id_compra
+    INNER JOIN proveedores prov ON c.id_proveedor = prov.id_proveedor
+    GROUP BY prov.nombre_proveedor
+    ORDER BY 2 DESC
+    """
+
+SQL_CATEGORIAS_RENTABLES = """
+    SELECT ca.id_categoria, ca.nombre_categoria, count(*) as 'n° ventas', 
+           SUM(dv.cantidad * dv.precio_unitario) as 'total_venta' 
+    FROM detalle_ventas dv
+    INNER JOIN productos p ON dv.id_producto = p.id_producto
+    INNER JOIN categorias ca ON p.id_categoria = ca.id_categoria
+    GROUP BY ca.id_categoria
+    ORDER BY 4 DESC
+    """
+
+SQL_MAYOR_COMPRA = """
+    SELECT dv.id_venta, cli.nombre, SUM(dv.cantidad) as 'productos_vendidos' 
+    FROM detalle_ventas dv
+    INNER JOIN ventas v on dv.id_venta = v.id_venta
+    INNER JOIN clientes cli ON v.id_cliente = cli.id_cliente
+    GROUP BY dv.id_venta
+    HAVING SUM(dv.cantidad) = (
+        SELECT MAX(p_vendidos.productos_vendidos) FROM (
+            SELECT dv.id_venta, cli.nombre, SUM(dv.cantidad) as 'productos_vendidos'
+            FROM detalle_ventas dv
+            INNER JOIN ventas v on dv.id_venta = v.id_venta
+            INNER JOIN clientes cli ON v.id_cliente = cli.id_cliente
+            GROUP BY dv.id_venta
+        ) as p_vendidos
+    )
+    """
+
+# Variantes que leen las tablas de resumen (ver resumenes.py); su costo no
+# depende del número de líneas de venta
+
+SQL_PRODUCTOS_MAS_VENDIDOS_RESUMEN = """
+    SELECT rp.id_producto, p.nombre_producto, rp.n_ventas as 'n° ventas'
+    FROM resumen_productos rp
+    INNER JOIN productos p ON p.id_producto = rp.id_producto
+    WHERE rp.n_ventas > 0
+    ORDER BY 3 DESC
+    LIMIT 5
+    """
+
+SQL_CLIENTES_FRECUENTES_RESUMEN = """
+    SELECT t.id_cliente, c.nombre, t.total_compras, t.total_gastado
+    FROM (
+        SELECT id_cliente, SUM(n_ventas) as total_compras, SUM(total_venta) as total_gastado
+        FROM resumen_cliente_categoria
+        GROUP BY id_cliente
+        HAVING SUM(n_ventas) > 0
+        ORDER BY total_compras DESC
+        LIMIT 3
+    ) t
+    INNER JOIN clientes c ON t.id_cliente = c.id_cliente
+    ORDER BY t.total_compras DESC
+    """
+
+SQL_CATEGORIA_POPULAR_RESUMEN = """
+    SELECT ca.id_categoria, ca.nombre_categoria, rc.n_ventas as 'n° ventas'
+    FROM resumen_categorias rc
+    INNER JOIN categorias ca ON rc.id_categoria = ca.id_categoria
+    WHERE rc.n_ventas > 0
+    ORDER BY 3 DESC
+    LIMIT 1
+    """
+
+SQL_CLIENTE_ESTRELLA_RESUMEN = """
+    SELECT cli.nombre, cat.nombre_categoria, SUM(rcc.n_ventas) as 'n° ventas'
+    FROM resumen_cliente_categoria rcc
+    INNER JOIN categorias cat ON rcc.id_categoria = cat.id_categoria
+    INNER JOIN clientes cli ON rcc.id_cliente = cli.id_cliente
+    WHERE rcc.id_categoria = (
+        SELECT id_categoria FROM resumen_categorias
+        WHERE n_ventas > 0
+        ORDER BY n_ventas DESC
+        LIMIT 1
+    )
+    GROUP BY cli.nombre, cat.nombre_categoria
+    HAVING SUM(rcc.n_ventas) > 0
+    ORDER BY 3 DESC
+    LIMIT 1
+    """
+
+SQL_PROVEEDORES_UTILIZADOS_RESUMEN = """
+    SELECT prov.nombre_proveedor, SUM(rp.n_compras) as 'n° compras'
+    FROM resumen_proveedores rp
+    INNER JOIN proveedores prov ON rp.id_proveedor = prov.id_proveedor
+    GROUP BY prov.nombre_proveedor
+    HAVING SUM(rp.n_compras) > 0
+    ORDER BY 2 DESC
+    """
+
+SQL_CATEGORIAS_RENTABLES_RESUMEN = """
+    SELECT ca.id_categoria, ca.nombre_categoria, rc.n_ventas as 'n° ventas',
+           rc.total_venta as 'total_venta'
+    FROM resumen_categorias rc
+    INNER JOIN categorias ca ON rc.id_categoria = ca.id_categoria
+    WHERE rc.n_ventas > 0
+    ORDER BY 4 DESC
+    """
+
+REPORTES = [
+    {
+        "clave": "productos_mas_vendidos",
+        "pestana": "1. Productos más vendidos",
+        "pregunta": "1. ¿Cuáles son los productos más vendidos?",
+        "sql": SQL_PRODUCTOS_MAS_VENDIDOS,
+        "sql_resumen": SQL_PRODUCTOS_MAS_VENDIDOS_RESUMEN,
+        "formato": None,
+    },
+    {
+        "clave": "clientes_frecuentes",
+        "pestana": "2. Clientes más frecuentes",
+        "pregunta": "2. ¿Qué clientes han realizado más compras y cuánto han gastado en total?",
+        "sql": SQL_CLIENTES_FRECUENTES,
+        "sql_resumen": SQL_CLIENTES_FRECUENTES_RESUMEN,
+        "formato": {"total_gastado": "S/. {:.2f}"},
+    },
+    {
+        "clave": "categoria_popular",
+        "pestana": "3. Categoría más popular",
+        "pregunta": "3. ¿Cuál es la categoría más popular en ventas?",
+        "sql": SQL_CATEGORIA_POPULAR,
+        "sql_resumen": SQL_CATEGORIA_POPULAR_RESUMEN,
+        "formato": None,
+    },
+    {
+        "clave": "cliente_estrella",
+        "pestana": "4. Cliente estrella por categoría",
+        "pregunta": "4. ¿Qué cliente ha realizado más compras de la categoría más popular?",
+        "sql": SQL_CLIENTE_ESTRELLA,
+        "sql_resumen": SQL_CLIENTE_ESTRELLA_RESUMEN,
+        "formato": None,
+    },
+    {
+        "clave": "proveedores_utilizados",
+        "pestana": "5. Proveedores más utilizados",
+        "pregunta": "5. ¿Qué proveedores han sido más utilizados y cuántas compras se han realizado a cada uno?",
+        "sql": SQL_PROVEEDORES_UTILIZADOS,
+        "sql_resumen": SQL_PROVEEDORES_UTILIZADOS_RESUMEN,
+        "formato": None,
+    },
+    {
+        "clave": "categorias_rentables",
+        "pestana": "6. Categorías más rentables",
+        "pregunta": "6. ¿Qué categorías de productos generan más ingresos en ventas?",
+        "sql": SQL_CATEGORIAS_RENTABLES,
+        "sql_resumen": SQL_CATEGORIAS_RENTABLES_RESUMEN,
+        "formato": {"total_venta": "S/. {:.2f}"},
+    },
+    {
+        "clave": "mayor_compra",
+        "pestana": "7. Mayor compra en cantidad",
+        "pregunta": "7. ¿Cuál ha sido la compra con la mayor cantidad de productos?",
+        "sql": SQL_MAYOR_COMPRA,
+        "sql_resumen": None,
+        "formato": None,
+        # Agrega todas las líneas de venta: no hay búsqueda por índice posible
+        "recorrido_completo": True,
+    },
+]
+
+# Estadísticas rápidas de la barra lateral
+SQL_TOTAL_VENTAS = "SELECT COUNT(*) as total FROM ventas"
+SQL_CLIENTES_UNICOS = "SELECT COUNT(DISTINCT id_cliente) as total FROM ventas WHERE id_cliente IS NOT NULL"
+
+# Explorador de ventas: paginación por clave (keyset) sobre id_detalle_venta.
+# Cada página es una búsqueda por rango en la clave primaria, así que leer la
+# página N cuesta lo mismo que leer la primera, sin OFFSET.
+# La página se recorta primero en una subconsulta sobre la clave primaria y
+# solo esas filas se unen con las demás tablas.
+_PAGINA_DETALLE = """
+    SELECT dv.id_detalle_venta, dv.id_venta, v.fecha_venta, cli.nombre as cliente,
+           p.nombre_producto, dv.cantidad, dv.precio_unitario,
+           dv.cantidad * dv.precio_unitario as subtotal
+    FROM (
+        SELECT * FROM detalle_ventas
+        WHERE id_detalle_venta {comparacion} ?
+        ORDER BY id_detalle_venta {orden}
+        LIMIT ?
+    ) dv
+    INNER JOIN ventas v ON v.id_venta = dv.id_venta
+    INNER JOIN productos p ON p.id_producto = dv.id_producto
+    LEFT JOIN clientes cli ON cli.id_cliente = v.id_cliente
+    ORDER BY dv.id_detalle_venta {orden}
+    """
+
+SQL_PAGINA_DETALLE_SIGUIENTE = _PAGINA_DETALLE.format(comparacion=">", orden="ASC")
+SQL_PAGINA_DETALLE_ANTERIOR = _PAGINA_DETALLE.format(comparacion="<", orden="DESC")
+
+# Primera línea de detalle de una venta (o de la siguiente que exista)
+SQL_INICIO_VENTA = """
+    SELECT MIN(id_detalle_venta) as inicio FROM detalle_ventas
+    WHERE id_venta = (SELECT MIN(id_venta) FROM detalle_ventas WHERE id_venta >= ?)
+    """
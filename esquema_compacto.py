@@ -0,0 +1,356 @@
+"""Variante compacta del esquema: céntimos enteros, tablas STRICT y detalle WITHOUT ROWID.
+
+Diferencias con las tablas de app.crear_tablas:
+  - Los precios se guardan como INTEGER en céntimos (columnas *_cent): un
+    entero pequeño ocupa 1-3 bytes en lugar de los 8 de un REAL y las sumas
+    de dinero son exactas; los reportes dividen entre 100 solo al final.
+  - Todas las tablas son STRICT: SQLite rechaza un valor del tipo equivocado
+    en lugar de guardarlo tal cual (las fechas son TEXT, STRICT no admite DATE).
+  - Las claves son INTEGER PRIMARY KEY sin AUTOINCREMENT, sin la escritura
+    extra en sqlite_sequence por cada inserción.
+  - detalle_ventas y detalle_compras son WITHOUT ROWID con clave
+    (id_venta, n_linea) / (id_compra, n_linea): las líneas de una venta
+    quedan juntas en el B-tree de la tabla, que hace de índice por venta.
+
+Es opcional: el dashboard, los resúmenes y el registro siguen usando el
+esquema normal. migrar copia una base existente (con sus particiones) a un
+archivo nuevo con este esquema y comparar mide tamaño, inserción y
+latencia de los reportes en ambos.
+
+Uso:
+    python esquema_compacto.py migrar --db tienda.db --destino tienda_compacta.db
+    python esquema_compacto.py comparar --db tienda.db --destino tienda_compacta.db
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from conexiones import consultar_por_bloques
+from consultas import REPORTES
+from particiones import conectar
+
+TABLAS_COMPACTAS = [
+    """
+    CREATE TABLE IF NOT EXISTS categorias (
+        id_categoria INTEGER PRIMARY KEY,
+        nombre_categoria TEXT NOT NULL UNIQUE
+    ) STRICT;
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS marcas (
+        id_marca INTEGER PRIMARY KEY,
+        nombre_marca TEXT NOT NULL UNIQUE
+    ) STRICT;
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS proveedores (
+        id_proveedor INTEGER PRIMARY KEY,
+        nombre_proveedor TEXT NOT NULL,
+        contacto TEXT NOT NULL
+    ) STRICT;
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS clientes (
+        id_cliente INTEGER PRIMARY KEY,
+        nombre TEXT NOT NULL,
+        telefono TEXT UNIQUE
+    ) STRICT;
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS productos (
+        id_producto INTEGER PRIMARY KEY,
+        nombre_producto TEXT NOT NULL,
+        id_categoria INTEGER NOT NULL REFERENCES categorias(id_categoria),
+        id_marca INTEGER NOT NULL REFERENCES marcas(id_marca),
+        precio_venta_cent INTEGER NOT NULL CHECK(precio_venta_cent > 0),
+        precio_compra_cent INTEGER NOT NULL CHECK(precio_compra_cent > 0),
+        stock INTEGER NOT NULL CHECK(stock >= 0),
+        unidad_medida TEXT NOT NULL CHECK(unidad_medida IN ('unidad', 'kg', 'litro')),
+        tamano TEXT,
+        especificaciones TEXT CHECK(especificaciones IS NULL OR json_valid(especificaciones))
+    ) STRICT;
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ventas (
+        id_venta INTEGER PRIMARY KEY,
+        fecha_venta TEXT NOT NULL DEFAULT (date('now')),
+        id_cliente INTEGER REFERENCES clientes(id_cliente)
+    ) STRICT;
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS detalle_ventas (
+        id_venta INTEGER NOT NULL REFERENCES ventas(id_venta),
+        n_linea INTEGER NOT NULL,
+        id_producto INTEGER NOT NULL REFERENCES productos(id_producto),
+        cantidad INTEGER NOT NULL CHECK(cantidad > 0),
+        precio_unitario_cent INTEGER NOT NULL CHECK(precio_unitario_cent > 0),
+        PRIMARY KEY (id_venta, n_linea)
+    ) STRICT, WITHOUT ROWID;
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS compras (
+        id_compra INTEGER PRIMARY KEY,
+        fecha_compra TEXT NOT NULL DEFAULT (date('now')),
+        id_proveedor INTEGER NOT NULL REFERENCES proveedores(id_proveedor)
+    ) STRICT;
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS detalle_compras (
+        id_compra INTEGER NOT NULL REFERENCES compras(id_compra),
+        n_linea INTEGER NOT NULL,
+        id_producto INTEGER NOT NULL REFERENCES productos(id_producto),
+        cantidad INTEGER NOT NULL CHECK(cantidad > 0),
+        precio_unitario_cent INTEGER NOT NULL CHECK(precio_unitario_cent > 0),
+        PRIMARY KEY (id_compra, n_linea)
+    ) STRICT, WITHOUT ROWID;
+    """,
+]
+
+# Los mismos índices que la migración 1, salvo los de detalle por venta/compra, que ya son la clave
+INDICES_COMPACTOS = [
+    "CREATE INDEX IF NOT EXISTS idx_detalle_ventas_producto ON detalle_ventas(id_producto, cantidad, precio_unitario_cent)",
+    "CREATE INDEX IF NOT EXISTS idx_ventas_cliente ON ventas(id_cliente, fecha_venta)",
+    "CREATE INDEX IF NOT EXISTS idx_ventas_fecha ON ventas(fecha_venta)",
+    "CREATE INDEX IF NOT EXISTS idx_productos_categoria ON productos(id_categoria)",
+    "CREATE INDEX IF NOT EXISTS idx_compras_proveedor ON compras(id_proveedor)",
+    "CREATE INDEX IF NOT EXISTS idx_detalle_compras_producto ON detalle_compras(id_producto, cantidad)",
+]
+
+_CENTIMOS = "CAST(ROUND({columna} * 100) AS INTEGER)"
+
+# (tabla, columnas destino, SELECT sobre la base con el esquema normal), en orden de claves foráneas
+COPIAS = [
+    ("categorias", "id_categoria, nombre_categoria", "SELECT id_categoria, nombre_categoria FROM categorias"),
+    ("marcas", "id_marca, nombre_marca", "SELECT id_marca, nombre_marca FROM marcas"),
+    ("proveedores", "id_proveedor, nombre_proveedor, contacto",
+        "SELECT id_proveedor, nombre_proveedor, contacto FROM proveedores"),
+    ("clientes", "id_cliente, nombre, telefono", "SELECT id_cliente, nombre, telefono FROM clientes"),
+    ("productos",
+        "id_producto, nombre_producto, id_categoria, id_marca, precio_venta_cent, precio_compra_cent, "
+        "stock, unidad_medida, tamano, especificaciones",
+        f"""SELECT id_producto, nombre_producto, id_categoria, id_marca, {_CENTIMOS.format(columna='precio_venta')},
+                   {_CENTIMOS.format(columna='precio_compra')}, stock, unidad_medida, tamano, especificaciones
+            FROM productos"""),
+    ("ventas", "id_venta, fecha_venta, id_cliente", "SELECT id_venta, fecha_venta, id_cliente FROM ventas ORDER BY id_venta"),
+    ("detalle_ventas", "id_venta, n_linea, id_producto, cantidad, precio_unitario_cent",
+        f"""SELECT id_venta, ROW_NUMBER() OVER (PARTITION BY id_venta ORDER BY id_detalle_venta),
+                   id_producto, cantidad, {_CENTIMOS.format(columna='precio_unitario')}
+            FROM detalle_ventas ORDER BY id_venta, id_detalle_venta"""),
+    ("compras", "id_compra, fecha_compra, id_proveedor",
+        "SELECT id_compra, fecha_compra, id_proveedor FROM compras ORDER BY id_compra"),
+    ("detalle_compras", "id_compra, n_linea, id_producto, cantidad, precio_unitario_cent",
+        f"""SELECT id_compra, ROW_NUMBER() OVER (PARTITION BY id_compra ORDER BY id_detalle_compra),
+                   id_producto, cantidad, {_CENTIMOS.format(columna='precio_unitario')}
+            FROM detalle_compras ORDER BY id_compra, id_detalle_compra"""),
+]
+
+# Reportes con dinero: se suma en céntimos (entero, exacto) y se divide al final
+SQL_CLIENTES_FRECUENTES_COMPACTO = """
+    SELECT v.id_cliente, c.nombre, count(*) as 'total_compras',
+           SUM(dv.precio_unitario_cent * dv.cantidad) / 100.0 as total_gastado
+    FROM ventas v
+    INNER JOIN detalle_ventas dv ON dv.id_venta = v.id_venta
+    INNER JOIN clientes c ON v.id_cliente = c.id_cliente
+    GROUP BY v.id_cliente
+    HAVING v.id_cliente IS NOT NULL
+    ORDER BY total_compras DESC
+    LIMIT 3
+    """
+
+SQL_CATEGORIAS_RENTABLES_COMPACTO = """
+    SELECT ca.id_categoria, ca.nombre_categoria, count(*) as 'n° ventas',
+           SUM(dv.cantidad * dv.precio_unitario_cent) / 100.0 as 'total_venta'
+    FROM detalle_ventas dv
+    INNER JOIN productos p ON dv.id_producto = p.id_producto
+    INNER JOIN categorias ca ON p.id_categoria = ca.id_categoria
+    GROUP BY ca.id_categoria
+    ORDER BY 4 DESC
+    """
+
+_SQL_COMPACTO = {
+    "clientes_frecuentes": SQL_CLIENTES_FRECUENTES_COMPACTO,
+    "categorias_rentables": SQL_CATEGORIAS_RENTABLES_COMPACTO,
+}
+
+# El resto de reportes solo cuenta líneas o cantidades y funciona igual en ambos esquemas
+REPORTES_COMPACTOS = [
+    {**reporte, "sql": _SQL_COMPACTO.get(reporte["clave"], reporte["sql"]), "sql_resumen": None}
+    for reporte in REPORTES
+]
+
+TABLAS_COMPARADAS = ('ventas', 'detalle_ventas', 'compras', 'detalle_compras', 'productos', 'clientes')
+
+def crear_tablas_compactas(conn, indices=True):
+    """Crea las tablas del esquema compacto (y sus índices, salvo indices=False)"""
+    for sentencia in TABLAS_COMPACTAS + (INDICES_COMPACTOS if indices else []):
+        conn.execute(sentencia)
+    conn.commit()
+
+def migrar(origen, destino, tamano_bloque=10_000):
+    """Copia la base origen (esquema de app.crear_tablas) a destino con el esquema compacto.
+
+    Lee con las particiones adjuntas, así que también copia las ventas
+    archivadas. Los índices se crean después de cargar los datos y el
+    archivo se publica con os.replace al terminar. Devuelve {tabla: filas}.
+    """
+    directorio = os.path.dirname(os.path.abspath(destino))
+    descriptor, temporal = tempfile.mkstemp(suffix='.db', dir=directorio)
+    os.close(descriptor)
+    fuente = conectar(origen)
+    copiadas = {}
+    try:
+        conn = sqlite3.connect(temporal)
+        try:
+            crear_tablas_compactas(conn, indices=False)
+            for tabla, columnas, sql in COPIAS:
+                marcadores = ", ".join("?" for _ in columnas.split(","))
+                insertar = f"INSERT INTO {tabla} ({columnas}) VALUES ({marcadores})"
+                copiadas[tabla] = 0
+                for _, filas in consultar_por_bloques(fuente, sql, tamano_bloque=tamano_bloque):
+                    conn.executemany(insertar, filas)
+                    copiadas[tabla] += len(filas)
+            for sentencia in INDICES_COMPACTOS:
+                conn.execute(sentencia)
+            conn.execute("ANALYZE")
+            conn.commit()
+        finally:
+            conn.close()
+        os.chmod(temporal, 0o644)
+        os.replace(temporal, destino)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    finally:
+        fuente.close()
+    return copiadas
+
+def tamano_tablas(ruta, tablas=TABLAS_COMPARADAS):
+    """Bytes que ocupan las tablas dadas junto con sus índices (según dbstat)"""
+    conn = sqlite3.connect(f"file:{ruta}?mode=ro", uri=True)
+    try:
+        marcadores = ", ".join("?" for _ in tablas)
+        return conn.execute(
+            f"""SELECT TOTAL(d.pgsize) FROM dbstat d
+            JOIN sqlite_master m ON m.name = d.name
+            WHERE m.tbl_name IN ({marcadores})""", tablas
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+def _tasa_insercion(crear_esquema, insertar_linea, ventas, numerar):
+    """Líneas por segundo al registrar `ventas` [(fecha, id_cliente, [(producto, cantidad, precio)])].
+
+    Con numerar=True cada línea lleva su n_linea después del id de la venta.
+    """
+    descriptor, ruta = tempfile.mkstemp(suffix='.db')
+    os.close(descriptor)
+    try:
+        conn = sqlite3.connect(ruta)
+        crear_esquema(conn)
+        lineas = 0
+        inicio = time.perf_counter()
+        with conn:
+            for fecha, id_cliente, detalle in ventas:
+                id_venta = conn.execute(
+                    "INSERT INTO ventas (fecha_venta, id_cliente) VALUES (?, ?)", (fecha, id_cliente)
+                ).lastrowid
+                if numerar:
+                    conn.executemany(insertar_linea, [(id_venta, n, *linea) for n, linea in enumerate(detalle, 1)])
+                else:
+                    conn.executemany(insertar_linea, [(id_venta, *linea) for linea in detalle])
+                lineas += len(detalle)
+        segundos = time.perf_counter() - inicio
+        conn.close()
+        return lineas / segundos
+    finally:
+        os.remove(ruta)
+
+def _esquema_normal(conn):
+    from app import crear_tablas
+    from migraciones import MIGRACIONES
+
+    crear_tablas(conn, migrar=False)
+    for sentencia in MIGRACIONES[0][2]:  # solo los índices de la migración 1
+        if sentencia.startswith("CREATE INDEX"):
+            conn.execute(sentencia)
+    conn.commit()
+
+def _latencia(ruta, sql, repeticiones):
+    """Mediana en ms de ejecutar sql `repeticiones` veces (con las particiones adjuntas)"""
+    conn = conectar(ruta)
+    try:
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            conn.execute(sql).fetchall()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(tiempos)
+    finally:
+        conn.close()
+
+def comparar(ruta_normal, ruta_compacta, ventas_insercion=20_000, repeticiones=3):
+    """Compara tamaño, tasa de inserción y latencia de reportes entre los dos esquemas"""
+    fuente = conectar(ruta_normal)
+    ventas = {}
+    for id_venta, fecha, id_cliente, id_producto, cantidad, precio in fuente.execute(
+        """SELECT v.id_venta, v.fecha_venta, v.id_cliente, dv.id_producto, dv.cantidad, dv.precio_unitario
+        FROM ventas v JOIN detalle_ventas dv ON dv.id_venta = v.id_venta
+        WHERE v.id_venta IN (SELECT id_venta FROM ventas ORDER BY id_venta LIMIT ?)
+        ORDER BY v.id_venta""", (ventas_insercion,)
+    ):
+        ventas.setdefault(id_venta, (fecha, id_cliente, []))[2].append((id_producto, cantidad, precio))
+    fuente.close()
+    en_centimos = [(fecha, cliente, [(p, c, round(precio * 100)) for p, c, precio in detalle])
+                   for fecha, cliente, detalle in ventas.values()]
+
+    resultado = {
+        "tamano": (tamano_tablas(ruta_normal), tamano_tablas(ruta_compacta)),
+        "insercion": (
+            _tasa_insercion(_esquema_normal,
+                            "INSERT INTO detalle_ventas (id_venta, id_producto, cantidad, precio_unitario) "
+                            "VALUES (?, ?, ?, ?)",
+                            list(ventas.values()), numerar=False),
+            _tasa_insercion(crear_tablas_compactas,
+                            "INSERT INTO detalle_ventas (id_venta, n_linea, id_producto, cantidad, precio_unitario_cent) "
+                            "VALUES (?, ?, ?, ?, ?)",
+                            en_centimos, numerar=True),
+        ),
+        "reportes": {},
+    }
+    for normal, compacto in zip(REPORTES, REPORTES_COMPACTOS):
+        resultado["reportes"][normal["clave"]] = (
+            _latencia(ruta_normal, normal["sql"], repeticiones),
+            _latencia(ruta_compacta, compacto["sql"], repeticiones),
+        )
+    return resultado
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Esquema compacto (céntimos, STRICT, WITHOUT ROWID)")
+    parser.add_argument('accion', choices=['migrar', 'comparar'])
+    parser.add_argument('--db', default='tienda.db', help="Base con el esquema normal")
+    parser.add_argument('--destino', default='tienda_compacta.db', help="Base con el esquema compacto")
+    parser.add_argument('--ventas', type=int, default=20_000, help="Ventas insertadas al medir la inserción")
+    parser.add_argument('--repeticiones', type=int, default=3, help="Ejecuciones de cada reporte")
+    args = parser.parse_args()
+
+    if args.accion == 'migrar':
+        inicio = time.perf_counter()
+        for tabla, filas in migrar(args.db, args.destino).items():
+            print(f"  - {tabla:<16} {filas:>9} filas")
+        print(f"'{args.destino}' creada en {time.perf_counter() - inicio:.1f} s.")
+    else:
+        if not os.path.exists(args.destino):
+            print(f"Migrando '{args.db}' a '{args.destino}'...")
+            migrar(args.db, args.destino)
+        r = comparar(args.db, args.destino, args.ventas, args.repeticiones)
+        normal, compacto = r["tamano"]
+        print(f"{'':<26}{'normal':>12}{'compacto':>12}")
+        print(f"{'Tamaño (MB)':<26}{normal / 1e6:>12.1f}{compacto / 1e6:>12.1f}   ({compacto / normal:.0%})")
+        normal, compacto = r["insercion"]
+        print(f"{'Inserción (líneas/s)':<26}{normal:>12,.0f}{compacto:>12,.0f}   (x{compacto / normal:.2f})")
+        for clave, (normal, compacto) in r["reportes"].items():
+            print(f"{clave + ' (ms)':<26}{normal:>12.1f}{compacto:>12.1f}   (x{normal / compacto:.2f})")
@@ -0,0 +1,202 @@
+"""Evolución de ventas en el tiempo desde un resumen diario por categoría.
+
+resumen_diario guarda, por día y categoría, las líneas vendidas
+(n_ventas, como en las demás tablas de resumen), las unidades y el total
+vendido. No lo mantienen triggers: resumir_pendientes suma solo las
+ventas con id_venta mayor que la marca guardada en resumen_diario_estado,
+así que cada actualización toca únicamente los días con ventas nuevas.
+El registro de ventas (registro.py e ingesta.py) la llama en la misma
+transacción de la venta cada ACTUALIZAR_CADA ventas, así que la marca
+avanza sola. Las consultas del gráfico leen el resumen y le agregan en
+vivo las ventas posteriores a la marca (a lo sumo unas cientas), de modo
+que un dashboard de solo lectura siempre ve los datos al día.
+
+La serie se agrupa en la base por día, semana o mes según el rango pedido,
+así que el gráfico recibe a lo sumo unos cientos de puntos sea cual sea
+la longitud de la historia. Si se borran o modifican ventas ya resumidas,
+hay que reconstruirlo con la acción 'construir'.
+
+Uso:
+    python evolucion.py actualizar --db tienda.db
+    python evolucion.py construir --db tienda.db
+    python evolucion.py serie --desde 2025-01-01 --hasta 2025-03-31 [--resolucion semana]
+"""
+import argparse
+import sqlite3
+import time
+from datetime import date
+
+MAX_PUNTOS = 400  # puntos por serie a partir de los cuales se pasa a una resolución más gruesa
+ACTUALIZAR_CADA = 500  # ventas sin resumir a partir de las cuales el registro de ventas avanza la marca
+
+# Resolución -> expresión SQL del inicio del periodo al que pertenece una fecha
+RESOLUCIONES = {
+    "dia": "{fecha}",
+    "semana": "date({fecha}, 'weekday 0', '-6 days')",  # lunes de la semana
+    "mes": "strftime('%Y-%m-01', {fecha})",
+}
+# Métrica del gráfico -> columna de la serie
+METRICAS = {
+    "Ingresos (S/.)": "total_venta",
+    "Unidades": "unidades",
+    "Líneas de venta": "n_ventas",
+}
+
+TABLAS_EVOLUCION = [
+    """
+    CREATE TABLE IF NOT EXISTS resumen_diario (
+        fecha TEXT NOT NULL,
+        id_categoria INTEGER NOT NULL,
+        n_ventas INTEGER NOT NULL DEFAULT 0,
+        unidades INTEGER NOT NULL DEFAULT 0,
+        total_venta REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (fecha, id_categoria)
+    ) WITHOUT ROWID;
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS resumen_diario_estado (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        marca INTEGER NOT NULL DEFAULT 0
+    );
+    """,
+    "INSERT OR IGNORE INTO resumen_diario_estado (id, marca) VALUES (1, 0)",
+]
+
+# Líneas de venta agrupadas por día y categoría (0 si el producto no tiene categoría).
+# CROSS JOIN fija el orden: se parte de las ventas filtradas por id_venta y no de los productos
+_SQL_DIARIO = """
+    SELECT date(v.fecha_venta) AS fecha, IFNULL(p.id_categoria, 0) AS id_categoria, COUNT(*) AS n_ventas,
+           SUM(dv.cantidad) AS unidades, SUM(dv.cantidad * dv.precio_unitario) AS total_venta
+    FROM ventas v
+    CROSS JOIN detalle_ventas dv ON dv.id_venta = v.id_venta
+    CROSS JOIN productos p ON p.id_producto = dv.id_producto
+    WHERE {filtro}
+    GROUP BY 1, 2
+"""
+
+SQL_ACTUALIZAR_DIARIO = f"""
+    INSERT INTO resumen_diario (fecha, id_categoria, n_ventas, unidades, total_venta)
+    {_SQL_DIARIO.format(filtro="v.id_venta > :marca AND v.id_venta <= :nueva")}
+    ON CONFLICT(fecha, id_categoria) DO UPDATE SET
+        n_ventas = n_ventas + excluded.n_ventas,
+        unidades = unidades + excluded.unidades,
+        total_venta = total_venta + excluded.total_venta
+"""
+
+RECONSTRUIR_DIARIO = [
+    "DELETE FROM resumen_diario",
+    f"INSERT INTO resumen_diario (fecha, id_categoria, n_ventas, unidades, total_venta) {_SQL_DIARIO.format(filtro='1')}",
+    "UPDATE resumen_diario_estado SET marca = (SELECT IFNULL(MAX(id_venta), 0) FROM ventas)",
+]
+
+def resolucion_para(desde, hasta, maximo=MAX_PUNTOS):
+    """La resolución más fina que deja el rango ('AAAA-MM-DD') en a lo sumo `maximo` puntos"""
+    dias = (date.fromisoformat(hasta) - date.fromisoformat(desde)).days + 1
+    if dias <= maximo:
+        return "dia"
+    if dias / 7 <= maximo:
+        return "semana"
+    return "mes"
+
+def sql_serie(resolucion, por_categoria=False):
+    """SQL de la serie entre :desde y :hasta ('AAAA-MM-DD') agrupada por periodo (y categoría).
+
+    Suma el resumen diario y las ventas posteriores a su marca; devuelve
+    periodo, [categoria,] n_ventas, unidades y total_venta.
+    """
+    periodo = RESOLUCIONES[resolucion].format(fecha="d.fecha")
+    categoria = "IFNULL(c.nombre_categoria, 'Sin categoría')"
+    # El + evita que el planificador recorra idx_ventas_fecha en todo el rango: las ventas
+    # posteriores a la marca son pocas y se buscan por la clave primaria
+    recientes = _SQL_DIARIO.format(filtro="""v.id_venta > (SELECT marca FROM resumen_diario_estado)
+          AND +v.fecha_venta >= :desde AND +v.fecha_venta < date(:hasta, '+1 day')""")
+    return f"""
+    WITH diario AS (
+        SELECT fecha, id_categoria, n_ventas, unidades, total_venta
+        FROM resumen_diario WHERE fecha BETWEEN :desde AND :hasta
+        UNION ALL
+        {recientes}
+    )
+    SELECT {periodo} AS periodo{f', {categoria} AS categoria' if por_categoria else ''},
+           SUM(d.n_ventas) AS n_ventas, SUM(d.unidades) AS unidades, ROUND(SUM(d.total_venta), 2) AS total_venta
+    FROM diario d
+    LEFT JOIN categorias c ON c.id_categoria = d.id_categoria
+    GROUP BY 1{', 2' if por_categoria else ''}
+    ORDER BY 1{', 2' if por_categoria else ''}
+    """
+
+# Primer y último día con ventas (para el rango por defecto del gráfico)
+SQL_RANGO_FECHAS = """
+    SELECT MIN(primero), MAX(ultimo) FROM (
+        SELECT MIN(fecha) AS primero, MAX(fecha) AS ultimo FROM resumen_diario
+        UNION ALL
+        SELECT date(MIN(fecha_venta)), date(MAX(fecha_venta)) FROM ventas
+        WHERE id_venta > (SELECT marca FROM resumen_diario_estado)
+    )
+"""
+
+def resumir_pendientes(conn, minimo=ACTUALIZAR_CADA):
+    """Suma al resumen las ventas posteriores a la marca, sin confirmar; devuelve cuántas eran.
+
+    Solo lo hace si la marca quedó al menos `minimo` ids atrás. En una base
+    sin resumen_diario (anterior a la migración 7) no hace nada.
+    """
+    try:
+        marca = conn.execute("SELECT marca FROM resumen_diario_estado").fetchone()[0]
+    except sqlite3.OperationalError as e:
+        if "no such table" in str(e):
+            return 0
+        raise
+    nueva = conn.execute("SELECT IFNULL(MAX(id_venta), 0) FROM ventas").fetchone()[0]
+    if nueva - marca < max(minimo, 1):
+        return 0
+    conn.execute(SQL_ACTUALIZAR_DIARIO, {"marca": marca, "nueva": nueva})
+    conn.execute("UPDATE resumen_diario_estado SET marca = ?", (nueva,))
+    return conn.execute("SELECT COUNT(*) FROM ventas WHERE id_venta > ? AND id_venta <= ?", (marca, nueva)).fetchone()[0]
+
+def actualizar_resumen_diario(conn):
+    """Suma al resumen todas las ventas nuevas desde la última marca y confirma; devuelve cuántas eran"""
+    with conn:
+        return resumir_pendientes(conn, minimo=1)
+
+def reconstruir_resumen_diario(conn):
+    """Vuelve a calcular el resumen diario desde cero (sin confirmar)"""
+    for sentencia in RECONSTRUIR_DIARIO:
+        conn.execute(sentencia)
+
+if __name__ == '__main__':
+    from migraciones import aplicar_migraciones
+    from particiones import conectar
+
+    parser = argparse.ArgumentParser(description="Resumen diario de ventas y serie de su evolución")
+    parser.add_argument('accion', choices=['actualizar', 'construir', 'serie'])
+    parser.add_argument('--db', default='tienda.db', help="Ruta de la base")
+    parser.add_argument('--desde', default=None, help="Primer día (AAAA-MM-DD)")
+    parser.add_argument('--hasta', default=None, help="Último día (AAAA-MM-DD)")
+    parser.add_argument('--resolucion', choices=list(RESOLUCIONES), default=None,
+                        help="Por defecto, la más fina con a lo sumo MAX_PUNTOS puntos")
+    args = parser.parse_args()
+
+    if args.accion in ('actualizar', 'construir'):
+        conn = sqlite3.connect(args.db)
+        aplicar_migraciones(conn)
+        conn.close()
+    # Con las particiones adjuntas el resumen incluye también las ventas archivadas
+    conn = conectar(args.db, solo_lectura=args.accion == 'serie')
+    inicio = time.perf_counter()
+    if args.accion == 'actualizar':
+        print(f"{actualizar_resumen_diario(conn)} ventas nuevas resumidas en {time.perf_counter() - inicio:.2f} s.")
+    elif args.accion == 'construir':
+        reconstruir_resumen_diario(conn)
+        conn.commit()
+        print(f"Resumen diario reconstruido en {time.perf_counter() - inicio:.2f} s.")
+    else:
+        primero, ultimo = conn.execute(SQL_RANGO_FECHAS).fetchone()
+        desde, hasta = args.desde or primero, args.hasta or ultimo
+        if desde is None:
+            raise SystemExit("No hay ventas.")
+        resolucion = args.resolucion or resolucion_para(desde, hasta)
+        for fila in conn.execute(sql_serie(resolucion), {"desde": desde, "hasta": hasta}):
+            print("  ".join(str(valor) for valor in fila))
+        print(f"Serie por {resolucion} en {(time.perf_counter() - inicio) * 1000:.1f} ms.")
+    conn.close()
@@ -0,0 +1,202 @@
+import argparse
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import numpy as np
+from faker import Faker
+
+from app import crear_conexion, crear_tablas
+from migraciones import aplicar_migraciones
+from add_records import (
+    CATEGORIAS, MARCAS, PROVEEDORES, PRODUCTOS,
+    CLIENTES_POR_ESCALA, COMPRAS_POR_ESCALA, VENTAS_POR_ESCALA, PRAGMAS_CARGA
+)
+
+# Fecha final fija por defecto: con la misma semilla la salida es idéntica byte a byte
+FECHA_FIN_DEFECTO = date(2025, 5, 22)
+TAMANO_POOL_NOMBRES = 2_000
+VENTAS_POR_SHARD = 250_000
+
+def _fechas(rng, fecha_fin, dias, n):
+    """n fechas ISO aleatorias entre fecha_fin - dias y fecha_fin"""
+    fin = np.datetime64(fecha_fin.isoformat(), 'D')
+    return (fin - rng.integers(0, dias + 1, n)).astype(str)
+
+def _lineas(rng, ids_cabecera):
+    """Entre 1 y 5 líneas por cabecera; devuelve el id de cabecera de cada línea"""
+    por_cabecera = rng.integers(1, 6, len(ids_cabecera))
+    return np.repeat(ids_cabecera, por_cabecera)
+
+def _aceptar_con_stock(id_producto, cantidad, presupuesto):
+    """Máscara de líneas que caben en el stock disponible por producto.
+
+    Se aceptan las líneas en orden mientras el acumulado del producto no
+    supere su presupuesto, así que el stock nunca queda en negativo.
+    """
+    orden = np.argsort(id_producto, kind='stable')
+    productos_ordenados = id_producto[orden]
+    acumulado = np.cumsum(cantidad[orden])
+    inicio_grupo = np.r_[True, productos_ordenados[1:] != productos_ordenados[:-1]]
+    base = np.maximum.accumulate(np.where(inicio_grupo, acumulado - cantidad[orden], 0))
+    aceptadas = np.empty(len(id_producto), dtype=bool)
+    aceptadas[orden] = (acumulado - base) <= presupuesto[productos_ordenados]
+    return aceptadas
+
+def _generar_shard(tarea):
+    """Genera un tramo del historial de ventas en su propio archivo SQLite"""
+    (ruta_shard, semilla, primer_id, n_ventas, ids_clientes,
+     precios_venta, presupuesto, fecha_fin) = tarea
+    rng = np.random.default_rng(semilla)
+
+    ids_venta = np.arange(primer_id, primer_id + n_ventas)
+    fechas = _fechas(rng, fecha_fin, 182, n_ventas)
+    con_cliente = rng.random(n_ventas) > 0.3  # 30% ventas sin cliente
+    clientes = np.where(con_cliente, ids_clientes[rng.integers(0, len(ids_clientes), n_ventas)], 0)
+
+    linea_venta = _lineas(rng, ids_venta)
+    indice_producto = rng.integers(0, len(precios_venta), len(linea_venta))
+    cantidad = rng.integers(1, 6, len(linea_venta))
+    aceptadas = _aceptar_con_stock(indice_producto, cantidad, presupuesto)
+    linea_venta, indice_producto, cantidad = linea_venta[aceptadas], indice_producto[aceptadas], cantidad[aceptadas]
+
+    if os.path.exists(ruta_shard):
+        os.remove(ruta_shard)
+    conn = sqlite3.connect(ruta_shard)
+    for pragma in PRAGMAS_CARGA:
+        conn.execute(pragma)
+    conn.execute("CREATE TABLE ventas (id_venta INTEGER PRIMARY KEY, fecha_venta DATE, id_cliente INTEGER)")
+    conn.execute("""CREATE TABLE detalle_ventas (
+        id_venta INTEGER, id_producto INTEGER, cantidad INTEGER, precio_unitario REAL)""")
+    conn.executemany(
+        "INSERT INTO ventas VALUES (?, ?, NULLIF(?, 0))",
+        zip(ids_venta.tolist(), fechas.tolist(), clientes.tolist())
+    )
+    conn.executemany(
+        "INSERT INTO detalle_ventas VALUES (?, ?, ?, ?)",
+        zip(linea_venta.tolist(), (indice_producto + 1).tolist(), cantidad.tolist(),
+            precios_venta[indice_producto].tolist())
+    )
+    conn.commit()
+    conn.close()
+    return ruta_shard, np.bincount(indice_producto, weights=cantidad, minlength=len(precios_venta))
+
+def generar_base(ruta, escala, semilla=0, procesos=None, fecha_fin=FECHA_FIN_DEFECTO):
+    """Genera una base nueva con escala veces el volumen de poblar_tablas.
+
+    Todos los valores salen de arrays NumPy con una semilla fija y los
+    nombres de clientes de un pool pregenerado con Faker. El historial de
+    ventas se reparte en shards que genera un pool de procesos y luego se
+    fusionan en orden, por lo que la salida no depende de cuántos procesos
+    se usen.
+    """
+    if os.path.exists(ruta):
+        raise FileExistsError(f"La base '{ruta}' ya existe; usa una ruta nueva")
+    inicio_carga = time.perf_counter()
+    semillas = np.random.SeedSequence(semilla)
+    semilla_catalogo, semilla_ventas = semillas.spawn(2)
+    rng = np.random.default_rng(semilla_catalogo)
+
+    conn = crear_conexion(ruta)
+    crear_tablas(conn, migrar=False)  # los índices se crean después de la carga
+    for pragma in PRAGMAS_CARGA:
+        conn.execute(pragma)
+    cursor = conn.cursor()
+
+    # --- 1. Catálogo fijo ---
+    cursor.executemany("INSERT INTO categorias (nombre_categoria) VALUES (?)", CATEGORIAS)
+    cursor.executemany("INSERT INTO marcas (nombre_marca) VALUES (?)", MARCAS)
+    cursor.executemany("INSERT INTO proveedores (nombre_proveedor, contacto) VALUES (?,?)", PROVEEDORES)
+    cursor.executemany(
+        """INSERT INTO productos (id_producto, nombre_producto, id_categoria, id_marca, precio_venta,
+        precio_compra, stock, unidad_medida, tamano, especificaciones) VALUES (?,?,?,?,?,?,?,?,?,?)""",
+        [(i,) + producto for i, producto in enumerate(PRODUCTOS, start=1)]
+    )
+    precios_compra = np.array([producto[4] for producto in PRODUCTOS])
+    precios_venta = np.array([producto[3] for producto in PRODUCTOS])
+
+    # --- 2. Clientes desde un pool de nombres ---
+    fake = Faker('es_ES')
+    fake.seed_instance(semilla)
+    pool_nombres = np.array([fake.name() for _ in range(TAMANO_POOL_NOMBRES)], dtype=object)
+    n_clientes = CLIENTES_POR_ESCALA * escala
+    nombres = pool_nombres[rng.integers(0, TAMANO_POOL_NOMBRES, n_clientes)]
+    cursor.executemany(
+        "INSERT INTO clientes (id_cliente, nombre, telefono) VALUES (?,?,?)",
+        ((i, nombre, f"9{i:08d}") for i, nombre in enumerate(nombres.tolist(), start=1))
+    )
+    ids_clientes = np.arange(1, n_clientes + 1)
+
+    # --- 3. Compras vectorizadas ---
+    n_compras = COMPRAS_POR_ESCALA * escala
+    ids_compra = np.arange(1, n_compras + 1)
+    cursor.executemany(
+        "INSERT INTO compras (id_compra, fecha_compra, id_proveedor) VALUES (?,?,?)",
+        zip(ids_compra.tolist(), _fechas(rng, fecha_fin, 365, n_compras).tolist(),
+            rng.integers(1, len(PROVEEDORES) + 1, n_compras).tolist())
+    )
+    linea_compra = _lineas(rng, ids_compra)
+    indice_compra = rng.integers(0, len(PRODUCTOS), len(linea_compra))
+    cantidad_compra = rng.integers(10, 101, len(linea_compra))
+    cursor.executemany(
+        "INSERT INTO detalle_compras (id_compra, id_producto, cantidad, precio_unitario) VALUES (?,?,?,?)",
+        zip(linea_compra.tolist(), (indice_compra + 1).tolist(), cantidad_compra.tolist(),
+            precios_compra[indice_compra].tolist())
+    )
+    comprado = np.bincount(indice_compra, weights=cantidad_compra, minlength=len(PRODUCTOS)).astype(np.int64)
+    conn.commit()
+
+    # --- 4. Ventas en shards paralelos, cada uno con su parte del stock ---
+    n_ventas = VENTAS_POR_ESCALA * escala
+    n_shards = max(1, -(-n_ventas // VENTAS_POR_SHARD))
+    presupuestos = np.tile(comprado // n_shards, (n_shards, 1))
+    presupuestos[0] += comprado % n_shards
+    tareas = []
+    for n, semilla_shard in enumerate(semilla_ventas.spawn(n_shards)):
+        primero = n * VENTAS_POR_SHARD
+        tareas.append((
+            f"{ruta}.shard{n}", semilla_shard, primero + 1, min(VENTAS_POR_SHARD, n_ventas - primero),
+            ids_clientes, precios_venta, presupuestos[n], fecha_fin
+        ))
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        resultados = list(pool.map(_generar_shard, tareas))
+
+    # --- 5. Fusión ordenada de los shards en la base final ---
+    # Los ids de los shards ya son válidos por construcción: no hace falta validar cada FK
+    conn.execute("PRAGMA foreign_keys = OFF")
+    vendido = np.zeros(len(PRODUCTOS), dtype=np.int64)
+    for ruta_shard, vendido_shard in resultados:
+        cursor.execute("ATTACH DATABASE ? AS shard", (ruta_shard,))
+        cursor.execute("INSERT INTO ventas (id_venta, fecha_venta, id_cliente) SELECT * FROM shard.ventas ORDER BY id_venta")
+        cursor.execute("""INSERT INTO detalle_ventas (id_venta, id_producto, cantidad, precio_unitario)
+            SELECT id_venta, id_producto, cantidad, precio_unitario FROM shard.detalle_ventas ORDER BY rowid""")
+        conn.commit()
+        cursor.execute("DETACH DATABASE shard")
+        os.remove(ruta_shard)
+        vendido += vendido_shard.astype(np.int64)
+
+    cursor.executemany(
+        "UPDATE productos SET stock = ? WHERE id_producto = ?",
+        zip((comprado - vendido).tolist(), range(1, len(PRODUCTOS) + 1))
+    )
+    conn.commit()
+    conn.execute("PRAGMA foreign_keys = ON")
+    aplicar_migraciones(conn)
+    conn.execute("PRAGMA journal_mode = DELETE")
+    n_detalle = cursor.execute("SELECT MAX(id_detalle_venta) FROM detalle_ventas").fetchone()[0] or 0
+    conn.close()
+
+    segundos = time.perf_counter() - inicio_carga
+    print(f"Base '{ruta}' generada en {segundos:.1f} s con semilla {semilla}: "
+          f"{n_ventas:,} ventas, {n_detalle:,} líneas de venta en {n_shards} shards")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generador sintético reproducible de tienda.db")
+    parser.add_argument('--scale', type=int, default=1, help="Escala respecto al volumen por defecto")
+    parser.add_argument('--seed', type=int, default=0, help="Semilla; la misma semilla da el mismo archivo")
+    parser.add_argument('--procesos', type=int, default=None, help="Procesos del pool (por defecto, núcleos)")
+    parser.add_argument('--db', required=True, help="Ruta de la base nueva (no debe existir)")
+    args = parser.parse_args()
+    generar_base(args.db, args.scale, semilla=args.seed, procesos=args.procesos)
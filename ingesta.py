@@ -0,0 +1,208 @@
+"""Servicio asyncio de ingesta de ventas con commits agrupados.
+
+Los productores encolan ventas con `await servicio.registrar(...)`. Una
+única tarea escritora junta las que llegan en un lote (hasta max_lote
+ventas o max_espera_ms de espera) y las confirma en una sola transacción,
+así el costo del fsync del commit se reparte entre todo el lote. Cada
+venta va en su propio SAVEPOINT: si una no tiene stock, solo esa se
+rechaza. Cada productor recibe su id_venta cuando el lote ya es durable;
+si se cancela antes de que su lote empiece a confirmarse, su venta no se
+guarda.
+
+Para probarlo en local con productores simulados:
+    python ingesta.py --db copia_tienda.db --productores 100 --ventas 50
+"""
+import argparse
+import asyncio
+import random
+import shutil
+import sqlite3
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from evolucion import resumir_pendientes
+from registro import (ErrorRegistro, con_reintentos, conectar_escritura, esta_ocupada, insertar_compra,
+                      insertar_venta)
+
+def percentiles(valores, puntos=(50, 95, 99)):
+    """{p: valor} para los percentiles pedidos (en las mismas unidades que valores)"""
+    if len(valores) < 2:
+        return {p: (valores[0] if valores else 0.0) for p in puntos}
+    cortes = statistics.quantiles(valores, n=100, method='inclusive')
+    return {p: cortes[p - 1] for p in puntos}
+
+class ServicioIngesta:
+    """Cola de ventas con una tarea escritora que confirma por lotes"""
+
+    def __init__(self, ruta, max_lote=256, max_espera_ms=5.0):
+        self.ruta = ruta
+        self.max_lote = max_lote
+        self.max_espera = max_espera_ms / 1000
+        self.latencias_commit = []   # segundos por lote confirmado
+        self.latencias_venta = []    # segundos desde encolar hasta recibir el id
+        self.tamanos_lote = []
+        self._cola = None
+        self._escritor = None
+        # La conexión SQLite vive siempre en el mismo hilo
+        self._hilo = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingesta")
+        self._conn = None
+
+    def _abrir(self):
+        self._conn = conectar_escritura(self.ruta)
+        self._conn.execute("PRAGMA synchronous = FULL")  # el id se entrega solo cuando el lote es durable
+
+    async def iniciar(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._hilo, self._abrir)
+        self._cola = asyncio.Queue()
+        self._escritor = asyncio.create_task(self._escribir())
+
+    async def registrar(self, lineas, id_cliente=None, fecha=None):
+        """Encola una venta y espera su id_venta (o la excepción de negocio)"""
+        futuro = asyncio.get_running_loop().create_future()
+        await self._cola.put(((list(lineas), id_cliente, fecha), futuro, time.perf_counter()))
+        return await futuro
+
+    def _confirmar_lote(self, ventas):
+        """Confirma un lote en una transacción; devuelve un id o una excepción por venta"""
+        def operacion(conn):
+            resultados = []
+            for lineas, id_cliente, fecha in ventas:
+                conn.execute("SAVEPOINT venta")
+                try:
+                    resultados.append(insertar_venta(conn, lineas, id_cliente, fecha))
+                    conn.execute("RELEASE venta")
+                except (ErrorRegistro, sqlite3.DatabaseError) as e:
+                    # Un bloqueo lo reintenta con_reintentos con todo el lote; si SQLite ya
+                    # deshizo la transacción no queda savepoint al que volver
+                    if isinstance(e, sqlite3.DatabaseError) and (esta_ocupada(e) or not conn.in_transaction):
+                        raise
+                    # Stock, cliente o producto inexistente, CHECK...: falla solo esta venta
+                    conn.execute("ROLLBACK TO venta")
+                    conn.execute("RELEASE venta")
+                    resultados.append(e)
+            resumir_pendientes(conn)  # cada ACTUALIZAR_CADA ventas avanza el resumen diario
+            return resultados
+        return con_reintentos(self._conn, operacion)
+
+    async def _escribir(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            primero = await self._cola.get()
+            if primero is None:
+                break
+            lote = [primero]
+            limite = loop.time() + self.max_espera
+            fin = False
+            while len(lote) < self.max_lote:
+                restante = limite - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    siguiente = await asyncio.wait_for(self._cola.get(), restante)
+                except asyncio.TimeoutError:
+                    break
+                if siguiente is None:
+                    fin = True
+                    break
+                lote.append(siguiente)
+
+            # Las ventas cuyo productor ya dejó de esperar (cancelado o con timeout) no se guardan
+            lote = [pedido for pedido in lote if not pedido[1].done()]
+            if lote:
+                await self._confirmar_y_avisar(loop, lote)
+            if fin:
+                break
+
+    async def _confirmar_y_avisar(self, loop, lote):
+        inicio = time.perf_counter()
+        try:
+            resultados = await loop.run_in_executor(
+                self._hilo, self._confirmar_lote, [venta for venta, _, _ in lote])
+        except Exception as e:  # el lote entero falló: se avisa a todos sus productores
+            resultados = [e] * len(lote)
+        ahora = time.perf_counter()
+        self.latencias_commit.append(ahora - inicio)
+        self.tamanos_lote.append(len(lote))
+        for (_, futuro, encolado), resultado in zip(lote, resultados):
+            self.latencias_venta.append(ahora - encolado)
+            if futuro.done():
+                continue  # el productor se fue mientras se confirmaba el lote
+            try:
+                if isinstance(resultado, Exception):
+                    futuro.set_exception(resultado)
+                else:
+                    futuro.set_result(resultado)
+            except asyncio.InvalidStateError:
+                pass  # un aviso que no llega no debe detener a la tarea escritora
+
+    async def detener(self):
+        """Confirma lo pendiente y cierra la conexión"""
+        await self._cola.put(None)
+        await self._escritor
+        await asyncio.get_running_loop().run_in_executor(self._hilo, self._conn.close)
+        self._hilo.shutdown()
+
+    def metricas(self):
+        """Resumen de latencias (ms) y tamaños de lote"""
+        a_ms = lambda valores: [v * 1000 for v in valores]
+        return {
+            "lotes": len(self.tamanos_lote),
+            "ventas_por_lote": statistics.mean(self.tamanos_lote) if self.tamanos_lote else 0,
+            "commit_ms": percentiles(a_ms(self.latencias_commit)),
+            "venta_ms": percentiles(a_ms(self.latencias_venta)),
+        }
+
+async def simular(ruta, productores, ventas_por_productor, max_lote, max_espera_ms, semilla=0):
+    """Productores simulados que registran ventas aleatorias contra ruta"""
+    rng = random.Random(semilla)
+    conn = conectar_escritura(ruta)
+    ids_productos = [fila[0] for fila in conn.execute("SELECT id_producto FROM productos")]
+    ids_clientes = [fila[0] for fila in conn.execute("SELECT id_cliente FROM clientes")]
+    id_proveedor = conn.execute("SELECT MIN(id_proveedor) FROM proveedores").fetchone()[0]
+    # Reponer stock para que la simulación mida escrituras y no rechazos
+    con_reintentos(conn, lambda c: insertar_compra(c, id_proveedor, [(p, 1_000_000) for p in ids_productos]))
+    conn.close()
+
+    servicio = ServicioIngesta(ruta, max_lote=max_lote, max_espera_ms=max_espera_ms)
+    await servicio.iniciar()
+    rechazadas = 0
+
+    async def productor():
+        nonlocal rechazadas
+        for _ in range(ventas_por_productor):
+            lineas = [(rng.choice(ids_productos), rng.randint(1, 5)) for _ in range(rng.randint(1, 5))]
+            cliente = rng.choice(ids_clientes) if ids_clientes and rng.random() > 0.3 else None
+            try:
+                await servicio.registrar(lineas, cliente)
+            except ErrorRegistro:
+                rechazadas += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(productor() for _ in range(productores)))
+    await servicio.detener()
+    segundos = time.perf_counter() - inicio
+
+    total = productores * ventas_por_productor
+    metricas = servicio.metricas()
+    print(f"{total:,} ventas ({rechazadas} rechazadas) en {segundos:.2f} s -> {total / segundos:,.0f} ventas/s")
+    print(f"{metricas['lotes']:,} commits, {metricas['ventas_por_lote']:.1f} ventas por lote")
+    for nombre in ("commit_ms", "venta_ms"):
+        valores = metricas[nombre]
+        print(f"{nombre:<10} p50 {valores[50]:8.2f} | p95 {valores[95]:8.2f} | p99 {valores[99]:8.2f}")
+    return metricas
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Simulación local del servicio de ingesta")
+    parser.add_argument('--db', required=True, help="Base de pruebas (se modifica; usa una copia)")
+    parser.add_argument('--copiar-de', default=None, help="Copia esta base sobre --db antes de empezar")
+    parser.add_argument('--productores', type=int, default=100)
+    parser.add_argument('--ventas', type=int, default=50, help="Ventas por productor")
+    parser.add_argument('--max-lote', type=int, default=256)
+    parser.add_argument('--max-espera-ms', type=float, default=5.0)
+    args = parser.parse_args()
+
+    if args.copiar_de:
+        shutil.copyfile(args.copiar_de, args.db)
+    asyncio.run(simular(args.db, args.productores, args.ventas, args.max_lote, args.max_espera_ms))
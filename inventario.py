@@ -0,0 +1,191 @@
+"""Conciliación del stock de productos contra el libro de compras y ventas.
+
+productos.stock se modifica en su sitio; aquí se comprueba que coincida con
+    stock del último snapshot + compras posteriores - ventas posteriores
+para todos los productos en una sola consulta agrupada. Cada snapshot
+guarda el stock de todos los productos y el último id de detalle_compras y
+detalle_ventas que ya refleja, así que la conciliación solo lee las líneas
+nuevas (búsqueda por rango de rowid), no toda la historia. Los ids son
+AUTOINCREMENT, así que una línea con id mayor siempre es posterior.
+
+Sin snapshots, la base de comparación es stock 0 antes de la primera línea:
+la primera conciliación recorre toda la historia en una pasada agrupada.
+Un snapshot solo se guarda si esa conciliación cuadra (o con forzar=True,
+por ejemplo tras un conteo físico), así que nunca da por bueno un stock
+que no se comprobó.
+
+Uso:
+    python inventario.py snapshot --db tienda.db
+    python inventario.py conciliar --db tienda.db
+"""
+import argparse
+
+TABLAS_INVENTARIO = [
+    """
+    CREATE TABLE IF NOT EXISTS inventario_snapshots (
+        id_snapshot INTEGER PRIMARY KEY AUTOINCREMENT,
+        fecha TEXT NOT NULL DEFAULT (datetime('now')),
+        ultimo_detalle_compra INTEGER NOT NULL,
+        ultimo_detalle_venta INTEGER NOT NULL
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS inventario_snapshot_stock (
+        id_snapshot INTEGER NOT NULL,
+        id_producto INTEGER NOT NULL,
+        stock INTEGER NOT NULL,
+        PRIMARY KEY (id_snapshot, id_producto),
+        FOREIGN KEY (id_snapshot) REFERENCES inventario_snapshots(id_snapshot)
+    ) WITHOUT ROWID;
+    """,
+]
+
+# Stock de partida por producto: el del snapshot o, sin snapshot, 0 antes de la primera línea
+BASE_SNAPSHOT = "SELECT id_producto, stock FROM inventario_snapshot_stock WHERE id_snapshot = :id_snapshot"
+BASE_VACIA = "SELECT id_producto, 0 AS stock FROM productos"
+
+SQL_CONCILIACION = """
+WITH base AS ({base}),
+movimientos AS (
+    SELECT id_producto, SUM(cantidad) AS entradas, 0 AS salidas
+    FROM detalle_compras
+    WHERE id_detalle_compra > :ultima_compra
+    GROUP BY id_producto
+    UNION ALL
+    SELECT id_producto, 0, SUM(cantidad)
+    FROM detalle_ventas
+    WHERE id_detalle_venta > :ultima_venta
+    GROUP BY id_producto
+),
+por_producto AS (
+    SELECT id_producto, SUM(entradas) AS entradas, SUM(salidas) AS salidas
+    FROM movimientos
+    GROUP BY id_producto
+)
+SELECT
+    p.id_producto,
+    p.nombre_producto,
+    s.stock AS stock_snapshot,
+    COALESCE(m.entradas, 0) AS entradas,
+    COALESCE(m.salidas, 0) AS salidas,
+    s.stock + COALESCE(m.entradas, 0) - COALESCE(m.salidas, 0) AS stock_esperado,
+    p.stock AS stock_actual
+FROM productos p
+LEFT JOIN base s ON s.id_producto = p.id_producto
+LEFT JOIN por_producto m ON m.id_producto = p.id_producto
+ORDER BY p.id_producto
+"""
+
+def crear_tablas_inventario(conn):
+    for sentencia in TABLAS_INVENTARIO:
+        conn.execute(sentencia)
+
+def ultimo_snapshot(conn):
+    """(id_snapshot, fecha, ultimo_detalle_compra, ultimo_detalle_venta) o None"""
+    return conn.execute(
+        """SELECT id_snapshot, fecha, ultimo_detalle_compra, ultimo_detalle_venta
+        FROM inventario_snapshots ORDER BY id_snapshot DESC LIMIT 1"""
+    ).fetchone()
+
+def tomar_snapshot(conn, forzar=False):
+    """Concilia y, si todo cuadra, guarda el stock actual; devuelve el id del snapshot.
+
+    Conciliación, stock e ids de detalle se leen en la misma transacción
+    inmediata, así que el snapshot es consistente aunque haya escritores
+    concurrentes. Si hay diferencias lanza ValueError, salvo con forzar=True.
+    """
+    crear_tablas_inventario(conn)
+    with conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        _, diferencias = conciliar(conn)
+        if diferencias and not forzar:
+            raise ValueError(f"{len(diferencias)} producto(s) no cuadran con compras y ventas")
+        id_snapshot = conn.execute(
+            """INSERT INTO inventario_snapshots (ultimo_detalle_compra, ultimo_detalle_venta)
+            SELECT (SELECT COALESCE(MAX(id_detalle_compra), 0) FROM detalle_compras),
+                   (SELECT COALESCE(MAX(id_detalle_venta), 0) FROM detalle_ventas)"""
+        ).lastrowid
+        conn.execute(
+            """INSERT INTO inventario_snapshot_stock (id_snapshot, id_producto, stock)
+            SELECT ?, id_producto, stock FROM productos""",
+            (id_snapshot,)
+        )
+    return id_snapshot
+
+def conciliar(conn, id_snapshot=None):
+    """Compara el stock actual con el esperado según el snapshot y los movimientos posteriores.
+
+    Devuelve (snapshot, diferencias), donde diferencias es una lista de
+    diccionarios solo con los productos que no cuadran. Un producto creado
+    después del snapshot aparece con stock_esperado None. Sin snapshots,
+    snapshot es (None, None, 0, 0) y se concilia toda la historia desde
+    stock 0.
+    """
+    existe = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'inventario_snapshots'"
+    ).fetchone()
+    if not existe:
+        snapshot = None
+    elif id_snapshot is None:
+        snapshot = ultimo_snapshot(conn)
+    else:
+        snapshot = conn.execute(
+            """SELECT id_snapshot, fecha, ultimo_detalle_compra, ultimo_detalle_venta
+            FROM inventario_snapshots WHERE id_snapshot = ?""", (id_snapshot,)
+        ).fetchone()
+        if snapshot is None:
+            raise ValueError(f"No existe el snapshot {id_snapshot}")
+    if snapshot is None:
+        snapshot = (None, None, 0, 0)
+
+    sql = SQL_CONCILIACION.format(base=BASE_VACIA if snapshot[0] is None else BASE_SNAPSHOT)
+    cursor = conn.execute(sql, {
+        "id_snapshot": snapshot[0], "ultima_compra": snapshot[2], "ultima_venta": snapshot[3],
+    })
+    columnas = [d[0] for d in cursor.description]
+    diferencias = []
+    for fila in cursor:
+        registro = dict(zip(columnas, fila))
+        if registro["stock_esperado"] != registro["stock_actual"]:
+            diferencias.append(registro)
+    return snapshot, diferencias
+
+def imprimir_diferencias(snapshot, diferencias):
+    if snapshot[0] is None:
+        print("Sin snapshots: se concilia toda la historia desde stock 0")
+    else:
+        print(f"Snapshot {snapshot[0]} del {snapshot[1]} (compras > {snapshot[2]}, ventas > {snapshot[3]})")
+    if not diferencias:
+        print("El stock de todos los productos cuadra con compras y ventas.")
+        return
+    print(f"{len(diferencias)} producto(s) con diferencias:")
+    for d in diferencias:
+        esperado = "sin snapshot" if d["stock_esperado"] is None else d["stock_esperado"]
+        print(f"  - {d['id_producto']:>5} {d['nombre_producto']:<40} esperado {esperado} | actual {d['stock_actual']}")
+
+if __name__ == '__main__':
+    from particiones import conectar
+
+    parser = argparse.ArgumentParser(description="Snapshots y conciliación del inventario")
+    parser.add_argument('accion', choices=['snapshot', 'conciliar'])
+    parser.add_argument('--db', default='tienda.db', help="Ruta de la base")
+    parser.add_argument('--forzar', action='store_true', help="Tomar el snapshot aunque haya diferencias")
+    args = parser.parse_args()
+
+    conn = conectar(args.db, solo_lectura=False)  # ve también las ventas archivadas
+    if args.accion == 'snapshot':
+        try:
+            print(f"Snapshot {tomar_snapshot(conn, forzar=args.forzar)} guardado.")
+        except ValueError:
+            imprimir_diferencias(*conciliar(conn))
+            conn.close()
+            print("No se tomó el snapshot: corrige las diferencias o usa --forzar.")
+            raise SystemExit(1)
+    else:
+        snapshot, diferencias = conciliar(conn)
+        imprimir_diferencias(snapshot, diferencias)
+        if diferencias:
+            conn.close()
+            raise SystemExit(1)
+    conn.close()
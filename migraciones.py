@@ -0,0 +1,171 @@
+"""Migraciones versionadas del esquema de tienda.db.
+
+La versión aplicada se guarda en PRAGMA user_version. Cada migración se
+ejecuta una sola vez y en orden, así que una base existente se actualiza
+en su sitio con solo volver a llamar a aplicar_migraciones.
+"""
+import argparse
+import re
+import sqlite3
+from sqlite3 import Error
+
+from busqueda import ESQUEMA_BUSQUEDA, RECONSTRUIR_BUSQUEDA, TRIGGERS_BUSQUEDA
+from consultas import REPORTES
+from evolucion import RECONSTRUIR_DIARIO, TABLAS_EVOLUCION, reconstruir_resumen_diario
+from inventario import TABLAS_INVENTARIO
+from particiones import TABLAS_PARTICIONES, conectar, listar_particiones, ruta_principal
+from resumenes import RECONSTRUIR_RESUMENES, TABLAS_RESUMEN, TRIGGERS_RESUMEN
+from sketches import RECONSTRUIR_SKETCHES, TABLAS_SKETCHES, TRIGGERS_SKETCHES, reconstruir_sketches
+
+# (versión, descripción, sentencias)
+MIGRACIONES = [
+    (1, "Índices para claves foráneas y fechas", [
+        # Cubren los joins y agregados de los reportes sin tocar la tabla
+        "CREATE INDEX IF NOT EXISTS idx_detalle_ventas_producto ON detalle_ventas(id_producto, cantidad, precio_unitario)",
+        "CREATE INDEX IF NOT EXISTS idx_detalle_ventas_venta ON detalle_ventas(id_venta, id_producto, cantidad, precio_unitario)",
+        "CREATE INDEX IF NOT EXISTS idx_ventas_cliente ON ventas(id_cliente, fecha_venta)",
+        "CREATE INDEX IF NOT EXISTS idx_ventas_fecha ON ventas(fecha_venta)",
+        "CREATE INDEX IF NOT EXISTS idx_productos_categoria ON productos(id_categoria)",
+        "CREATE INDEX IF NOT EXISTS idx_compras_proveedor ON compras(id_proveedor)",
+        "CREATE INDEX IF NOT EXISTS idx_detalle_compras_compra ON detalle_compras(id_compra, id_producto, cantidad)",
+        "CREATE INDEX IF NOT EXISTS idx_detalle_compras_producto ON detalle_compras(id_producto, cantidad)",
+        "PRAGMA analysis_limit = 1000",  # estadísticas aproximadas: ANALYZE rápido en bases grandes
+        "ANALYZE",
+    ]),
+    (2, "Tablas de resumen mantenidas por triggers",
+        TABLAS_RESUMEN + list(TRIGGERS_RESUMEN.values()) + RECONSTRUIR_RESUMENES),
+    (3, "Snapshots de inventario para la conciliación de stock", TABLAS_INVENTARIO),
+    (4, "Búsqueda de productos (FTS5 y atributos del JSON indexados)",
+        ESQUEMA_BUSQUEDA + list(TRIGGERS_BUSQUEDA.values()) + RECONSTRUIR_BUSQUEDA),
+    (5, "Registro de particiones de ventas archivadas", TABLAS_PARTICIONES),
+    (6, "Sketches del top aproximado de productos y clientes",
+        TABLAS_SKETCHES + list(TRIGGERS_SKETCHES.values()) + RECONSTRUIR_SKETCHES),
+    (7, "Resumen diario de ventas por categoría para la evolución de ventas",
+        TABLAS_EVOLUCION + RECONSTRUIR_DIARIO),
+    (8, "Sketch de clientes con más capacidad (trigger nuevo y sketches reconstruidos)",
+        [f"DROP TRIGGER IF EXISTS {nombre}" for nombre in TRIGGERS_SKETCHES]
+        + list(TRIGGERS_SKETCHES.values()) + RECONSTRUIR_SKETCHES),
+]
+
+# Migraciones que recalculan datos desde las ventas: dentro de la migración solo ven las de
+# main, así que en una base con particiones se repiten después con las particiones adjuntas
+RECONSTRUCCIONES = {6: reconstruir_sketches, 7: reconstruir_resumen_diario, 8: reconstruir_sketches}
+
+# Versión a partir de la cual los reportes pueden leer las tablas de resumen
+VERSION_RESUMENES = 2
+# Versión a partir de la cual existen productos_fts y las columnas de atributos
+VERSION_BUSQUEDA = 4
+# Versión a partir de la cual existen los sketches del top aproximado
+VERSION_SKETCHES = 6
+# Versión a partir de la cual existe resumen_diario
+VERSION_EVOLUCION = 7
+
+# Tablas que crecen con el negocio: nunca deberían recorrerse sin índice
+TABLAS_GRANDES = ('ventas', 'detalle_ventas', 'compras', 'detalle_compras', 'clientes')
+
+def version_actual(conn):
+    """Devuelve la versión de esquema registrada en la base"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def aplicar_migraciones(conn, hasta=None):
+    """Aplica en orden las migraciones pendientes y devuelve la versión final.
+
+    Cada migración corre en su propia transacción junto con el cambio de
+    user_version, así que una falla deja la base en la versión anterior.
+    Si la base tiene particiones, las migraciones de RECONSTRUCCIONES se
+    recalculan al final con las ventas archivadas.
+    """
+    version = inicial = version_actual(conn)
+    for numero, descripcion, sentencias in MIGRACIONES:
+        if numero <= version or (hasta is not None and numero > hasta):
+            continue
+        try:
+            conn.execute("BEGIN")
+            for sentencia in sentencias:
+                conn.execute(sentencia)
+            conn.execute(f"PRAGMA user_version = {numero}")
+            conn.commit()
+            version = numero
+            print(f"Migración {numero} aplicada: {descripcion}")
+        except Error as e:
+            conn.rollback()
+            print(f"Error en la migración {numero} ({descripcion}): {e}")
+            break
+    aplicadas = [numero for numero in RECONSTRUCCIONES if inicial < numero <= version]
+    if aplicadas and listar_particiones(conn):
+        _reconstruir_con_particiones(conn, aplicadas)
+    return version
+
+def _reconstruir_con_particiones(conn, numeros):
+    """Repite los recálculos de las migraciones indicadas incluyendo las ventas archivadas"""
+    completa = conectar(ruta_principal(conn), solo_lectura=False)
+    try:
+        for reconstruir in dict.fromkeys(RECONSTRUCCIONES[numero] for numero in numeros):  # sin repetir
+            reconstruir(completa)
+        completa.commit()
+        print(f"Migraciones {', '.join(map(str, numeros))} recalculadas con las particiones")
+    finally:
+        completa.close()
+
+def _alias_tablas(sql):
+    """Relaciona cada alias de la consulta con su tabla"""
+    alias = {}
+    for tabla, nombre in re.findall(r'(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', sql, re.IGNORECASE):
+        if nombre and nombre.upper() not in ('INNER', 'LEFT', 'JOIN', 'ON', 'WHERE', 'GROUP', 'ORDER'):
+            alias[nombre] = tabla
+        alias[tabla] = tabla
+    return alias
+
+def recorridos_completos(conn, sql, params=()):
+    """Pasos del plan que recorren enteras tablas grandes.
+
+    Un SCAN sobre un índice (también cubriente) sigue leyendo todas las
+    filas: cuenta como recorrido y el paso devuelto nombra el índice.
+    """
+    plan = [fila[3] for fila in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+    return recorridos_en_plan(sql, plan)
+
+def recorridos_en_plan(sql, plan):
+    """Como recorridos_completos, a partir de los detalles de un plan ya calculado"""
+    alias = _alias_tablas(sql)
+    malos = []
+    for detalle in plan:
+        coincidencia = re.match(r'^SCAN (\w+)(?: USING (?:COVERING )?INDEX \S+)?$', detalle)
+        if coincidencia and alias.get(coincidencia.group(1)) in TABLAS_GRANDES:
+            malos.append(detalle)
+    return malos
+
+def verificar_planes(conn, reportes=REPORTES):
+    """Revisa con EXPLAIN QUERY PLAN que ningún reporte haga un SCAN completo.
+
+    Devuelve {clave del reporte: [pasos problemáticos]} solo para los
+    reportes que fallan; un diccionario vacío significa que todos usan índices.
+    Se omiten los reportes marcados con recorrido_completo, que por su
+    pregunta tienen que leer todas las filas.
+    """
+    problemas = {}
+    for reporte in reportes:
+        if reporte.get("recorrido_completo"):
+            continue
+        malos = recorridos_completos(conn, reporte["sql"])
+        if reporte.get("sql_resumen") and version_actual(conn) >= VERSION_RESUMENES:
+            malos += recorridos_completos(conn, reporte["sql_resumen"])
+        if malos:
+            problemas[reporte["clave"]] = malos
+    return problemas
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Actualiza el esquema de una base existente")
+    parser.add_argument('--db', default='tienda.db', help="Ruta de la base a migrar")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    print(f"Versión inicial: {version_actual(conn)}")
+    print(f"Versión final: {aplicar_migraciones(conn)}")
+    problemas = verificar_planes(conn)
+    for clave, pasos in problemas.items():
+        print(f"[SCAN] {clave}: {'; '.join(pasos)}")
+    conn.close()
+    if problemas:
+        raise SystemExit(1)
+    print("Todos los reportes usan búsquedas por índice.")
@@ -0,0 +1,330 @@
+"""Archivo de ventas por periodos en bases adjuntas.
+
+Los meses cerrados de ventas y detalle_ventas se mueven a un archivo por
+periodo (particiones/ventas_2025.db, o ventas_2025_01.db por mes) y
+tienda.db se queda solo con los meses recientes, así que consultarla,
+respaldarla y compactarla cuesta lo que pesan esos meses. La tabla
+particiones registra la ruta absoluta de cada archivo y su rango de fechas.
+
+Para leer la historia completa, asegurar_vistas adjunta las particiones con
+ATTACH y crea vistas TEMP ventas y detalle_ventas (UNION ALL de las
+particiones y de main) que tapan a las tablas del mismo nombre: las
+consultas existentes funcionan sin cambios. Con desde/hasta solo se
+adjuntan las particiones que se solapan con ese rango.
+
+Las tablas de resumen no se tocan al archivar (se borran las filas con los
+triggers suspendidos y sin reconstruir), así que siguen contando toda la
+historia. Para reconstruirlas o conciliar el inventario hay que leer con
+conectar(), que ve también las ventas archivadas.
+
+SQLite admite como máximo 10 bases adjuntas por conexión y el dashboard
+adjunta todas las particiones, así que por defecto se archiva por año y
+archivar se niega a registrar más particiones de las que caben.
+
+Uso:
+    python particiones.py archivar --db tienda.db [--conservar-meses 3] [--por-mes]
+    python particiones.py listar --db tienda.db
+    python particiones.py compactar --db tienda.db
+"""
+import argparse
+import os
+import sqlite3
+from datetime import date
+
+from resumenes import triggers_suspendidos
+
+DIRECTORIO_PARTICIONES = 'particiones'
+CONSERVAR_MESES = 3
+TABLAS_ARCHIVADAS = ('ventas', 'detalle_ventas')
+
+TABLAS_PARTICIONES = [
+    """
+    CREATE TABLE IF NOT EXISTS particiones (
+        periodo TEXT PRIMARY KEY,
+        archivo TEXT NOT NULL,
+        desde DATE NOT NULL,
+        hasta DATE NOT NULL,
+        n_ventas INTEGER NOT NULL,
+        n_lineas INTEGER NOT NULL,
+        actualizado TEXT NOT NULL DEFAULT (datetime('now'))
+    );
+    """,
+]
+
+# Esquema de cada archivo de partición; sin claves foráneas porque clientes y productos quedan en main
+ESQUEMA_PARTICION = [
+    """CREATE TABLE IF NOT EXISTS {esquema}.ventas (
+        id_venta INTEGER PRIMARY KEY,
+        fecha_venta DATE NOT NULL,
+        id_cliente INTEGER
+    )""",
+    """CREATE TABLE IF NOT EXISTS {esquema}.detalle_ventas (
+        id_detalle_venta INTEGER PRIMARY KEY,
+        id_venta INTEGER NOT NULL,
+        id_producto INTEGER NOT NULL,
+        cantidad INTEGER NOT NULL,
+        precio_unitario REAL NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS {esquema}.idx_detalle_ventas_producto ON detalle_ventas(id_producto, cantidad, precio_unitario)",
+    "CREATE INDEX IF NOT EXISTS {esquema}.idx_detalle_ventas_venta ON detalle_ventas(id_venta, id_producto, cantidad, precio_unitario)",
+    "CREATE INDEX IF NOT EXISTS {esquema}.idx_ventas_cliente ON ventas(id_cliente, fecha_venta)",
+    "CREATE INDEX IF NOT EXISTS {esquema}.idx_ventas_fecha ON ventas(fecha_venta)",
+]
+
+def periodo_de(fecha, por_anio=False):
+    """(periodo, desde, hasta) del mes o año de fecha; hasta es exclusivo"""
+    anio, mes = int(fecha[:4]), int(fecha[5:7])
+    if por_anio:
+        return f"{anio}", f"{anio}-01-01", f"{anio + 1}-01-01"
+    siguiente = date(anio + mes // 12, mes % 12 + 1, 1)
+    return f"{anio}_{mes:02d}", f"{anio}-{mes:02d}-01", siguiente.isoformat()
+
+def fecha_corte(ultima_fecha, conservar_meses=CONSERVAR_MESES):
+    """Primer día del mes más antiguo que se conserva en la base principal"""
+    meses = int(ultima_fecha[:4]) * 12 + int(ultima_fecha[5:7]) - 1 - (max(conservar_meses, 1) - 1)
+    return date(meses // 12, meses % 12 + 1, 1).isoformat()
+
+def ruta_principal(conn):
+    """Ruta absoluta del archivo de la base principal de conn"""
+    return next(fila[2] for fila in conn.execute("PRAGMA database_list") if fila[1] == 'main')
+
+def ruta_archivo(conn, archivo):
+    """Ruta de una partición registrada.
+
+    archivar registra rutas absolutas, así que un respaldo o snapshot de la
+    base (en otra carpeta) sigue encontrando las particiones de la base en
+    vivo; una ruta relativa (la que deja publicar) se resuelve desde la
+    carpeta de la base principal.
+    """
+    return os.path.join(os.path.dirname(ruta_principal(conn)), archivo)
+
+def listar_particiones(conn, desde=None, hasta=None):
+    """Particiones registradas que se solapan con [desde, hasta], por fecha"""
+    existe = conn.execute(
+        "SELECT 1 FROM main.sqlite_master WHERE type = 'table' AND name = 'particiones'"
+    ).fetchone()
+    if not existe:
+        return []
+    cursor = conn.execute(
+        """SELECT periodo, archivo, desde, hasta, n_ventas, n_lineas, actualizado
+        FROM main.particiones
+        WHERE (:desde IS NULL OR hasta > :desde) AND (:hasta IS NULL OR desde <= :hasta)
+        ORDER BY desde""",
+        {"desde": desde, "hasta": hasta}
+    )
+    columnas = [d[0] for d in cursor.description]
+    return [dict(zip(columnas, fila)) for fila in cursor]
+
+def _estado_adjunto(conn):
+    try:
+        return conn.execute("SELECT estado FROM temp.particiones_adjuntas").fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+
+def _desadjuntar(conn):
+    for tabla in TABLAS_ARCHIVADAS:
+        conn.execute(f"DROP VIEW IF EXISTS temp.{tabla}")
+    for fila in conn.execute("PRAGMA database_list").fetchall():
+        if fila[1].startswith('p_'):
+            conn.execute(f"DETACH DATABASE {fila[1]}")
+
+def _sin_repetir(tabla, particion):
+    """Condición que descarta de una partición las filas que siguen en main (archivado interrumpido)"""
+    ventas_main = (f"SELECT id_venta FROM main.ventas "
+                   f"WHERE fecha_venta >= '{particion['desde']}' AND fecha_venta < '{particion['hasta']}'")
+    if tabla == 'ventas':
+        return f"id_venta NOT IN ({ventas_main})"
+    return (f"id_detalle_venta NOT IN (SELECT id_detalle_venta FROM main.detalle_ventas "
+            f"WHERE id_venta IN ({ventas_main}))")
+
+def asegurar_vistas(conn, desde=None, hasta=None):
+    """Adjunta las particiones del rango y crea las vistas TEMP ventas y detalle_ventas.
+
+    Guarda en una tabla TEMP qué particiones quedaron adjuntas, así que
+    llamarla otra vez solo cuesta leer el registro; si se archivó algo
+    nuevo desde la última llamada, vuelve a adjuntar. Devuelve la lista de
+    particiones adjuntas.
+    """
+    particiones = listar_particiones(conn, desde, hasta)
+    estado = ";".join(f"{p['periodo']}:{p['n_lineas']}:{p['actualizado']}" for p in particiones)
+    if estado == _estado_adjunto(conn):
+        return particiones
+
+    _desadjuntar(conn)
+    otras = sum(1 for fila in conn.execute("PRAGMA database_list") if fila[1] not in ('main', 'temp'))
+    limite = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED) - otras
+    if len(particiones) > limite:
+        raise sqlite3.OperationalError(
+            f"Hacen falta {len(particiones)} particiones pero SQLite solo admite {limite} bases "
+            "adjuntas más: acota las fechas o archiva por año (--por-anio)."
+        )
+    for particion in particiones:
+        ruta = ruta_archivo(conn, particion["archivo"])
+        if not os.path.exists(ruta):
+            raise sqlite3.OperationalError(f"No se encuentra la partición '{ruta}'")
+        conn.execute(f"ATTACH DATABASE ? AS p_{particion['periodo']}", (f"file:{ruta}?mode=ro",))
+
+    if particiones:
+        for tabla in TABLAS_ARCHIVADAS:
+            columnas = ", ".join(fila[1] for fila in conn.execute(f"PRAGMA main.table_info({tabla})"))
+            partes = [f"SELECT {columnas} FROM p_{p['periodo']}.{tabla} WHERE {_sin_repetir(tabla, p)}"
+                      for p in particiones]
+            partes.append(f"SELECT {columnas} FROM main.{tabla}")
+            conn.execute(f"CREATE TEMP VIEW {tabla} AS " + " UNION ALL ".join(partes))
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS particiones_adjuntas (estado TEXT)")
+    conn.execute("DELETE FROM temp.particiones_adjuntas")
+    conn.execute("INSERT INTO temp.particiones_adjuntas VALUES (?)", (estado,))
+    conn.commit()
+    return particiones
+
+def conectar(ruta, desde=None, hasta=None, solo_lectura=True):
+    """Conexión a ruta que ve las ventas archivadas del rango como si siguieran en la base.
+
+    Con solo_lectura=False se puede escribir en el resto de tablas (p. ej.
+    reconstruir resúmenes), pero no en ventas ni detalle_ventas, que son vistas.
+    """
+    modo = "?mode=ro" if solo_lectura else ""
+    conn = sqlite3.connect(f"file:{os.path.abspath(ruta)}{modo}", uri=True)
+    asegurar_vistas(conn, desde, hasta)
+    return conn
+
+def archivar(ruta_db, conservar_meses=CONSERVAR_MESES, por_anio=True, directorio=DIRECTORIO_PARTICIONES):
+    """Mueve a su partición las ventas anteriores a los últimos `conservar_meses` meses.
+
+    El mes de la venta más reciente cuenta como el primero que se conserva.
+    En WAL una transacción sobre dos archivos no es atómica, así que cada
+    periodo se mueve en dos: primero se copia a la partición y luego se
+    borra de main solo lo que ya está copiado. Una caída entre ambas deja
+    filas en los dos archivos (las vistas de asegurar_vistas no las cuentan
+    dos veces) y volver a archivar termina el movimiento. Si la partición ya
+    existía (ventas tardías de un periodo archivado), se le agregan las
+    filas nuevas. Devuelve [(periodo, ventas copiadas, líneas copiadas)].
+    """
+    from migraciones import aplicar_migraciones
+
+    conn = sqlite3.connect(ruta_db)
+    aplicar_migraciones(conn)
+    movidos = []
+    try:
+        ultima = conn.execute("SELECT MAX(fecha_venta) FROM main.ventas").fetchone()[0]
+        if ultima is None:
+            return movidos
+        corte = fecha_corte(ultima, conservar_meses)
+        meses = [fila[0] for fila in conn.execute(
+            "SELECT DISTINCT substr(fecha_venta, 1, 7) FROM main.ventas WHERE fecha_venta < ? ORDER BY 1", (corte,)
+        )]
+        periodos = {}
+        for mes in meses:
+            periodo, desde, hasta = periodo_de(mes, por_anio)
+            periodos[periodo] = (desde, min(hasta, corte), hasta)
+        registrados = {p["periodo"] for p in listar_particiones(conn)}
+        limite = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        if len(registrados | set(periodos)) > limite:
+            raise ValueError(
+                f"Quedarían {len(registrados | set(periodos))} particiones y una conexión solo puede "
+                f"adjuntar {limite}: archiva por año o conserva más meses en la base."
+            )
+
+        carpeta = os.path.join(os.path.dirname(os.path.abspath(ruta_db)), directorio)
+        os.makedirs(carpeta, exist_ok=True)
+        for periodo, (desde, limite, hasta) in periodos.items():
+            archivo = os.path.join(carpeta, f"ventas_{periodo}.db")
+            conn.execute("ATTACH DATABASE ? AS destino", (archivo,))
+            try:
+                rango = {"desde": desde, "hasta": limite}
+                ventas_rango = "SELECT id_venta FROM main.ventas WHERE fecha_venta >= :desde AND fecha_venta < :hasta"
+                # 1) Copia a la partición; con OR IGNORE repetirla tras una caída no duplica nada
+                conn.execute("BEGIN IMMEDIATE")
+                for sentencia in ESQUEMA_PARTICION:
+                    conn.execute(sentencia.format(esquema='destino'))
+                n_ventas = conn.execute(
+                    f"""INSERT OR IGNORE INTO destino.ventas (id_venta, fecha_venta, id_cliente)
+                    SELECT id_venta, fecha_venta, id_cliente FROM main.ventas WHERE id_venta IN ({ventas_rango})""",
+                    rango
+                ).rowcount
+                n_lineas = conn.execute(
+                    f"""INSERT OR IGNORE INTO destino.detalle_ventas
+                        (id_detalle_venta, id_venta, id_producto, cantidad, precio_unitario)
+                    SELECT id_detalle_venta, id_venta, id_producto, cantidad, precio_unitario
+                    FROM main.detalle_ventas WHERE id_venta IN ({ventas_rango})""", rango
+                ).rowcount
+                conn.commit()
+                # 2) Borrado en main de lo que ya quedó en la partición. Si hay una caída entre
+                # ambos pasos las filas quedan repetidas, no perdidas, y las vistas no las cuentan dos veces
+                conn.execute("BEGIN IMMEDIATE")
+                # Los resúmenes ya cuentan estas ventas y deben seguir contándolas
+                with triggers_suspendidos(conn, reconstruir=False):
+                    conn.execute(
+                        f"""DELETE FROM main.detalle_ventas WHERE id_venta IN ({ventas_rango})
+                        AND id_detalle_venta IN (SELECT id_detalle_venta FROM destino.detalle_ventas)""", rango
+                    )
+                    # Una venta a la que se agregaron líneas entre ambos pasos se archiva la próxima vez
+                    conn.execute(
+                        f"""DELETE FROM main.ventas WHERE id_venta IN ({ventas_rango})
+                        AND id_venta IN (SELECT id_venta FROM destino.ventas)
+                        AND NOT EXISTS (SELECT 1 FROM main.detalle_ventas dv WHERE dv.id_venta = main.ventas.id_venta)""",
+                        rango
+                    )
+                conn.execute(
+                    """INSERT INTO main.particiones (periodo, archivo, desde, hasta, n_ventas, n_lineas)
+                    VALUES (?, ?, ?, ?, (SELECT COUNT(*) FROM destino.ventas), (SELECT COUNT(*) FROM destino.detalle_ventas))
+                    ON CONFLICT (periodo) DO UPDATE SET
+                        n_ventas = excluded.n_ventas, n_lineas = excluded.n_lineas, actualizado = datetime('now')""",
+                    (periodo, archivo, desde, hasta)
+                )
+                conn.commit()
+                conn.execute("ANALYZE destino")
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                conn.execute("DETACH DATABASE destino")
+            movidos.append((periodo, n_ventas, n_lineas))
+    finally:
+        conn.close()
+    return movidos
+
+def compactar(ruta_db):
+    """VACUUM y ANALYZE de la base y de cada partición; devuelve [(archivo, bytes antes, bytes después)]"""
+    conn = sqlite3.connect(ruta_db)
+    archivos = [ruta_archivo(conn, p["archivo"]) for p in listar_particiones(conn)]
+    conn.close()
+    tamanos = []
+    for ruta in archivos + [ruta_db]:
+        antes = os.path.getsize(ruta)
+        conn = sqlite3.connect(ruta)
+        conn.execute("ANALYZE")
+        conn.commit()
+        conn.execute("VACUUM")
+        conn.close()
+        tamanos.append((ruta, antes, os.path.getsize(ruta)))
+    return tamanos
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Archivo de ventas por periodos")
+    parser.add_argument('accion', choices=['archivar', 'listar', 'compactar'])
+    parser.add_argument('--db', default='tienda.db', help="Ruta de la base")
+    parser.add_argument('--conservar-meses', type=int, default=CONSERVAR_MESES,
+                        help="Meses recientes que se quedan en la base (contando el de la última venta)")
+    parser.add_argument('--por-mes', action='store_true', help="Una partición por mes en lugar de por año")
+    parser.add_argument('--directorio', default=DIRECTORIO_PARTICIONES,
+                        help="Carpeta de las particiones, relativa a la base")
+    args = parser.parse_args()
+
+    if args.accion == 'archivar':
+        try:
+            movidos = archivar(args.db, args.conservar_meses, not args.por_mes, args.directorio)
+        except ValueError as e:
+            raise SystemExit(f"No se archivó nada: {e}")
+        for periodo, n_ventas, n_lineas in movidos:
+            print(f"  - {periodo}: {n_ventas} ventas y {n_lineas} líneas archivadas")
+        print(f"{len(movidos)} periodo(s) archivado(s). Ejecuta 'compactar' para reducir el archivo.")
+    elif args.accion == 'listar':
+        conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+        for p in listar_particiones(conn):
+            print(f"{p['periodo']:<8} {p['desde']} .. {p['hasta']}  {p['n_ventas']:>8} ventas "
+                  f"{p['n_lineas']:>9} líneas  {p['archivo']}")
+        conn.close()
+    else:
+        for ruta, antes, despues in compactar(args.db):
+            print(f"{ruta}: {antes / 1e6:.1f} MB -> {despues / 1e6:.1f} MB")
@@ -0,0 +1,120 @@
+"""Perfilado de las consultas del dashboard.
+
+Por cada consulta se mide el tiempo de obtener la conexión del pool, de
+ejecutarla y de leer las filas, se cuentan las filas y los pasos de la
+máquina virtual de SQLite (con el progress handler) y se guarda el plan de
+EXPLAIN QUERY PLAN. Los registros quedan en memoria para el panel del
+dashboard y se escriben como JSON por línea en un log rotativo. Las
+consultas que superan el umbral de lentitud o recorren tablas grandes sin
+índice se registran con nivel WARNING.
+
+Este módulo no depende de streamlit.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from migraciones import recorridos_en_plan
+
+UMBRAL_LENTO_MS = 500.0
+PASOS_POR_AVISO = 1000  # el progress handler se llama cada tantas instrucciones de la VM
+
+class Perfilador:
+    """Mide consultas SQLite y guarda los registros en memoria y en un log JSONL"""
+
+    def __init__(self, ruta_log=None, umbral_lento_ms=UMBRAL_LENTO_MS, max_registros=500,
+                 max_bytes=5_000_000, respaldos=3):
+        self.umbral_lento_ms = umbral_lento_ms
+        self.registros = deque(maxlen=max_registros)
+        self.lentas = 0
+        self._planes = {}
+        self._candado = threading.Lock()
+        self._log = logging.getLogger("tienda.consultas")
+        self._log.setLevel(logging.INFO)
+        if ruta_log and not self._log.handlers:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(ruta_log)), exist_ok=True)
+                manejador = RotatingFileHandler(ruta_log, maxBytes=max_bytes, backupCount=respaldos, encoding='utf-8')
+            except OSError:
+                manejador = None  # sistema de archivos de solo lectura: solo memoria
+            if manejador:
+                manejador.setFormatter(logging.Formatter("%(message)s"))
+                self._log.addHandler(manejador)
+
+    def _plan(self, conn, sql, params):
+        """Plan de la consulta y SCAN completos, calculados una vez por SQL"""
+        with self._candado:
+            guardado = self._planes.get(sql)
+        if guardado is None:
+            # El EXPLAIN corre fuera del candado para no frenar a los demás hilos
+            plan = [fila[3] for fila in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+            with self._candado:
+                guardado = self._planes.setdefault(sql, (plan, recorridos_en_plan(sql, plan)))
+        return guardado
+
+    def consultar(self, pool, sql, params=None, rango=()):
+        """Ejecuta sql con una conexión del pool y devuelve (columnas, filas, registro).
+
+        rango (p. ej. desde y hasta) se pasa al preparar la conexión del pool.
+        """
+        params = params or ()
+        registro = {"fecha": datetime.now().isoformat(timespec='milliseconds'), "sql": sql,
+                    "params": list(params.values() if isinstance(params, dict) else params), "origen": "sqlite"}
+        pasos = [0]
+        sentencias = []
+
+        def contar_pasos():
+            pasos[0] += 1
+            return 0  # 0 = seguir ejecutando
+
+        inicio = time.perf_counter()
+        with pool.conexion(*rango) as conn:
+            conectado = time.perf_counter()
+            conn.set_progress_handler(contar_pasos, PASOS_POR_AVISO)
+            conn.set_trace_callback(sentencias.append)
+            try:
+                cursor = conn.execute(sql, params)
+                ejecutado = time.perf_counter()
+                filas = cursor.fetchall()
+                leido = time.perf_counter()
+            finally:
+                conn.set_progress_handler(None, 0)
+                conn.set_trace_callback(None)
+            columnas = [d[0] for d in cursor.description] if cursor.description else []
+            plan, scans = self._plan(conn, sql, params)
+
+        registro.update({
+            "ms_conexion": (conectado - inicio) * 1000,
+            "ms_ejecucion": (ejecutado - conectado) * 1000,
+            "ms_lectura": (leido - ejecutado) * 1000,
+            "ms_total": (leido - inicio) * 1000,
+            "filas": len(filas),
+            "pasos_vm": pasos[0] * PASOS_POR_AVISO,
+            "sentencias": sentencias,  # SQL tal como lo ejecutó SQLite, con los parámetros
+            "plan": plan,
+            "scans_completos": scans,
+        })
+        return columnas, filas, registro
+
+    def acierto_cache(self, sql, params, ms_total):
+        """Registro de una consulta servida desde la caché de resultados"""
+        return {"fecha": datetime.now().isoformat(timespec='milliseconds'), "sql": sql,
+                "params": list(params.values() if isinstance(params, dict) else (params or ())),
+                "origen": "cache", "ms_total": ms_total}
+
+    def guardar(self, registro):
+        """Guarda el registro en memoria y en el log; marca las consultas lentas"""
+        registro["lenta"] = (registro["ms_total"] > self.umbral_lento_ms
+                             or bool(registro.get("scans_completos")))
+        with self._candado:
+            self.registros.append(registro)
+            if registro["lenta"]:
+                self.lentas += 1
+        nivel = logging.WARNING if registro["lenta"] else logging.INFO
+        self._log.log(nivel, json.dumps(registro, ensure_ascii=False, default=str))
+        return registro
@@ -0,0 +1,118 @@
+"""Reinicio instantáneo de la base a partir de una plantilla.
+
+La plantilla es una base pequeña con el esquema completo (tablas, índices,
+tablas de resumen y triggers) y solo los datos de insertar_datos_iniciales.
+Restaurar copia la plantilla sobre la base, así que tarda lo mismo sin
+importar cuántos datos tenga la base (a diferencia de truncate_tables.sql,
+que borra fila por fila y deja el archivo inflado hasta un VACUUM).
+
+Dos formas de restaurar:
+  - 'archivo': copia a un temporal y lo cambia por la base con os.replace
+    (atómico). Solo si ningún proceso tiene la base abierta.
+  - 'backup': API de backup de SQLite sobre la base abierta; respeta los
+    bloqueos, así que sirve aunque el dashboard siga conectado.
+
+Uso:
+    python plantilla.py crear
+    python plantilla.py restaurar --db tienda.db [--metodo backup]
+"""
+import argparse
+import os
+import sqlite3
+import stat
+import tempfile
+import time
+
+from app import crear_conexion, crear_tablas, insertar_datos_iniciales
+
+RUTA_PLANTILLA = 'plantilla.db'
+PERMISOS_DEFECTO = 0o644  # mkstemp crea los archivos con 0600
+
+def _permisos(ruta):
+    """Permisos actuales de ruta, o los de por defecto si no existe"""
+    try:
+        return stat.S_IMODE(os.stat(ruta).st_mode)
+    except FileNotFoundError:
+        return PERMISOS_DEFECTO
+
+def crear_plantilla(ruta=RUTA_PLANTILLA):
+    """Construye la plantilla en un temporal y la publica de forma atómica"""
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    descriptor, temporal = tempfile.mkstemp(suffix='.db', dir=directorio)
+    os.close(descriptor)
+    try:
+        conn = crear_conexion(temporal)
+        crear_tablas(conn)
+        insertar_datos_iniciales(conn)
+        conn.execute("VACUUM")
+        conn.close()
+        os.chmod(temporal, PERMISOS_DEFECTO)
+        os.replace(temporal, ruta)
+    except BaseException:
+        os.remove(temporal)
+        raise
+    return ruta
+
+def _asegurar_plantilla(plantilla):
+    if not os.path.exists(plantilla):
+        print(f"No existe la plantilla '{plantilla}', creándola...")
+        crear_plantilla(plantilla)
+
+def restaurar_archivo(destino, plantilla=RUTA_PLANTILLA):
+    """Reemplaza destino por una copia de la plantilla con os.replace.
+
+    Primero se borran -wal y -shm: si quedara un WAL viejo junto a la base
+    nueva, SQLite lo aplicaría al abrirla y la corrompería.
+    """
+    _asegurar_plantilla(plantilla)
+    directorio = os.path.dirname(os.path.abspath(destino))
+    descriptor, temporal = tempfile.mkstemp(suffix='.db', dir=directorio)  # mismo sistema de archivos
+    try:
+        with open(plantilla, 'rb') as origen, os.fdopen(descriptor, 'wb') as copia:
+            copia.write(origen.read())
+            copia.flush()
+            os.fsync(copia.fileno())
+        os.chmod(temporal, _permisos(destino))
+        for sufijo in ('-wal', '-shm', '-journal'):
+            if os.path.exists(destino + sufijo):
+                os.remove(destino + sufijo)
+        os.replace(temporal, destino)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+def restaurar_backup(destino, plantilla=RUTA_PLANTILLA):
+    """Copia la plantilla sobre destino con la API de backup de SQLite"""
+    _asegurar_plantilla(plantilla)
+    origen = sqlite3.connect(f"file:{plantilla}?mode=ro", uri=True)
+    base = sqlite3.connect(destino)
+    try:
+        origen.backup(base)
+    finally:
+        base.close()
+        origen.close()
+
+def restaurar(destino, plantilla=RUTA_PLANTILLA, metodo='archivo'):
+    """Deja destino igual a la plantilla y devuelve los segundos que tardó"""
+    inicio = time.perf_counter()
+    if metodo == 'backup':
+        restaurar_backup(destino, plantilla)
+    else:
+        restaurar_archivo(destino, plantilla)
+    return time.perf_counter() - inicio
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Plantilla de la base y reinicio instantáneo")
+    parser.add_argument('accion', choices=['crear', 'restaurar'])
+    parser.add_argument('--db', default='tienda.db', help="Base a restaurar")
+    parser.add_argument('--plantilla', default=RUTA_PLANTILLA, help="Ruta de la plantilla")
+    parser.add_argument('--metodo', choices=['archivo', 'backup'], default='archivo',
+                        help="'backup' si la base puede estar abierta por otro proceso")
+    args = parser.parse_args()
+
+    if args.accion == 'crear':
+        print(f"Plantilla creada en '{crear_plantilla(args.plantilla)}'.")
+    else:
+        segundos = restaurar(args.db, args.plantilla, args.metodo)
+        print(f"'{args.db}' restaurada desde '{args.plantilla}' en {segundos * 1000:.1f} ms.")
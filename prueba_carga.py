@@ -0,0 +1,250 @@
+"""Prueba de carga mixta: cajas que registran ventas y sesiones del dashboard.
+
+Sobre una copia local de la base (una por modo de journal) arranca a la
+vez varios procesos escritores, que registran ventas con registro.py como
+lo haría una caja, y varios lectores, que repiten las consultas de los
+reportes del dashboard con una conexión de solo lectura. Para cada modo
+(rollback journal 'delete' y 'wal') mide:
+  - ventas/s y consultas/s,
+  - latencia p50/p99/máxima de cada venta y de cada consulta,
+  - SQLITE_BUSY: reintentos de los escritores, ventas que agotaron los
+    reintentos y consultas que fallaron por bloqueo,
+  - checkpoints en WAL: con --checkpoint proceso los escritores no hacen
+    checkpoint y un proceso aparte lo ejecuta cada --intervalo-checkpoint
+    segundos, midiendo cuánto tarda y si quedó incompleto por lectores;
+    con 'auto' (el comportamiento por defecto de SQLite) el costo aparece
+    en la latencia máxima de los escritores. En ambos casos se registra el
+    tamaño máximo del archivo -wal.
+
+Uso:
+    python prueba_carga.py --db tienda.db --escritores 4 --lectores 4 --duracion 10
+    python prueba_carga.py --modos wal --checkpoint proceso --intervalo-checkpoint 0.5
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from datetime import datetime
+
+from consultas import REPORTES
+from ingesta import percentiles
+from migraciones import VERSION_SKETCHES, version_actual
+from registro import (BUSY_TIMEOUT_MS, CONTADORES, ErrorRegistro, con_reintentos, conectar_escritura,
+                      esta_ocupada, insertar_compra, registrar_venta)
+from reportes_cli import sql_de_reporte
+from sketches import REPORTES_APROXIMADOS, sql_reporte_aproximado
+
+DIRECTORIO_CARGA = '.carga'
+MODOS = ('delete', 'wal')
+ARRANQUE = 1.0  # segundos para que todos los procesos estén listos antes de empezar a medir
+
+def preparar_copia(ruta_db, modo, directorio=DIRECTORIO_CARGA):
+    """Copia ruta_db en directorio/carga_<modo>.db, repone stock y fija el modo de journal"""
+    os.makedirs(directorio, exist_ok=True)
+    destino = os.path.join(directorio, f"carga_{modo}.db")
+    for sobrante in (destino, destino + '-wal', destino + '-shm', destino + '-journal'):
+        if os.path.exists(sobrante):
+            os.remove(sobrante)
+    origen = sqlite3.connect(f"file:{ruta_db}?mode=ro", uri=True)
+    copia = sqlite3.connect(destino)
+    try:
+        origen.backup(copia)
+    finally:
+        origen.close()
+        copia.close()
+
+    conn = conectar_escritura(destino, journal_mode=modo)
+    ids_productos = [fila[0] for fila in conn.execute("SELECT id_producto FROM productos")]
+    id_proveedor = conn.execute("SELECT MIN(id_proveedor) FROM proveedores").fetchone()[0]
+    # Reponer stock para que la prueba mida escrituras y no rechazos
+    con_reintentos(conn, lambda c: insertar_compra(c, id_proveedor, [(p, 1_000_000) for p in ids_productos]))
+    if modo == 'wal':
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    return destino
+
+def consultas_dashboard(conn):
+    """(clave, sql, params) de los reportes tal como los consulta el dashboard en esta versión de la base"""
+    version = version_actual(conn)
+    consultas = []
+    for reporte in REPORTES:
+        if reporte["clave"] in REPORTES_APROXIMADOS and version >= VERSION_SKETCHES:
+            consultas.append((reporte["clave"], sql_reporte_aproximado(reporte["clave"]),
+                              {"desde": None, "hasta": None}))
+        else:
+            consultas.append((reporte["clave"], sql_de_reporte(reporte, version), ()))
+    return consultas
+
+def _esperar(inicio):
+    pausa = inicio - time.time()
+    if pausa > 0:
+        time.sleep(pausa)
+
+def _escritor(ruta, modo, inicio, duracion, checkpoint, semilla):
+    """Registra ventas aleatorias hasta que se acaba el tiempo; devuelve sus medidas"""
+    rng = random.Random(semilla)
+    conn = conectar_escritura(ruta, journal_mode=modo)
+    if modo == 'wal' and checkpoint == 'proceso':
+        conn.execute("PRAGMA wal_autocheckpoint = 0")
+    ids_productos = [fila[0] for fila in conn.execute("SELECT id_producto FROM productos")]
+    ids_clientes = [fila[0] for fila in conn.execute("SELECT id_cliente FROM clientes")]
+    for contador in CONTADORES:
+        CONTADORES[contador] = 0
+    latencias, fallidas, rechazadas = [], 0, 0
+
+    _esperar(inicio)
+    while time.time() < inicio + duracion:
+        lineas = [(rng.choice(ids_productos), rng.randint(1, 5)) for _ in range(rng.randint(1, 5))]
+        cliente = rng.choice(ids_clientes) if ids_clientes and rng.random() > 0.3 else None
+        comienzo = time.perf_counter()
+        try:
+            registrar_venta(conn, lineas, cliente)
+        except ErrorRegistro:
+            rechazadas += 1
+            continue
+        except sqlite3.OperationalError as e:
+            if not esta_ocupada(e):
+                raise
+            fallidas += 1  # agotó los reintentos
+            continue
+        latencias.append((time.perf_counter() - comienzo) * 1000)
+    conn.close()
+    return {"rol": "escritor", "latencias": latencias, "fallidas": fallidas, "rechazadas": rechazadas,
+            "reintentos": CONTADORES["reintentos"]}
+
+def _lector(ruta, inicio, duracion, semilla):
+    """Repite las consultas del dashboard hasta que se acaba el tiempo; devuelve sus medidas"""
+    conn = sqlite3.connect(f"file:{ruta}?mode=ro", uri=True, timeout=BUSY_TIMEOUT_MS / 1000)
+    consultas = consultas_dashboard(conn)
+    random.Random(semilla).shuffle(consultas)  # que no todos los lectores pidan lo mismo a la vez
+    latencias, ocupado = [], 0
+
+    _esperar(inicio)
+    indice = 0
+    while time.time() < inicio + duracion:
+        _, sql, params = consultas[indice % len(consultas)]
+        indice += 1
+        comienzo = time.perf_counter()
+        try:
+            conn.execute(sql, params).fetchall()
+        except sqlite3.OperationalError as e:
+            if not esta_ocupada(e):
+                raise
+            ocupado += 1
+            continue
+        latencias.append((time.perf_counter() - comienzo) * 1000)
+    conn.close()
+    return {"rol": "lector", "latencias": latencias, "ocupado": ocupado}
+
+def _checkpointer(ruta, inicio, duracion, intervalo):
+    """Ejecuta un checkpoint PASSIVE cada intervalo segundos y mide cada uno"""
+    conn = sqlite3.connect(ruta, isolation_level=None, timeout=BUSY_TIMEOUT_MS / 1000)
+    duraciones, incompletos, paginas = [], 0, 0
+
+    _esperar(inicio)
+    while time.time() + intervalo < inicio + duracion:
+        time.sleep(intervalo)
+        comienzo = time.perf_counter()
+        ocupado, en_wal, copiadas = conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        duraciones.append((time.perf_counter() - comienzo) * 1000)
+        paginas += max(copiadas, 0)
+        if ocupado or copiadas < en_wal:
+            incompletos += 1  # un lector retiene una versión anterior o un escritor tenía el bloqueo
+    conn.close()
+    return {"rol": "checkpoint", "latencias": duraciones, "incompletos": incompletos, "paginas": paginas}
+
+def _resumir(latencias, duracion):
+    valores = percentiles(latencias, puntos=(50, 99))
+    return {
+        "operaciones": len(latencias),
+        "por_segundo": round(len(latencias) / duracion, 1),
+        "p50_ms": round(valores[50], 2),
+        "p99_ms": round(valores[99], 2),
+        "max_ms": round(max(latencias, default=0.0), 2),
+    }
+
+def ejecutar_carga(ruta_db, modo, escritores=4, lectores=4, duracion=10.0, checkpoint='auto',
+                   intervalo_checkpoint=1.0, directorio=DIRECTORIO_CARGA, semilla=0):
+    """Corre la carga mixta en un modo de journal y devuelve el resumen de sus medidas"""
+    ruta = preparar_copia(ruta_db, modo, directorio)
+    inicio = time.time() + ARRANQUE
+    tareas = [(_escritor, ruta, modo, inicio, duracion, checkpoint, semilla + i) for i in range(escritores)]
+    tareas += [(_lector, ruta, inicio, duracion, semilla + i) for i in range(lectores)]
+    if modo == 'wal' and checkpoint == 'proceso':
+        tareas.append((_checkpointer, ruta, inicio, duracion, intervalo_checkpoint))
+
+    wal_maximo = 0
+    with ProcessPoolExecutor(max_workers=len(tareas)) as ejecutor:
+        futuros = [ejecutor.submit(*tarea) for tarea in tareas]
+        # Mientras corren, se muestrea el tamaño del -wal (crece si los checkpoints no alcanzan)
+        while wait(futuros, timeout=0.05).not_done:
+            if os.path.exists(ruta + '-wal'):
+                wal_maximo = max(wal_maximo, os.path.getsize(ruta + '-wal'))
+        medidas = [futuro.result() for futuro in futuros]
+
+    def de_rol(rol):
+        return [medida for medida in medidas if medida["rol"] == rol]
+
+    escrituras = _resumir([ms for m in de_rol("escritor") for ms in m["latencias"]], duracion)
+    escrituras.update({clave: sum(m[clave] for m in de_rol("escritor"))
+                       for clave in ("reintentos", "fallidas", "rechazadas")})
+    lecturas = _resumir([ms for m in de_rol("lector") for ms in m["latencias"]], duracion)
+    lecturas["ocupado"] = sum(m["ocupado"] for m in de_rol("lector"))
+    resumen = {
+        "modo": modo,
+        "checkpoint": checkpoint if modo == 'wal' else None,
+        "escrituras": escrituras,
+        "lecturas": lecturas,
+        "wal_max_bytes": wal_maximo,
+    }
+    for medida in de_rol("checkpoint"):
+        resumen["checkpoints"] = _resumir(medida["latencias"], duracion)
+        resumen["checkpoints"].update(incompletos=medida["incompletos"], paginas=medida["paginas"])
+    return resumen
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Prueba de carga con escritores y lectores concurrentes")
+    parser.add_argument('--db', default='tienda.db', help="Base de origen (se prueba sobre una copia)")
+    parser.add_argument('--modos', nargs='+', choices=MODOS, default=list(MODOS), help="Modos de journal a comparar")
+    parser.add_argument('--escritores', type=int, default=4, help="Procesos que registran ventas")
+    parser.add_argument('--lectores', type=int, default=4, help="Procesos que consultan los reportes")
+    parser.add_argument('--duracion', type=float, default=10.0, help="Segundos de carga por modo")
+    parser.add_argument('--checkpoint', choices=['auto', 'proceso'], default='auto',
+                        help="En WAL: checkpoint automático de SQLite o un proceso dedicado")
+    parser.add_argument('--intervalo-checkpoint', type=float, default=1.0, help="Segundos entre checkpoints del proceso")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--salida', default='carga_resultados.json', help="Archivo JSON de resultados")
+    args = parser.parse_args()
+
+    resultados = {
+        "fecha": datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "escritores": args.escritores,
+        "lectores": args.lectores,
+        "duracion": args.duracion,
+        "modos": [],
+    }
+    for modo in args.modos:
+        resumen = ejecutar_carga(args.db, modo, args.escritores, args.lectores, args.duracion,
+                                 args.checkpoint, args.intervalo_checkpoint, semilla=args.seed)
+        resultados["modos"].append(resumen)
+        escrituras, lecturas = resumen["escrituras"], resumen["lecturas"]
+        print(f"{modo:<6} | ventas {escrituras['por_segundo']:>8.1f}/s p50 {escrituras['p50_ms']:>7.2f}"
+              f" p99 {escrituras['p99_ms']:>8.2f} máx {escrituras['max_ms']:>8.2f} ms"
+              f" | reintentos {escrituras['reintentos']} fallidas {escrituras['fallidas']}")
+        print(f"{'':<6} | consultas {lecturas['por_segundo']:>5.1f}/s p50 {lecturas['p50_ms']:>7.2f}"
+              f" p99 {lecturas['p99_ms']:>8.2f} máx {lecturas['max_ms']:>8.2f} ms | ocupado {lecturas['ocupado']}")
+        if "checkpoints" in resumen:
+            checkpoints = resumen["checkpoints"]
+            print(f"{'':<6} | checkpoints {checkpoints['operaciones']} p99 {checkpoints['p99_ms']:.2f}"
+                  f" máx {checkpoints['max_ms']:.2f} ms | incompletos {checkpoints['incompletos']}")
+        if modo == 'wal':
+            print(f"{'':<6} | -wal máximo {resumen['wal_max_bytes'] / 1e6:.1f} MB")
+    with open(args.salida, 'w', encoding='utf-8') as archivo:
+        json.dump(resultados, archivo, ensure_ascii=False, indent=2)
+    print(f"Resultados guardados en '{args.salida}'.")
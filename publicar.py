@@ -0,0 +1,149 @@
+"""Publicación de snapshots optimizados para despliegues de solo lectura.
+
+Un lector con mode=ro sigue tomando bloqueos y revisando si la base cambió
+en cada consulta. Un snapshot publicado no cambia nunca, así que el
+dashboard lo abre con immutable=1 (sin bloqueos ni comprobaciones) y con
+mmap. Publicar:
+  1. copia la base en vivo con la API de backup (sin bloquear escritores),
+  2. aplica las migraciones y reconstruye las tablas de resumen y los sketches,
+  3. ANALYZE y VACUUM INTO publicado/tienda-<fecha>.db,
+  4. cambia el puntero publicado/ACTUAL con os.replace (atómico).
+
+Los snapshots no se sobrescriben: cada publicación es un archivo nuevo, y
+una instancia del dashboard que lee el puntero en cada ejecución pasa al
+nuevo sin reiniciarse mientras las consultas en curso terminan sobre el
+anterior. Se conservan los últimos publicados y se borran los demás.
+
+Uso:
+    python publicar.py publicar --db tienda.db
+    python publicar.py actual
+"""
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+from evolucion import actualizar_resumen_diario
+from migraciones import aplicar_migraciones
+from particiones import conectar, listar_particiones, ruta_archivo
+from respaldos import PAGINAS_POR_PASO, PAUSA_ENTRE_PASOS
+from resumenes import reconstruir_resumenes
+from sketches import reconstruir_sketches
+
+DIRECTORIO_PUBLICADO = 'publicado'
+PUNTERO = 'ACTUAL'
+PREFIJO = 'tienda-'
+CONSERVAR_PUBLICADOS = 3
+MMAP_BYTES = 256 * 1024 * 1024  # mmap_size para las conexiones a snapshots inmutables
+
+def snapshot_actual(directorio=DIRECTORIO_PUBLICADO):
+    """Ruta del snapshot al que apunta ACTUAL, o None si no hay ninguno publicado"""
+    try:
+        with open(os.path.join(directorio, PUNTERO), encoding='utf-8') as puntero:
+            nombre = puntero.read().strip()
+    except FileNotFoundError:
+        return None
+    ruta = os.path.join(directorio, nombre)
+    return ruta if nombre and os.path.exists(ruta) else None
+
+def _escribir_puntero(directorio, nombre):
+    temporal = os.path.join(directorio, f".{PUNTERO}.{os.getpid()}.tmp")
+    with open(temporal, 'w', encoding='utf-8') as puntero:
+        puntero.write(nombre + "\n")
+        puntero.flush()
+        os.fsync(puntero.fileno())
+    os.replace(temporal, os.path.join(directorio, PUNTERO))
+
+def _preparar_copia(ruta_db, trabajo, directorio):
+    """Migra la copia de trabajo y apunta sus particiones a las de la base original"""
+    copia = sqlite3.connect(trabajo)
+    try:
+        aplicar_migraciones(copia)
+        origen = sqlite3.connect(f"file:{ruta_db}?mode=ro", uri=True)
+        rutas = {p["periodo"]: ruta_archivo(origen, p["archivo"]) for p in listar_particiones(origen)}
+        origen.close()
+        # Las rutas del registro son relativas a la base: desde publicado/ hay que subir un nivel
+        for periodo, ruta in rutas.items():
+            copia.execute("UPDATE particiones SET archivo = ? WHERE periodo = ?",
+                          (os.path.relpath(ruta, os.path.abspath(directorio)), periodo))
+        copia.execute("PRAGMA journal_mode = DELETE")  # un snapshot inmutable no puede estar en WAL
+        copia.commit()
+    finally:
+        copia.close()
+
+def publicar(ruta_db, directorio=DIRECTORIO_PUBLICADO, conservar=CONSERVAR_PUBLICADOS):
+    """Publica un snapshot optimizado de ruta_db y devuelve su ruta"""
+    os.makedirs(directorio, exist_ok=True)
+    nombre = f"{PREFIJO}{datetime.now():%Y%m%d-%H%M%S}.db"
+    destino = os.path.join(directorio, nombre)
+    trabajo = os.path.join(directorio, f".trabajo.{os.getpid()}.db")
+    temporal = os.path.join(directorio, f".{nombre}.{os.getpid()}.tmp")
+    try:
+        origen = sqlite3.connect(f"file:{ruta_db}?mode=ro", uri=True)
+        copia = sqlite3.connect(trabajo)
+        try:
+            origen.backup(copia, pages=PAGINAS_POR_PASO, sleep=PAUSA_ENTRE_PASOS)
+        finally:
+            copia.close()
+            origen.close()
+
+        _preparar_copia(ruta_db, trabajo, directorio)
+        conn = conectar(trabajo, solo_lectura=False)  # los resúmenes incluyen las ventas archivadas
+        try:
+            reconstruir_resumenes(conn)
+            reconstruir_sketches(conn)  # en el snapshot el top de cada mes queda exacto
+            conn.commit()
+            actualizar_resumen_diario(conn)
+        finally:
+            conn.close()
+        # Sin las vistas TEMP: VACUUM vuelve a crear los índices y no debe confundir tablas con vistas
+        conn = sqlite3.connect(trabajo)
+        try:
+            conn.execute("ANALYZE")
+            conn.commit()
+            conn.execute("VACUUM INTO ?", (temporal,))
+        finally:
+            conn.close()
+        os.chmod(temporal, 0o644)
+        os.replace(temporal, destino)
+        _escribir_puntero(directorio, nombre)
+    finally:
+        for sobrante in (trabajo, trabajo + '-journal', temporal):
+            if os.path.exists(sobrante):
+                os.remove(sobrante)
+
+    rotar(directorio, conservar)
+    return destino
+
+def rotar(directorio=DIRECTORIO_PUBLICADO, conservar=CONSERVAR_PUBLICADOS):
+    """Borra los snapshots publicados más antiguos; nunca el actual"""
+    actual = snapshot_actual(directorio)
+    publicados = sorted(
+        (archivo for archivo in os.listdir(directorio) if archivo.startswith(PREFIJO) and archivo.endswith('.db')),
+        reverse=True
+    )
+    borrados = []
+    for archivo in publicados[conservar:]:
+        ruta = os.path.join(directorio, archivo)
+        if actual and os.path.samefile(ruta, actual):
+            continue
+        os.remove(ruta)  # las conexiones que aún lo tengan abierto siguen leyéndolo hasta cerrarse
+        borrados.append(archivo)
+    return borrados
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Publica snapshots inmutables de la base")
+    parser.add_argument('accion', choices=['publicar', 'actual'])
+    parser.add_argument('--db', default='tienda.db', help="Base en vivo a publicar")
+    parser.add_argument('--directorio', default=DIRECTORIO_PUBLICADO, help="Carpeta de los snapshots publicados")
+    parser.add_argument('--conservar', type=int, default=CONSERVAR_PUBLICADOS, help="Snapshots publicados a conservar")
+    args = parser.parse_args()
+
+    if args.accion == 'publicar':
+        inicio = time.perf_counter()
+        ruta = publicar(args.db, args.directorio, args.conservar)
+        print(f"Publicado '{ruta}' en {time.perf_counter() - inicio:.2f} s ({os.path.getsize(ruta) / 1e6:.1f} MB).")
+    else:
+        ruta = snapshot_actual(args.directorio)
+        print(ruta or f"No hay snapshots publicados en '{args.directorio}'.")
@@ -0,0 +1,163 @@
+"""Registro atómico de ventas y compras, seguro con varios escritores.
+
+Cada venta o compra (cabecera + líneas) se escribe en una sola
+transacción BEGIN IMMEDIATE. El stock se descuenta con un UPDATE
+condicional (WHERE stock >= ?), así que dos cajas vendiendo a la vez el
+último producto nunca dejan el stock en negativo: una de las dos recibe
+StockInsuficiente y su venta completa se deshace.
+
+Las conexiones de escritura usan WAL, busy_timeout y reintentos con
+espera exponencial, de modo que varios procesos pueden escribir a la vez
+sin fallar con 'database is locked'.
+"""
+import random
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from evolucion import resumir_pendientes
+
+BUSY_TIMEOUT_MS = 5000
+REINTENTOS = 8
+ESPERA_INICIAL = 0.01  # segundos; se duplica en cada reintento
+
+# Contadores del proceso (los usa la prueba de carga)
+CONTADORES = {"transacciones": 0, "reintentos": 0, "ocupado": 0}
+
+class ErrorRegistro(Exception):
+    """Error de negocio al registrar una venta o compra"""
+
+class ProductoNoExiste(ErrorRegistro):
+    def __init__(self, id_producto):
+        super().__init__(f"El producto {id_producto} no existe")
+        self.id_producto = id_producto
+
+class StockInsuficiente(ErrorRegistro):
+    def __init__(self, id_producto, cantidad):
+        super().__init__(f"Stock insuficiente del producto {id_producto} para vender {cantidad}")
+        self.id_producto = id_producto
+        self.cantidad = cantidad
+
+def conectar_escritura(ruta='tienda.db', journal_mode='WAL', busy_timeout_ms=BUSY_TIMEOUT_MS):
+    """Abre una conexión de escritura en modo autocommit (las transacciones son explícitas).
+
+    WAL permite que los lectores sigan consultando mientras un escritor
+    confirma; con synchronous=NORMAL cada commit no espera un fsync.
+    """
+    conn = sqlite3.connect(ruta, isolation_level=None, timeout=busy_timeout_ms / 1000)
+    conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+    conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+    if journal_mode.upper() == 'WAL':
+        conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA foreign_keys = 1")
+    return conn
+
+def esta_ocupada(error):
+    mensaje = str(error).lower()
+    return "locked" in mensaje or "busy" in mensaje
+
+@contextmanager
+def transaccion_inmediata(conn):
+    """BEGIN IMMEDIATE ... COMMIT, con ROLLBACK si algo falla dentro del bloque"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+        conn.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:  # SQLite pudo haberla deshecho ya (p. ej. SQLITE_FULL o una interrupción)
+            conn.execute("ROLLBACK")
+        raise
+
+def con_reintentos(conn, operacion, reintentos=REINTENTOS):
+    """Ejecuta operacion(conn) en una transacción inmediata, reintentando si la base está ocupada.
+
+    Solo se reintentan los errores de bloqueo (SQLITE_BUSY/LOCKED); los de
+    negocio y los de integridad se propagan enseguida.
+    """
+    espera = ESPERA_INICIAL
+    for intento in range(reintentos + 1):
+        try:
+            with transaccion_inmediata(conn):
+                resultado = operacion(conn)
+            CONTADORES["transacciones"] += 1
+            return resultado
+        except sqlite3.OperationalError as e:
+            if not esta_ocupada(e) or intento == reintentos:
+                raise
+            CONTADORES["ocupado"] += 1
+            CONTADORES["reintentos"] += 1
+            time.sleep(espera * (1 + random.random()))  # con jitter para no reintentar todos a la vez
+            espera *= 2
+
+def _descontar_stock(conn, id_producto, cantidad):
+    """Descuenta stock solo si alcanza; devuelve el precio de venta"""
+    cursor = conn.execute(
+        "UPDATE productos SET stock = stock - ? WHERE id_producto = ? AND stock >= ?",
+        (cantidad, id_producto, cantidad)
+    )
+    fila = conn.execute("SELECT precio_venta FROM productos WHERE id_producto = ?", (id_producto,)).fetchone()
+    if fila is None:
+        raise ProductoNoExiste(id_producto)
+    if cursor.rowcount == 0:
+        raise StockInsuficiente(id_producto, cantidad)
+    return fila[0]
+
+def insertar_venta(conn, lineas, id_cliente=None, fecha=None, parcial=False):
+    """Inserta cabecera y líneas de una venta dentro de la transacción en curso.
+
+    lineas es una lista de (id_producto, cantidad). Con parcial=True las
+    líneas sin stock se omiten (como en poblar_tablas) en lugar de anular
+    la venta. Devuelve el id_venta.
+    """
+    id_venta = conn.execute(
+        "INSERT INTO ventas (fecha_venta, id_cliente) VALUES (COALESCE(?, date('now')), ?)",
+        (fecha, id_cliente)
+    ).lastrowid
+    for id_producto, cantidad in lineas:
+        try:
+            precio_unitario = _descontar_stock(conn, id_producto, cantidad)
+        except StockInsuficiente:
+            if parcial:
+                continue
+            raise
+        conn.execute(
+            "INSERT INTO detalle_ventas (id_venta, id_producto, cantidad, precio_unitario) VALUES (?,?,?,?)",
+            (id_venta, id_producto, cantidad, precio_unitario)
+        )
+    return id_venta
+
+def insertar_compra(conn, id_proveedor, lineas, fecha=None):
+    """Inserta cabecera y líneas de una compra dentro de la transacción en curso"""
+    id_compra = conn.execute(
+        "INSERT INTO compras (fecha_compra, id_proveedor) VALUES (COALESCE(?, date('now')), ?)",
+        (fecha, id_proveedor)
+    ).lastrowid
+    for id_producto, cantidad in lineas:
+        fila = conn.execute("SELECT precio_compra FROM productos WHERE id_producto = ?", (id_producto,)).fetchone()
+        if fila is None:
+            raise ProductoNoExiste(id_producto)
+        conn.execute(
+            "INSERT INTO detalle_compras (id_compra, id_producto, cantidad, precio_unitario) VALUES (?,?,?,?)",
+            (id_compra, id_producto, cantidad, fila[0])
+        )
+        conn.execute("UPDATE productos SET stock = stock + ? WHERE id_producto = ?", (cantidad, id_producto))
+    return id_compra
+
+def registrar_venta(conn, lineas, id_cliente=None, fecha=None, parcial=False):
+    """Registra una venta completa de forma atómica y devuelve su id_venta.
+
+    Si algún producto no existe o no tiene stock suficiente (y parcial es
+    False), no se guarda nada y se lanza ProductoNoExiste o StockInsuficiente.
+    """
+    lineas = list(lineas)
+
+    def operacion(c):
+        id_venta = insertar_venta(c, lineas, id_cliente, fecha, parcial)
+        resumir_pendientes(c)  # cada ACTUALIZAR_CADA ventas avanza el resumen diario
+        return id_venta
+    return con_reintentos(conn, operacion)
+
+def registrar_compra(conn, id_proveedor, lineas, fecha=None):
+    """Registra una compra completa de forma atómica y devuelve su id_compra"""
+    lineas = list(lineas)
+    return con_reintentos(conn, lambda c: insertar_compra(c, id_proveedor, lineas, fecha))
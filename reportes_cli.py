@@ -0,0 +1,124 @@
+"""Reportes del dashboard sin streamlit ni pandas, para tareas programadas.
+
+Usa el mismo SQL que el dashboard (consultas.REPORTES, con las tablas de
+resumen si la base las tiene) y la conexión de app.crear_conexion en solo
+lectura. Cada reporte corre en su propio hilo con su propia conexión (SQLite
+suelta el GIL mientras ejecuta) y las filas pasan del cursor al archivo por
+bloques, así que la memoria no depende del tamaño del resultado. Cada
+archivo se escribe en un temporal y se publica con os.replace.
+
+Uso:
+    python reportes_cli.py                                  # los siete reportes en reportes/*.csv
+    python reportes_cli.py clientes_frecuentes mayor_compra --formato jsonl
+    python reportes_cli.py categoria_popular --salida -    # a la salida estándar
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import crear_conexion
+from conexiones import consultar_por_bloques
+from consultas import REPORTES
+from migraciones import VERSION_RESUMENES, version_actual
+from particiones import asegurar_vistas
+
+DIRECTORIO_SALIDA = 'reportes'
+FORMATOS = ('csv', 'jsonl')
+
+def sql_de_reporte(reporte, version, exacto=False):
+    """SQL del reporte: el de las tablas de resumen si existen, salvo que se pida el exacto"""
+    if reporte["sql_resumen"] and version >= VERSION_RESUMENES and not exacto:
+        return reporte["sql_resumen"]
+    return reporte["sql"]
+
+def escribir_reporte(conn, sql, salida, formato='csv', tamano_bloque=1000):
+    """Escribe el resultado de sql en el archivo abierto salida y devuelve las filas escritas"""
+    filas_escritas = 0
+    escritor = None
+    for columnas, filas in consultar_por_bloques(conn, sql, tamano_bloque=tamano_bloque):
+        if formato == 'csv':
+            if escritor is None:
+                escritor = csv.writer(salida)
+                escritor.writerow(columnas)
+            escritor.writerows(filas)
+        else:
+            for fila in filas:
+                salida.write(json.dumps(dict(zip(columnas, fila)), ensure_ascii=False) + "\n")
+        filas_escritas += len(filas)
+    return filas_escritas
+
+def ejecutar_reporte(ruta_db, reporte, directorio, formato='csv', exacto=False):
+    """Corre un reporte con una conexión propia y lo guarda en directorio/<clave>.<formato>.
+
+    Devuelve (clave, filas, segundos, ruta del archivo).
+    """
+    inicio = time.perf_counter()
+    conn = crear_conexion(ruta_db, solo_lectura=True)
+    if conn is None:
+        raise RuntimeError(f"No se pudo abrir '{ruta_db}'")
+    try:
+        asegurar_vistas(conn)  # incluye las ventas archivadas en particiones
+        sql = sql_de_reporte(reporte, version_actual(conn), exacto)
+        destino = os.path.join(directorio, f"{reporte['clave']}.{formato}")
+        temporal = f"{destino}.{os.getpid()}.tmp"
+        try:
+            with open(temporal, 'w', encoding='utf-8', newline='') as salida:
+                filas = escribir_reporte(conn, sql, salida, formato)
+            os.replace(temporal, destino)
+        except BaseException:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+    finally:
+        conn.close()
+    return reporte["clave"], filas, time.perf_counter() - inicio, destino
+
+def ejecutar_reportes(ruta_db, claves=None, directorio=DIRECTORIO_SALIDA, formato='csv', hilos=4, exacto=False):
+    """Corre en paralelo los reportes elegidos (todos si claves es None).
+
+    Devuelve una lista de (clave, filas, segundos, ruta) en el orden de
+    REPORTES; si un reporte falla, la excepción se propaga al terminar los demás.
+    """
+    reportes = [r for r in REPORTES if claves is None or r["clave"] in claves]
+    os.makedirs(directorio, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=max(1, hilos)) as ejecutor:
+        futuros = [ejecutor.submit(ejecutar_reporte, ruta_db, reporte, directorio, formato, exacto)
+                   for reporte in reportes]
+    return [futuro.result() for futuro in futuros]
+
+if __name__ == '__main__':
+    claves_validas = [reporte["clave"] for reporte in REPORTES]
+    parser = argparse.ArgumentParser(description="Genera los reportes del dashboard como CSV o JSONL")
+    parser.add_argument('claves', nargs='*', metavar='reporte',
+                        help=f"Reportes a generar (por defecto todos): {', '.join(claves_validas)}")
+    parser.add_argument('--db', default='tienda.db', help="Ruta de la base")
+    parser.add_argument('--formato', choices=FORMATOS, default='csv')
+    parser.add_argument('--salida', default=DIRECTORIO_SALIDA, help="Carpeta de salida, o '-' para la salida estándar")
+    parser.add_argument('--hilos', type=int, default=4, help="Reportes que se ejecutan a la vez")
+    parser.add_argument('--exacto', action='store_true', help="Calcular desde detalle_ventas aunque haya tablas de resumen")
+    args = parser.parse_args()
+    desconocidas = set(args.claves) - set(claves_validas)
+    if desconocidas:
+        parser.error(f"reportes desconocidos: {', '.join(sorted(desconocidas))}")
+
+    if args.salida == '-':
+        # A la salida estándar los reportes van uno detrás de otro para no mezclar sus filas
+        conn = crear_conexion(args.db, solo_lectura=True)
+        if conn is None:
+            raise SystemExit(1)
+        asegurar_vistas(conn)
+        version = version_actual(conn)
+        for reporte in REPORTES:
+            if not args.claves or reporte["clave"] in args.claves:
+                escribir_reporte(conn, sql_de_reporte(reporte, version, args.exacto), sys.stdout, args.formato)
+        conn.close()
+    else:
+        inicio = time.perf_counter()
+        for clave, filas, segundos, ruta in ejecutar_reportes(args.db, args.claves or None, args.salida,
+                                                               args.formato, args.hilos, args.exacto):
+            print(f"  - {clave:<24} {filas:>8} filas  {segundos * 1000:>8.1f} ms  {ruta}")
+        print(f"Reportes generados en {time.perf_counter() - inicio:.2f} s.")
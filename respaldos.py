@@ -0,0 +1,136 @@
+"""Respaldos en línea y snapshots con nombre de tienda.db.
+
+Copiar tienda.db con cp mientras alguien escribe puede dejar una copia
+corrupta. Aquí se usa la API de backup de SQLite, que copia unas cuantas
+páginas por paso y suelta el bloqueo entre pasos, así que lectores y
+escritores siguen trabajando durante el respaldo; o bien VACUUM INTO, que
+escribe una copia compactada (sin páginas libres) en una sola lectura.
+
+Cada snapshot se escribe en un temporal y se publica con os.replace, así
+que nunca se ve uno a medias. Los automáticos (auto-<fecha>) rotan y se
+conservan solo los últimos; los que tienen nombre propio se conservan
+siempre. El dashboard puede abrir cualquiera en solo lectura.
+
+Las particiones de ventas archivadas no se copian: el snapshot apunta a
+las de la base en vivo (con rutas absolutas), así que las comparte con
+ella y un respaldo completo también debe guardar la carpeta particiones/.
+
+Uso:
+    python respaldos.py crear --db tienda.db [--nombre cierre-mayo] [--compacto]
+    python respaldos.py listar
+"""
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+from particiones import listar_particiones, ruta_archivo
+
+DIRECTORIO_RESPALDOS = 'respaldos'
+PREFIJO_AUTOMATICO = 'auto-'
+CONSERVAR = 7
+PAGINAS_POR_PASO = 1024
+PAUSA_ENTRE_PASOS = 0.005  # segundos; deja entrar a los escritores entre pasos
+
+def _ruta_snapshot(directorio, nombre):
+    return os.path.join(directorio, f"{nombre}.db")
+
+def crear_respaldo(ruta_db, directorio=DIRECTORIO_RESPALDOS, nombre=None, compacto=False,
+                   paginas_por_paso=PAGINAS_POR_PASO, pausa=PAUSA_ENTRE_PASOS, conservar=CONSERVAR):
+    """Crea un snapshot de ruta_db y devuelve su ruta.
+
+    Sin nombre, el snapshot es automático y entra en la rotación. Con
+    compacto=True se usa VACUUM INTO en lugar de la API de backup. Las
+    particiones no se copian: el snapshot lee las de ruta_db.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    nombre = nombre or PREFIJO_AUTOMATICO + datetime.now().strftime('%Y%m%d-%H%M%S')
+    destino = _ruta_snapshot(directorio, nombre)
+    temporal = os.path.join(directorio, f".{nombre}.{os.getpid()}.tmp")
+    if os.path.exists(temporal):
+        os.remove(temporal)
+
+    # VACUUM INTO no escribe en el origen, pero en mode=ro SQLite 3.40 falla con las columnas
+    # generadas de productos ("has 10 columns but 14 values were supplied")
+    origen = sqlite3.connect(f"file:{ruta_db}{'' if compacto else '?mode=ro'}", uri=True)
+    try:
+        if compacto:
+            origen.execute("VACUUM INTO ?", (temporal,))
+        else:
+            copia = sqlite3.connect(temporal)
+            try:
+                origen.backup(copia, pages=paginas_por_paso, sleep=pausa)
+            finally:
+                copia.close()
+        # La copia hereda el modo WAL del original; en modo DELETE se abre en solo lectura sin -shm
+        copia = sqlite3.connect(temporal)
+        try:
+            copia.execute("PRAGMA journal_mode = DELETE")
+            # Una ruta relativa se resolvería desde respaldos/: se fijan las de la base en vivo
+            for particion in listar_particiones(origen):
+                copia.execute("UPDATE particiones SET archivo = ? WHERE periodo = ?",
+                              (os.path.abspath(ruta_archivo(origen, particion["archivo"])), particion["periodo"]))
+            copia.commit()
+        finally:
+            copia.close()
+        os.chmod(temporal, 0o644)
+        os.replace(temporal, destino)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    finally:
+        origen.close()
+
+    rotar(directorio, conservar)
+    return destino
+
+def listar_respaldos(directorio=DIRECTORIO_RESPALDOS):
+    """Snapshots disponibles, del más reciente al más antiguo"""
+    if not os.path.isdir(directorio):
+        return []
+    respaldos = []
+    for archivo in os.listdir(directorio):
+        if not archivo.endswith('.db') or archivo.startswith('.'):
+            continue
+        ruta = os.path.join(directorio, archivo)
+        info = os.stat(ruta)
+        respaldos.append({
+            "nombre": archivo[:-3],
+            "ruta": ruta,
+            "tamano": info.st_size,
+            "fecha": datetime.fromtimestamp(info.st_mtime),
+            "automatico": archivo.startswith(PREFIJO_AUTOMATICO),
+        })
+    return sorted(respaldos, key=lambda r: r["fecha"], reverse=True)
+
+def rotar(directorio=DIRECTORIO_RESPALDOS, conservar=CONSERVAR):
+    """Borra los snapshots automáticos más antiguos, dejando los últimos `conservar`"""
+    automaticos = [r for r in listar_respaldos(directorio) if r["automatico"]]
+    for respaldo in automaticos[conservar:]:
+        os.remove(respaldo["ruta"])
+    return [r["nombre"] for r in automaticos[conservar:]]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Respaldos en línea de la base")
+    parser.add_argument('accion', choices=['crear', 'listar'])
+    parser.add_argument('--db', default='tienda.db', help="Base a respaldar")
+    parser.add_argument('--directorio', default=DIRECTORIO_RESPALDOS, help="Carpeta de los snapshots")
+    parser.add_argument('--nombre', default=None, help="Nombre del snapshot (sin nombre entra en la rotación)")
+    parser.add_argument('--compacto', action='store_true', help="Usar VACUUM INTO (copia compactada)")
+    parser.add_argument('--conservar', type=int, default=CONSERVAR, help="Snapshots automáticos a conservar")
+    parser.add_argument('--paginas', type=int, default=PAGINAS_POR_PASO, help="Páginas copiadas por paso")
+    parser.add_argument('--pausa-ms', type=float, default=PAUSA_ENTRE_PASOS * 1000, help="Pausa entre pasos")
+    args = parser.parse_args()
+
+    if args.accion == 'crear':
+        inicio = time.perf_counter()
+        ruta = crear_respaldo(args.db, args.directorio, args.nombre, args.compacto,
+                              args.paginas, args.pausa_ms / 1000, args.conservar)
+        print(f"Snapshot '{ruta}' creado en {time.perf_counter() - inicio:.2f} s "
+              f"({os.path.getsize(ruta) / 1e6:.1f} MB).")
+    else:
+        for respaldo in listar_respaldos(args.directorio):
+            tipo = "auto" if respaldo["automatico"] else "fijo"
+            print(f"{respaldo['fecha']:%Y-%m-%d %H:%M:%S}  {tipo}  {respaldo['tamano'] / 1e6:8.1f} MB  {respaldo['nombre']}")
@@ -0,0 +1,311 @@
+"""Tablas de resumen de ventas y compras mantenidas por triggers.
+
+Los reportes por producto, categoría, cliente y proveedor leen estas
+tablas en lugar de agregar todo detalle_ventas/detalle_compras, así que su
+costo ya no crece con el número de líneas de venta. Las crea la migración
+2; para bases que ya tienen datos, reconstruir_resumenes las recalcula.
+"""
+import argparse
+import sqlite3
+from contextlib import contextmanager
+
+from sketches import TRIGGERS_SKETCHES, reconstruir_sketches
+
+TABLAS_RESUMEN = [
+    """
+    CREATE TABLE IF NOT EXISTS resumen_productos (
+        id_producto INTEGER PRIMARY KEY,
+        n_ventas INTEGER NOT NULL DEFAULT 0,
+        unidades_vendidas INTEGER NOT NULL DEFAULT 0,
+        total_venta REAL NOT NULL DEFAULT 0,
+        unidades_compradas INTEGER NOT NULL DEFAULT 0
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS resumen_categorias (
+        id_categoria INTEGER PRIMARY KEY,
+        n_ventas INTEGER NOT NULL DEFAULT 0,
+        unidades_vendidas INTEGER NOT NULL DEFAULT 0,
+        total_venta REAL NOT NULL DEFAULT 0
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS resumen_cliente_categoria (
+        id_cliente INTEGER NOT NULL,
+        id_categoria INTEGER NOT NULL,
+        n_ventas INTEGER NOT NULL DEFAULT 0,
+        total_venta REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (id_cliente, id_categoria)
+    ) WITHOUT ROWID;
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_resumen_cliente_categoria ON resumen_cliente_categoria(id_categoria, n_ventas)",
+    """
+    CREATE TABLE IF NOT EXISTS resumen_proveedores (
+        id_proveedor INTEGER PRIMARY KEY,
+        n_compras INTEGER NOT NULL DEFAULT 0
+    );
+    """,
+]
+
+def _sumar_linea_venta(fila, signo):
+    """Sentencias que suman (signo '+') o restan ('-') una línea de detalle_ventas"""
+    return f"""
+        INSERT INTO resumen_productos (id_producto, n_ventas, unidades_vendidas, total_venta)
+        VALUES ({fila}.id_producto, {signo}1, {signo}{fila}.cantidad, {signo}{fila}.cantidad * {fila}.precio_unitario)
+        ON CONFLICT(id_producto) DO UPDATE SET
+            n_ventas = n_ventas + excluded.n_ventas,
+            unidades_vendidas = unidades_vendidas + excluded.unidades_vendidas,
+            total_venta = total_venta + excluded.total_venta;
+        INSERT INTO resumen_categorias (id_categoria, n_ventas, unidades_vendidas, total_venta)
+        SELECT p.id_categoria, {signo}1, {signo}{fila}.cantidad, {signo}{fila}.cantidad * {fila}.precio_unitario
+        FROM productos p WHERE p.id_producto = {fila}.id_producto
+        ON CONFLICT(id_categoria) DO UPDATE SET
+            n_ventas = n_ventas + excluded.n_ventas,
+            unidades_vendidas = unidades_vendidas + excluded.unidades_vendidas,
+            total_venta = total_venta + excluded.total_venta;
+        INSERT INTO resumen_cliente_categoria (id_cliente, id_categoria, n_ventas, total_venta)
+        SELECT v.id_cliente, p.id_categoria, {signo}1, {signo}{fila}.cantidad * {fila}.precio_unitario
+        FROM ventas v, productos p
+        WHERE v.id_venta = {fila}.id_venta AND p.id_producto = {fila}.id_producto AND v.id_cliente IS NOT NULL
+        ON CONFLICT(id_cliente, id_categoria) DO UPDATE SET
+            n_ventas = n_ventas + excluded.n_ventas,
+            total_venta = total_venta + excluded.total_venta;"""
+
+def _sumar_linea_compra(fila, signo):
+    """Sentencias que suman o restan una línea de detalle_compras"""
+    return f"""
+        INSERT INTO resumen_productos (id_producto, unidades_compradas)
+        VALUES ({fila}.id_producto, {signo}{fila}.cantidad)
+        ON CONFLICT(id_producto) DO UPDATE SET
+            unidades_compradas = unidades_compradas + excluded.unidades_compradas;
+        INSERT INTO resumen_proveedores (id_proveedor, n_compras)
+        SELECT c.id_proveedor, {signo}1 FROM compras c WHERE c.id_compra = {fila}.id_compra
+        ON CONFLICT(id_proveedor) DO UPDATE SET n_compras = n_compras + excluded.n_compras;"""
+
+def _mover_venta_de_cliente(fila, signo):
+    """Suma o resta todas las líneas de una venta al cliente de {fila}"""
+    return f"""
+        INSERT INTO resumen_cliente_categoria (id_cliente, id_categoria, n_ventas, total_venta)
+        SELECT {fila}.id_cliente, p.id_categoria, {signo}COUNT(*), {signo}SUM(dv.cantidad * dv.precio_unitario)
+        FROM detalle_ventas dv INNER JOIN productos p ON p.id_producto = dv.id_producto
+        WHERE dv.id_venta = {fila}.id_venta AND {fila}.id_cliente IS NOT NULL
+        GROUP BY p.id_categoria
+        ON CONFLICT(id_cliente, id_categoria) DO UPDATE SET
+            n_ventas = n_ventas + excluded.n_ventas,
+            total_venta = total_venta + excluded.total_venta;"""
+
+def _mover_producto_de_categoria(fila, signo):
+    """Suma o resta todo lo vendido de un producto a la categoría de {fila}"""
+    return f"""
+        INSERT INTO resumen_categorias (id_categoria, n_ventas, unidades_vendidas, total_venta)
+        SELECT {fila}.id_categoria, {signo}rp.n_ventas, {signo}rp.unidades_vendidas, {signo}rp.total_venta
+        FROM resumen_productos rp WHERE rp.id_producto = {fila}.id_producto
+        ON CONFLICT(id_categoria) DO UPDATE SET
+            n_ventas = n_ventas + excluded.n_ventas,
+            unidades_vendidas = unidades_vendidas + excluded.unidades_vendidas,
+            total_venta = total_venta + excluded.total_venta;
+        INSERT INTO resumen_cliente_categoria (id_cliente, id_categoria, n_ventas, total_venta)
+        SELECT v.id_cliente, {fila}.id_categoria, {signo}COUNT(*), {signo}SUM(dv.cantidad * dv.precio_unitario)
+        FROM detalle_ventas dv INNER JOIN ventas v ON v.id_venta = dv.id_venta
+        WHERE dv.id_producto = {fila}.id_producto AND v.id_cliente IS NOT NULL
+        GROUP BY v.id_cliente
+        ON CONFLICT(id_cliente, id_categoria) DO UPDATE SET
+            n_ventas = n_ventas + excluded.n_ventas,
+            total_venta = total_venta + excluded.total_venta;"""
+
+TRIGGERS_RESUMEN = {
+    "trg_resumen_detalle_ventas_ins": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_resumen_detalle_ventas_ins AFTER INSERT ON detalle_ventas
+        BEGIN {_sumar_linea_venta('NEW', '+')}
+        END;""",
+    "trg_resumen_detalle_ventas_del": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_resumen_detalle_ventas_del AFTER DELETE ON detalle_ventas
+        BEGIN {_sumar_linea_venta('OLD', '-')}
+        END;""",
+    "trg_resumen_detalle_ventas_upd": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_resumen_detalle_ventas_upd AFTER UPDATE ON detalle_ventas
+        BEGIN {_sumar_linea_venta('OLD', '-')} {_sumar_linea_venta('NEW', '+')}
+        END;""",
+    "trg_resumen_detalle_compras_ins": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_resumen_detalle_compras_ins AFTER INSERT ON detalle_compras
+        BEGIN {_sumar_linea_compra('NEW', '+')}
+        END;""",
+    "trg_resumen_detalle_compras_del": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_resumen_detalle_compras_del AFTER DELETE ON detalle_compras
+        BEGIN {_sumar_linea_compra('OLD', '-')}
+        END;""",
+    "trg_resumen_detalle_compras_upd": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_resumen_detalle_compras_upd AFTER UPDATE ON detalle_compras
+        BEGIN {_sumar_linea_compra('OLD', '-')} {_sumar_linea_compra('NEW', '+')}
+        END;""",
+    # Cambios en las cabeceras que mueven líneas ya resumidas
+    "trg_resumen_ventas_cliente": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_resumen_ventas_cliente AFTER UPDATE OF id_cliente ON ventas
+        WHEN OLD.id_cliente IS NOT NEW.id_cliente
+        BEGIN {_mover_venta_de_cliente('OLD', '-')} {_mover_venta_de_cliente('NEW', '+')}
+        END;""",
+    "trg_resumen_compras_proveedor": """
+        CREATE TRIGGER IF NOT EXISTS trg_resumen_compras_proveedor AFTER UPDATE OF id_proveedor ON compras
+        WHEN OLD.id_proveedor IS NOT NEW.id_proveedor
+        BEGIN
+            INSERT INTO resumen_proveedores (id_proveedor, n_compras)
+            SELECT NEW.id_proveedor, COUNT(*) FROM detalle_compras WHERE id_compra = NEW.id_compra
+            ON CONFLICT(id_proveedor) DO UPDATE SET n_compras = n_compras + excluded.n_compras;
+            UPDATE resumen_proveedores
+            SET n_compras = n_compras - (SELECT COUNT(*) FROM detalle_compras WHERE id_compra = NEW.id_compra)
+            WHERE id_proveedor = OLD.id_proveedor;
+        END;""",
+    "trg_resumen_productos_categoria": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_resumen_productos_categoria AFTER UPDATE OF id_categoria ON productos
+        WHEN OLD.id_categoria IS NOT NEW.id_categoria
+        BEGIN {_mover_producto_de_categoria('OLD', '-')} {_mover_producto_de_categoria('NEW', '+')}
+        END;""",
+}
+
+# Recalcula todo desde las tablas de detalle (bases existentes o tras cargas masivas)
+RECONSTRUIR_RESUMENES = [
+    "DELETE FROM resumen_productos",
+    "DELETE FROM resumen_categorias",
+    "DELETE FROM resumen_cliente_categoria",
+    "DELETE FROM resumen_proveedores",
+    """
+    INSERT INTO resumen_productos (id_producto, n_ventas, unidades_vendidas, total_venta, unidades_compradas)
+    SELECT p.id_producto, COALESCE(v.n_ventas, 0), COALESCE(v.unidades, 0), COALESCE(v.total, 0),
+           COALESCE(c.unidades, 0)
+    FROM productos p
+    LEFT JOIN (
+        SELECT id_producto, COUNT(*) as n_ventas, SUM(cantidad) as unidades,
+               SUM(cantidad * precio_unitario) as total
+        FROM detalle_ventas GROUP BY id_producto
+    ) v ON v.id_producto = p.id_producto
+    LEFT JOIN (
+        SELECT id_producto, SUM(cantidad) as unidades FROM detalle_compras GROUP BY id_producto
+    ) c ON c.id_producto = p.id_producto
+    """,
+    """
+    INSERT INTO resumen_categorias (id_categoria, n_ventas, unidades_vendidas, total_venta)
+    SELECT p.id_categoria, SUM(rp.n_ventas), SUM(rp.unidades_vendidas), SUM(rp.total_venta)
+    FROM resumen_productos rp INNER JOIN productos p ON p.id_producto = rp.id_producto
+    GROUP BY p.id_categoria
+    """,
+    """
+    INSERT INTO resumen_cliente_categoria (id_cliente, id_categoria, n_ventas, total_venta)
+    SELECT v.id_cliente, p.id_categoria, COUNT(*), SUM(dv.cantidad * dv.precio_unitario)
+    FROM detalle_ventas dv
+    INNER JOIN ventas v ON v.id_venta = dv.id_venta
+    INNER JOIN productos p ON p.id_producto = dv.id_producto
+    WHERE v.id_cliente IS NOT NULL
+    GROUP BY v.id_cliente, p.id_categoria
+    """,
+    """
+    INSERT INTO resumen_proveedores (id_proveedor, n_compras)
+    SELECT c.id_proveedor, COUNT(*)
+    FROM detalle_compras dc INNER JOIN compras c ON c.id_compra = dc.id_compra
+    GROUP BY c.id_proveedor
+    """,
+]
+
+# Huella barata de los datos de ventas y compras: lee solo las tablas de
+# resumen y los máximos de las claves, así que no depende del tamaño de la base
+# Se lee de main aunque haya particiones adjuntas: por las vistas, MAX y COUNT recorrerían
+# todas las particiones. Lo archivado entra en la huella por el registro de particiones.
+SQL_HUELLA_DATOS = """
+    SELECT
+        (SELECT MAX(id_detalle_venta) FROM main.detalle_ventas),
+        (SELECT COUNT(*) FROM main.detalle_ventas),
+        (SELECT MAX(id_detalle_compra) FROM main.detalle_compras),
+        (SELECT COUNT(*) FROM main.detalle_compras),
+        (SELECT MAX(id_cliente) FROM clientes),
+        (SELECT MAX(id_producto) FROM productos),
+        (SELECT TOTAL(n_ventas) || ':' || TOTAL(unidades_vendidas) || ':' || TOTAL(total_venta)
+         FROM resumen_categorias),
+        (SELECT TOTAL(id_cliente * n_ventas) || ':' || TOTAL(id_categoria * n_ventas)
+         FROM resumen_cliente_categoria),
+        (SELECT TOTAL(id_proveedor * n_compras) FROM resumen_proveedores)
+    """
+
+def huella_datos(conn):
+    """Texto que cambia cuando se insertan, borran o modifican ventas o compras.
+
+    Sirve para saber si una copia derivada (por ejemplo, el snapshot
+    columnar) sigue al día sin recorrer las tablas de detalle. No detecta
+    cambios de nombre en clientes, productos o proveedores. Incluye las
+    filas de cada partición archivada, según su registro.
+    """
+    valores = list(conn.execute(SQL_HUELLA_DATOS).fetchone())
+    try:
+        valores += conn.execute(
+            "SELECT periodo || ':' || n_lineas || ':' || actualizado FROM main.particiones ORDER BY periodo"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        pass  # base anterior a la migración 5: no hay particiones
+    return "|".join(str(valor) for valor in valores)
+
+def reconstruir_resumenes(conn):
+    """Vuelve a calcular las tablas de resumen desde cero (sin confirmar)"""
+    for sentencia in RECONSTRUIR_RESUMENES:
+        conn.execute(sentencia)
+
+def eliminar_triggers(conn, triggers=TRIGGERS_RESUMEN):
+    """Quita los triggers de resumen (u otros); devuelve True si estaban instalados"""
+    existentes = {
+        fila[0] for fila in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+    }
+    instalados = existentes & set(triggers)
+    for nombre in instalados:
+        conn.execute(f"DROP TRIGGER {nombre}")
+    return bool(instalados)
+
+def crear_triggers(conn, triggers=TRIGGERS_RESUMEN):
+    """Instala los triggers de resumen (u otros)"""
+    for sentencia in triggers.values():
+        conn.execute(sentencia)
+
+@contextmanager
+def triggers_suspendidos(conn, reconstruir=True):
+    """Desactiva los triggers durante una carga masiva y reconstruye al salir.
+
+    Mantener los resúmenes fila por fila cuesta varias escrituras extra por
+    línea; en una carga grande sale más barato recalcularlos una sola vez.
+    Todo ocurre en la transacción de quien llama. Si la carga falla, los
+    triggers se reinstalan igual (sin reconstruir), así que aunque quien
+    llama confirme lo que alcanzó a hacer, no queda una base sin ellos.
+    Con reconstruir=False los
+    resúmenes quedan como estaban (lo usa el archivado de particiones, que
+    saca filas de la base sin que dejen de contar en los totales). Lo
+    mismo vale para los sketches del top aproximado.
+    """
+    if not conn.in_transaction:
+        conn.execute("BEGIN")
+    instalados = eliminar_triggers(conn)
+    sketches = eliminar_triggers(conn, TRIGGERS_SKETCHES)
+    try:
+        yield
+    finally:
+        if instalados:
+            crear_triggers(conn)
+        if sketches:
+            crear_triggers(conn, TRIGGERS_SKETCHES)
+    if reconstruir:
+        if instalados:
+            reconstruir_resumenes(conn)
+        if sketches:
+            reconstruir_sketches(conn)
+
+if __name__ == '__main__':
+    from migraciones import aplicar_migraciones
+    from particiones import conectar
+
+    parser = argparse.ArgumentParser(description="Crea o reconstruye las tablas de resumen")
+    parser.add_argument('--db', default='tienda.db', help="Ruta de la base")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    aplicar_migraciones(conn)
+    conn.close()
+    # Con las particiones adjuntas los resúmenes incluyen también las ventas archivadas
+    conn = conectar(args.db, solo_lectura=False)
+    reconstruir_resumenes(conn)
+    conn.commit()
+    conn.close()
+    print(f"Tablas de resumen reconstruidas en '{args.db}'.")
@@ -0,0 +1,266 @@
+"""Top de productos y clientes aproximado con sketches por mes.
+
+Los reportes 1 y 2 agrupan y ordenan todas las líneas solo para mostrar
+los 5 o 3 primeros. Aquí se mantienen, por dimensión (producto, cliente) y
+por mes, dos resúmenes de tamaño fijo guardados en la base:
+  - sketch_topk: Space-Saving con CAPACIDADES[dimension] claves; cada
+    clave guarda una cuenta que nunca subestima y el error máximo de esa
+    cuenta.
+  - sketch_cm: Count-Min de PROFUNDIDAD x ANCHO contadores; el mínimo de
+    los contadores de una clave nunca la subestima.
+Un trigger sobre detalle_ventas actualiza ambos con cada línea insertada
+(igual que las tablas de resumen) y reconstruir_sketches los arma desde la
+historia. El top aproximado lee solo los sketches, así que su costo no
+depende del número de ventas, y devuelve cotas inferior y superior para
+cada clave. El dashboard solo muestra el top aproximado si ninguna de
+sus filas tiene un error relativo mayor que ERROR_MAXIMO (preciso); si no,
+o si se pide, calcula el exacto. Con muchos clientes de compras parejas
+(miles por mes con una o dos líneas cada uno) el sketch de clientes no
+alcanza esa precisión y el reporte 2 sale exacto.
+
+Los sketches solo suman: si se borran o cambian ventas (salvo al archivar
+particiones, que no debe restar), hay que reconstruirlos.
+
+Uso:
+    python sketches.py construir --db tienda.db
+    python sketches.py top --dimension producto -n 5 [--desde 2025-01 --hasta 2025-03] [--exacto]
+"""
+import argparse
+import random
+import sqlite3
+import time
+
+# Claves por mes en Space-Saving; los clientes se reparten en muchas más claves que los productos
+CAPACIDADES = {"producto": 256, "cliente": 1024}
+PROFUNDIDAD = 4    # filas (funciones hash) del Count-Min
+ANCHO = 2048       # contadores por fila del Count-Min
+PRIMO = 2147483647
+ERROR_MAXIMO = 0.05  # error relativo máximo ((superior - inferior) / superior) para mostrar el aproximado
+
+_azar = random.Random(23)  # semilla fija: las funciones hash deben ser las mismas en toda la vida de la base
+HASHES = [(fila, _azar.randrange(1, PRIMO), _azar.randrange(PRIMO)) for fila in range(PROFUNDIDAD)]
+_VALORES_HASH = ", ".join(f"({fila}, {a}, {b})" for fila, a, b in HASHES)
+
+def _hash(columna):
+    return f"((h.a * {columna} + h.b) % {PRIMO}) % {ANCHO}"
+
+# Dimensión -> (ventana y clave de una línea de detalle_ventas `dv` unida a su venta `v`)
+DIMENSIONES = {
+    "producto": "dv.id_producto",
+    "cliente": "v.id_cliente",
+}
+
+# Total gastado exacto de cada cliente del top entre los meses :desde y :hasta (pocas claves: va por índice)
+_TOTAL_GASTADO = """(SELECT SUM(dv.precio_unitario * dv.cantidad)
+        FROM ventas v JOIN detalle_ventas dv ON dv.id_venta = v.id_venta
+        WHERE v.id_cliente = t.clave
+          AND (:desde IS NULL OR v.fecha_venta >= :desde || '-01')
+          AND (:hasta IS NULL OR v.fecha_venta < date(:hasta || '-01', '+1 month')))"""
+
+# Reportes del dashboard que tienen versión aproximada:
+# clave -> (dimensión, N, tabla, id, nombre, columna, columnas extra {nombre: SQL sobre la clave t.clave})
+REPORTES_APROXIMADOS = {
+    "productos_mas_vendidos": ("producto", 5, "productos", "id_producto", "nombre_producto", "n° ventas", {}),
+    "clientes_frecuentes": ("cliente", 3, "clientes", "id_cliente", "nombre", "total_compras",
+                            {"total_gastado": _TOTAL_GASTADO}),
+}
+
+TABLAS_SKETCHES = [
+    """
+    CREATE TABLE IF NOT EXISTS sketch_topk (
+        dimension TEXT NOT NULL,
+        ventana TEXT NOT NULL,
+        clave INTEGER NOT NULL,
+        cuenta INTEGER NOT NULL,
+        error INTEGER NOT NULL,
+        PRIMARY KEY (dimension, ventana, clave)
+    ) WITHOUT ROWID;
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_sketch_topk_cuenta ON sketch_topk(dimension, ventana, cuenta)",
+    """
+    CREATE TABLE IF NOT EXISTS sketch_cm (
+        dimension TEXT NOT NULL,
+        fila INTEGER NOT NULL,
+        columna INTEGER NOT NULL,
+        ventana TEXT NOT NULL,
+        cuenta INTEGER NOT NULL,
+        PRIMARY KEY (dimension, fila, columna, ventana)
+    ) WITHOUT ROWID;
+    """,
+]
+
+def _actualizar(dimension, clave):
+    """Sentencias del trigger que suman la línea NEW al sketch de `dimension`"""
+    linea = f"""(SELECT strftime('%Y-%m', v.fecha_venta) AS ventana, {clave.replace('dv.', 'NEW.')} AS clave
+                 FROM ventas v WHERE v.id_venta = NEW.id_venta)"""
+    en_ventana = f"s.dimension = '{dimension}' AND s.ventana = x.ventana"
+    return f"""
+        UPDATE sketch_topk SET cuenta = cuenta + 1 FROM {linea} x
+        WHERE sketch_topk.dimension = '{dimension}' AND sketch_topk.ventana = x.ventana
+          AND sketch_topk.clave = x.clave;
+        INSERT INTO sketch_topk (dimension, ventana, clave, cuenta, error)
+        SELECT '{dimension}', x.ventana, x.clave, 1, 0 FROM {linea} x
+        WHERE x.clave IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM sketch_topk s WHERE {en_ventana} AND s.clave = x.clave)
+          AND (SELECT COUNT(*) FROM sketch_topk s WHERE {en_ventana}) < {CAPACIDADES[dimension]};
+        -- Sketch lleno: la clave nueva reemplaza a la de menor cuenta y hereda esa cuenta como error
+        UPDATE sketch_topk SET clave = x.clave, error = cuenta, cuenta = cuenta + 1 FROM {linea} x
+        WHERE sketch_topk.dimension = '{dimension}' AND sketch_topk.ventana = x.ventana
+          AND sketch_topk.clave = (SELECT s.clave FROM sketch_topk s WHERE {en_ventana} ORDER BY s.cuenta, s.clave LIMIT 1)
+          AND x.clave IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM sketch_topk s WHERE {en_ventana} AND s.clave = x.clave)
+          AND (SELECT COUNT(*) FROM sketch_topk s WHERE {en_ventana}) >= {CAPACIDADES[dimension]};
+        INSERT INTO sketch_cm (dimension, fila, columna, ventana, cuenta)
+        SELECT '{dimension}', h.fila, {_hash('x.clave')}, x.ventana, 1
+        FROM {linea} x, (SELECT column1 AS fila, column2 AS a, column3 AS b FROM (VALUES {_VALORES_HASH})) h
+        WHERE x.clave IS NOT NULL
+        ON CONFLICT (dimension, fila, columna, ventana) DO UPDATE SET cuenta = cuenta + 1;"""
+
+TRIGGERS_SKETCHES = {
+    "trg_sketch_detalle_ventas_ins": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_sketch_detalle_ventas_ins AFTER INSERT ON detalle_ventas
+        BEGIN {''.join(_actualizar(dimension, clave) for dimension, clave in DIMENSIONES.items())}
+        END;""",
+}
+
+# Desde la historia: las CAPACIDADES[dimension] claves con más líneas de cada mes (error 0) y el Count-Min exacto
+RECONSTRUIR_SKETCHES = [
+    "DELETE FROM sketch_topk",
+    "DELETE FROM sketch_cm",
+    "DROP TABLE IF EXISTS temp.conteos_sketch",
+    "CREATE TEMP TABLE conteos_sketch AS " + " UNION ALL ".join(
+        f"""SELECT '{dimension}' AS dimension, strftime('%Y-%m', v.fecha_venta) AS ventana, {clave} AS clave,
+                   COUNT(*) AS n
+            FROM detalle_ventas dv JOIN ventas v ON v.id_venta = dv.id_venta
+            WHERE {clave} IS NOT NULL
+            GROUP BY 2, 3"""
+        for dimension, clave in DIMENSIONES.items()
+    ),
+    f"""INSERT INTO sketch_topk (dimension, ventana, clave, cuenta, error)
+        SELECT dimension, ventana, clave, n, 0 FROM (
+            SELECT *, ROW_NUMBER() OVER (PARTITION BY dimension, ventana ORDER BY n DESC, clave) AS puesto
+            FROM temp.conteos_sketch
+        ) WHERE puesto <= CASE dimension {' '.join(f"WHEN '{d}' THEN {c}" for d, c in CAPACIDADES.items())} END""",
+    f"""INSERT INTO sketch_cm (dimension, fila, columna, ventana, cuenta)
+        SELECT c.dimension, h.fila, {_hash('c.clave')}, c.ventana, SUM(c.n)
+        FROM temp.conteos_sketch c, (SELECT column1 AS fila, column2 AS a, column3 AS b FROM (VALUES {_VALORES_HASH})) h
+        GROUP BY 1, 2, 3, 4""",
+    "DROP TABLE temp.conteos_sketch",
+]
+
+def sql_top_aproximado(dimension, n):
+    """SQL del top-n aproximado de `dimension` entre los meses :desde y :hasta ('AAAA-MM' o NULL).
+
+    Devuelve clave, estimacion, cota_inferior y cota_superior. La cota
+    superior suma, en los meses en que la clave no está en el sketch lleno,
+    la menor cuenta de ese mes, y se ajusta con el Count-Min; la estimación
+    es esa cota superior (Space-Saving nunca subestima).
+    """
+    en_rango = "(:desde IS NULL OR ventana >= :desde) AND (:hasta IS NULL OR ventana <= :hasta)"
+    return f"""
+    WITH ventanas AS (
+        SELECT ventana, MIN(cuenta) AS minimo, COUNT(*) >= {CAPACIDADES[dimension]} AS llena
+        FROM sketch_topk WHERE dimension = '{dimension}' AND {en_rango}
+        GROUP BY ventana
+    ),
+    candidatos AS (
+        SELECT s.clave, SUM(s.cuenta - s.error) AS cota_inferior,
+               SUM(s.cuenta) + (SELECT IFNULL(SUM(minimo), 0) FROM ventanas WHERE llena)
+                   - IFNULL(SUM(CASE WHEN w.llena THEN w.minimo END), 0) AS cota_topk
+        FROM sketch_topk s JOIN ventanas w ON w.ventana = s.ventana
+        WHERE s.dimension = '{dimension}'
+        GROUP BY s.clave
+    ),
+    count_min AS (
+        SELECT clave, SUM(minimo) AS cota_cm FROM (
+            SELECT c.clave, cm.ventana, MIN(cm.cuenta) AS minimo
+            FROM candidatos c
+            CROSS JOIN (SELECT column1 AS fila, column2 AS a, column3 AS b FROM (VALUES {_VALORES_HASH})) h
+            JOIN sketch_cm cm ON cm.dimension = '{dimension}' AND cm.fila = h.fila
+                             AND cm.columna = {_hash('c.clave')}
+            WHERE {en_rango.replace('ventana', 'cm.ventana')}
+            GROUP BY c.clave, cm.ventana
+        ) GROUP BY clave
+    )
+    SELECT c.clave, MIN(c.cota_topk, COALESCE(m.cota_cm, 0)) AS estimacion, c.cota_inferior,
+           MIN(c.cota_topk, COALESCE(m.cota_cm, 0)) AS cota_superior
+    FROM candidatos c LEFT JOIN count_min m ON m.clave = c.clave
+    ORDER BY estimacion DESC, c.clave
+    LIMIT {int(n)}
+    """
+
+def sql_top_exacto(dimension, n):
+    """SQL del top-n exacto (recorre las líneas del rango) con las mismas columnas"""
+    clave = DIMENSIONES[dimension]
+    return f"""
+    SELECT {clave} AS clave, COUNT(*) AS estimacion, COUNT(*) AS cota_inferior, COUNT(*) AS cota_superior
+    FROM detalle_ventas dv JOIN ventas v ON v.id_venta = dv.id_venta
+    WHERE {clave} IS NOT NULL
+      AND (:desde IS NULL OR v.fecha_venta >= :desde || '-01')
+      AND (:hasta IS NULL OR v.fecha_venta < date(:hasta || '-01', '+1 month'))
+    GROUP BY 1
+    ORDER BY 2 DESC, 1
+    LIMIT {int(n)}
+    """
+
+def sql_reporte_aproximado(clave_reporte):
+    """Versión aproximada de un reporte del dashboard, con nombres y cotas (parámetros :desde/:hasta)"""
+    dimension, n, tabla, id_columna, nombre, columna, extra = REPORTES_APROXIMADOS[clave_reporte]
+    extra = "".join(f"{sql} AS {alias}, " for alias, sql in extra.items())
+    return f"""
+    WITH top AS ({sql_top_aproximado(dimension, n)})
+    SELECT t.clave AS {id_columna}, x.{nombre}, t.estimacion AS '{columna}', {extra}
+           t.cota_inferior, t.cota_superior
+    FROM top t JOIN {tabla} x ON x.{id_columna} = t.clave
+    ORDER BY t.estimacion DESC, t.clave
+    """
+
+def preciso(cotas, error_maximo=ERROR_MAXIMO):
+    """True si en todas las (cota_inferior, cota_superior) el error relativo no pasa de error_maximo"""
+    return all(superior - inferior <= error_maximo * superior for inferior, superior in cotas)
+
+def reconstruir_sketches(conn):
+    """Vuelve a armar los sketches desde las ventas (sin confirmar)"""
+    for sentencia in RECONSTRUIR_SKETCHES:
+        conn.execute(sentencia)
+
+def top(conn, dimension, n, desde=None, hasta=None, exacto=False):
+    """Lista de (clave, estimacion, cota_inferior, cota_superior) del top-n entre dos meses"""
+    if dimension not in DIMENSIONES:
+        raise ValueError(f"Dimensión desconocida: {dimension}")
+    sql = sql_top_exacto(dimension, n) if exacto else sql_top_aproximado(dimension, n)
+    return conn.execute(sql, {"desde": desde, "hasta": hasta}).fetchall()
+
+if __name__ == '__main__':
+    from migraciones import aplicar_migraciones
+    from particiones import conectar
+
+    parser = argparse.ArgumentParser(description="Top aproximado de productos y clientes con sketches")
+    parser.add_argument('accion', choices=['construir', 'top'])
+    parser.add_argument('--db', default='tienda.db', help="Ruta de la base")
+    parser.add_argument('--dimension', choices=list(DIMENSIONES), default='producto')
+    parser.add_argument('-n', type=int, default=5, help="Tamaño del top")
+    parser.add_argument('--desde', default=None, help="Primer mes (AAAA-MM)")
+    parser.add_argument('--hasta', default=None, help="Último mes (AAAA-MM)")
+    parser.add_argument('--exacto', action='store_true', help="Calcular el top exacto en lugar del aproximado")
+    args = parser.parse_args()
+
+    if args.accion == 'construir':
+        conn = sqlite3.connect(args.db)
+        aplicar_migraciones(conn)
+        conn.close()
+        conn = conectar(args.db, solo_lectura=False)  # incluye las ventas archivadas
+        inicio = time.perf_counter()
+        reconstruir_sketches(conn)
+        conn.commit()
+        conn.close()
+        print(f"Sketches reconstruidos en {time.perf_counter() - inicio:.2f} s.")
+    else:
+        conn = conectar(args.db)
+        inicio = time.perf_counter()
+        filas = top(conn, args.dimension, args.n, args.desde, args.hasta, args.exacto)
+        milisegundos = (time.perf_counter() - inicio) * 1000
+        for clave, estimacion, inferior, superior in filas:
+            print(f"{clave:>8}  {estimacion:>8}  [{inferior}, {superior}]")
+        print(f"{'Exacto' if args.exacto else 'Aproximado'} en {milisegundos:.1f} ms.")
+        conn.close()